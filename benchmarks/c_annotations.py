@@ -0,0 +1,102 @@
+"""
+Measures the unscheduled SGEMM edge kernels of apps/x86/sgemm, compiled by
+the system C compiler with and without the restrict, alignment and
+trip-count annotations in the generated code.
+
+    python benchmarks/c_annotations.py [--k 512] [--reps 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from exo import compile_procs
+
+SGEMM = Path(__file__).resolve().parent.parent / "apps" / "x86" / "sgemm"
+
+# predefining the annotation macros turns them off
+NO_ANNOTATIONS = [
+    "-DEXO_RESTRICT=",
+    "-DEXO_ASSUME(expr)=((void)0)",
+    "-DEXO_ASSUME_ALIGNED(ptr,n)=(ptr)",
+]
+
+_MAIN = """
+#include <stdio.h>
+#include <stdlib.h>
+#include <time.h>
+#include "kernels.h"
+
+static double now(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec * 1e-9;
+}
+
+int main(int argc, char **argv) {
+    int K = atoi(argv[1]), reps = atoi(argv[2]);
+    float *A = malloc(sizeof(float) * 64 * K);
+    float *B = malloc(sizeof(float) * K * 64);
+    float *C = malloc(sizeof(float) * 64 * 64);
+    for (int i = 0; i < 64 * K; i++) A[i] = B[i] = (float)(i % 13) / 13;
+    for (int i = 0; i < 64 * 64; i++) C[i] = 0;
+
+    struct exo_win_2f32c wA = { A, { K, 1 } };
+    struct exo_win_2f32c wB = { B, { 64, 1 } };
+    struct exo_win_2f32 wC = { C, { 64, 1 } };
+
+    double start = now();
+    for (int r = 0; r < reps; r++) right_panel_kernel(NULL, 63, K, wA, wB, wC);
+    printf("%.9f\\n", (now() - start) / reps);
+
+    start = now();
+    for (int r = 0; r < reps; r++) bottom_panel_kernel(NULL, 5, K, wA, wB, wC);
+    printf("%.9f\\n", (now() - start) / reps);
+    return 0;
+}
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--k", type=int, default=512)
+    parser.add_argument("--reps", type=int, default=2000)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(SGEMM))
+    import sgemm
+
+    kernels = [sgemm.right_panel_kernel, sgemm.bottom_panel_kernel]
+    cc = os.environ.get("CC", "cc")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        compile_procs(kernels, tmp, "kernels.c", "kernels.h")
+        (tmp / "main.c").write_text(_MAIN)
+
+        for label, flags in [("annotated", []), ("plain", NO_ANNOTATIONS)]:
+            exe = tmp / label
+            subprocess.run(
+                [cc, "-O3", "-march=native", *flags, "kernels.c", "main.c", "-o", exe],
+                cwd=tmp,
+                check=True,
+            )
+            out = subprocess.run(
+                [exe, str(args.k), str(args.reps)],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            right, bottom = map(float, out.stdout.split())
+            print(
+                f"{label:10} right panel: {right * 1e6:8.1f} us"
+                f"   bottom panel: {bottom * 1e6:8.1f} us"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Measures a vector addition compiled once, without -march flags, as a
+cpu_dispatch of AVX-512, AVX2 and portable variants.  Each variant is
+selected by running the same binary with EXO_OVERRIDE_CPUINFO, limited to
+the features of this machine.
+
+    python benchmarks/cpu_dispatch.py [--n 4096] [--reps 200000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import subprocess
+import tempfile
+from pathlib import Path
+
+from exo import proc, compile_procs, cpu_dispatch
+from exo.platforms.x86 import *
+
+
+@proc
+def vadd(n: size, z: f32[n], x: f32[n], y: f32[n]):
+    assert n % 16 == 0
+    for i in seq(0, n):
+        z[i] = x[i] + y[i]
+
+
+@proc
+def vadd_avx2(n: size, z: f32[n], x: f32[n], y: f32[n]):
+    assert n % 16 == 0
+    for io in seq(0, n / 8):
+        xv: f32[8] @ AVX2
+        yv: f32[8] @ AVX2
+        zv: f32[8] @ AVX2
+        mm256_loadu_ps(xv, x[8 * io : 8 * io + 8])
+        mm256_loadu_ps(yv, y[8 * io : 8 * io + 8])
+        mm256_add_ps(zv, xv, yv)
+        mm256_storeu_ps(z[8 * io : 8 * io + 8], zv)
+
+
+@proc
+def vadd_avx512(n: size, z: f32[n], x: f32[n], y: f32[n]):
+    assert n % 16 == 0
+    for io in seq(0, n / 16):
+        xv: f32[16] @ AVX512
+        yv: f32[16] @ AVX512
+        zv: f32[16] @ AVX512
+        mm512_loadu_ps(xv, x[16 * io : 16 * io + 16])
+        mm512_loadu_ps(yv, y[16 * io : 16 * io + 16])
+        mm512_add_ps(zv, xv, yv)
+        mm512_storeu_ps(z[16 * io : 16 * io + 16], zv)
+
+
+_MAIN = """
+#include <stdio.h>
+#include <stdlib.h>
+#include <time.h>
+#include "kernels.h"
+
+static double now(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec * 1e-9;
+}
+
+int main(int argc, char **argv) {
+    int n = atoi(argv[1]), reps = atoi(argv[2]);
+    float *x = malloc(sizeof(float) * n);
+    float *y = malloc(sizeof(float) * n);
+    float *z = malloc(sizeof(float) * n);
+    for (int i = 0; i < n; i++) x[i] = y[i] = (float)(i % 7);
+
+    double start = now();
+    for (int r = 0; r < reps; r++) vadd(NULL, n, z, x, y);
+    printf("%.9f\\n", (now() - start) / reps);
+    return 0;
+}
+"""
+
+
+def cpu_features():
+    try:
+        cpuinfo = Path("/proc/cpuinfo").read_text()
+    except OSError:
+        return set()
+    m = re.search(r"^flags\s*:(.+)$", cpuinfo, re.MULTILINE)
+    return set(m.group(1).split()) if m else set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n", type=int, default=4096)
+    parser.add_argument("--reps", type=int, default=200000)
+    args = parser.parse_args()
+
+    cc = os.environ.get("CC", "cc")
+    dispatch = cpu_dispatch(vadd, {"avx512f": vadd_avx512, "avx2": vadd_avx2})
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        compile_procs([dispatch], tmp, "kernels.c", "kernels.h")
+        (tmp / "main.c").write_text(_MAIN)
+        subprocess.run(
+            [cc, "-O2", "kernels.c", "main.c", "-o", "main"], cwd=tmp, check=True
+        )
+
+        for cpuinfo in ["", "avx2", "avx2 avx512f"]:
+            if not set(cpuinfo.split()) <= cpu_features():
+                continue
+            out = subprocess.run(
+                [tmp / "main", str(args.n), str(args.reps)],
+                env={**os.environ, "EXO_OVERRIDE_CPUINFO": cpuinfo},
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            label = cpuinfo or "(none)"
+            print(f"{label:14}: {float(out.stdout) * 1e9:9.1f} ns")
+
+
+if __name__ == "__main__":
+    main()
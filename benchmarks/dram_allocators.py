@@ -0,0 +1,134 @@
+"""
+Measures two kernels whose scratch buffers are allocated in DRAM,
+DRAM_ALIGNED(64), DRAM_ARENA and DRAM_HUGEPAGE, compiled with the system C
+compiler: one that allocates a small buffer in every iteration of a loop, and
+one that packs a large matrix into a transposed panel.  DRAM_HUGEPAGE maps
+every buffer with mmap, so it is only measured on the second kernel.
+
+    python benchmarks/dram_allocators.py [--rows 100000] [--k 2048]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+
+from exo import proc, compile_procs, DRAM
+from exo.libs.memories import DRAM_ALIGNED, DRAM_ARENA, DRAM_HUGEPAGE
+from exo.stdlib.scheduling import *
+
+LIBS = Path(__file__).resolve().parent.parent / "src" / "exo" / "libs"
+
+
+@proc
+def row_scratch(n: size, x: f32[n, 64], y: f32[n]):
+    for i in seq(0, n):
+        tmp: f32[64]
+        for j in seq(0, 64):
+            tmp[j] = x[i, j] * x[i, j]
+        y[i] = 0.0
+        for j in seq(0, 64):
+            y[i] += tmp[j]
+
+
+@proc
+def pack_panel(K: size, A: f32[K, 1024], y: f32[1024]):
+    panel: f32[1024, K]
+    for k in seq(0, K):
+        for j in seq(0, 1024):
+            panel[j, k] = A[k, j]
+    for j in seq(0, 1024):
+        y[j] = 0.0
+        for k in seq(0, K):
+            y[j] += panel[j, k]
+
+
+_MAIN = """
+#include <stdio.h>
+#include <stdlib.h>
+#include <time.h>
+#include "kernels.h"
+
+#ifdef USE_ARENA
+#include "exo_arena.h"
+static uint8_t scratch[(size_t)64 << 20];
+#endif
+
+static double now(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec * 1e-9;
+}
+
+int main(int argc, char **argv) {
+    int rows = atoi(argv[1]), K = atoi(argv[2]), reps = atoi(argv[3]);
+#ifdef USE_ARENA
+    struct exo_arena arena;
+    exo_arena_init(&arena, scratch, sizeof(scratch));
+    kernels_Context ctxt = { &arena };
+    kernels_Context *c = &ctxt;
+#else
+    void *c = NULL;
+#endif
+    float *x = malloc(sizeof(float) * rows * 64);
+    float *y = malloc(sizeof(float) * (rows + 1024));
+    float *A = malloc(sizeof(float) * K * 1024);
+    for (int i = 0; i < rows * 64; i++) x[i] = (float)(i % 7);
+    for (int i = 0; i < K * 1024; i++) A[i] = (float)(i % 5);
+
+    double start = now();
+    for (int r = 0; r < reps; r++) row_scratch(c, rows, x, y);
+    printf("%.9f\\n", (now() - start) / reps);
+
+    start = now();
+    for (int r = 0; r < reps; r++) pack_panel(c, K, A, y);
+    printf("%.9f\\n", (now() - start) / reps);
+    return 0;
+}
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--k", type=int, default=2048)
+    parser.add_argument("--reps", type=int, default=20)
+    args = parser.parse_args()
+
+    cc = os.environ.get("CC", "cc")
+    mems = [DRAM, DRAM_ALIGNED(64), DRAM_ARENA, DRAM_HUGEPAGE]
+    for mem in mems:
+        procs = [
+            set_memory(row_scratch, "tmp", mem),
+            set_memory(pack_panel, "panel", mem),
+        ]
+        flags = ["-DUSE_ARENA"] if mem is DRAM_ARENA else []
+        rows = 0 if mem is DRAM_HUGEPAGE else args.rows
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            compile_procs(procs, tmp, "kernels.c", "kernels.h")
+            (tmp / "main.c").write_text(_MAIN)
+            subprocess.run(
+                [cc, "-O3", *flags, f"-I{LIBS}", "kernels.c", "main.c", "-o", "main"],
+                cwd=tmp,
+                check=True,
+            )
+            out = subprocess.run(
+                [tmp / "main", str(rows), str(args.k), str(args.reps)],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            scratch, pack = map(float, out.stdout.split())
+            scratch = f"{scratch * 1e6:9.1f} us" if rows else f"{'-':>12}"
+            print(
+                f"{mem.name():16} row scratch: {scratch}"
+                f"   pack panel: {pack * 1e6:9.1f} us"
+            )
+
+
+if __name__ == "__main__":
+    main()
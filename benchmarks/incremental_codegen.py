@@ -0,0 +1,66 @@
+"""
+Measures C code generation time of a library of many kernels with the
+procedure code cache, when it is cold, when it is warm, and after one
+kernel has been rescheduled.
+
+    python benchmarks/incremental_codegen.py [--kernels 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+from exo import proc, compile_procs_to_strings
+from exo.stdlib.scheduling import *
+
+
+@proc
+def gemv(M: size, N: size, A: f32[M, N], x: f32[N], y: f32[M]):
+    assert M % 8 == 0
+    assert N % 4 == 0
+    for i in seq(0, M):
+        for j in seq(0, N):
+            y[i] += A[i, j] * x[j]
+
+
+def make_kernel(k):
+    p = rename(gemv, f"gemv_{k}")
+    p = divide_loop(p, "i", 8, ("io", "ii"), perfect=True)
+    if k % 2:
+        p = divide_loop(p, "j", 4, ("jo", "ji"), perfect=True)
+    return p
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--kernels", type=int, default=200)
+    args = parser.parse_args()
+
+    library = [make_kernel(k) for k in range(args.kernels)]
+
+    def build():
+        start = time.perf_counter()
+        out = compile_procs_to_strings(library, "lib.h")
+        return out, time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ["EXO_CACHE_DIR"] = cache_dir
+
+        cold, cold_time = build()
+        warm, warm_time = build()
+        assert warm == cold
+
+        library[0] = reorder_loops(library[0], "io ii")
+        _, change_time = build()
+
+    print(f"kernels:         {args.kernels}")
+    print(f"cold cache:      {cold_time:6.2f} s")
+    print(f"warm cache:      {warm_time:6.2f} s")
+    print(f"one rescheduled: {change_time:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
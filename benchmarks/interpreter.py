@@ -0,0 +1,67 @@
+"""
+Measures the reference interpreter on a matrix multiplication, and on the
+same multiplication scheduled with AVX2 instructions, whose semantic bodies
+it runs, with loop nests run as whole-array operations and one iteration
+at a time.
+
+    python benchmarks/interpreter.py [--n 48]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from exo import proc, interpret
+from exo.backend.LoopIR_interpreter import Interpreter
+from exo.platforms.x86 import *
+from exo.stdlib.scheduling import *
+
+
+@proc
+def sgemm(M: size, N: size, K: size, A: f32[M, K], B: f32[K, N], C: f32[M, N]):
+    for i in seq(0, M):
+        for j in seq(0, N):
+            for k in seq(0, K):
+                C[i, j] += A[i, k] * B[k, j]
+
+
+def avx2_sgemm():
+    p = rename(sgemm, "avx2_sgemm")
+    p = divide_loop(p, "j", 8, ["jo", "ji"], tail="cut")
+    p = reorder_loops(p, "ji k")
+    p = stage_mem(p, "for ji in _: _ #0", "C[i, 8 * jo : 8 * jo + 8]", "c")
+    p = simplify(p)
+    p = set_memory(p, "c", AVX2)
+    p = replace_all(p, mm256_loadu_ps)
+    p = replace_all(p, mm256_storeu_ps)
+    return p
+
+
+def measure(p, n):
+    A = np.random.rand(n, n).astype(np.float32)
+    B = np.random.rand(n, n).astype(np.float32)
+    C = np.zeros((n, n), dtype=np.float32)
+    start = time.perf_counter()
+    interpret(p, A=A, B=B, C=C)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n", type=int, default=48)
+    args = parser.parse_args()
+
+    vectorize = Interpreter.vectorize
+    for p in [sgemm, avx2_sgemm()]:
+        for label, v in [("scalar", lambda self, s, env: False), ("vector", vectorize)]:
+            Interpreter.vectorize = v
+            t = measure(p, args.n)
+            print(f"{p.name():12} {label}: {t * 1e3:9.1f} ms")
+    Interpreter.vectorize = vectorize
+
+
+if __name__ == "__main__":
+    main()
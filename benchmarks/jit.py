@@ -0,0 +1,108 @@
+"""
+Measures how long it takes, in a fresh interpreter, to go from a scheduled
+procedure to a function which can be called from Python: through a CMake
+build of a shared library as in the tests, and through `Procedure.jit()`
+with a cold and a warm cache, the first time and again in the same
+interpreter.
+
+    python benchmarks/jit.py
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import tempfile
+
+_PROCS = """
+from __future__ import annotations
+from exo import proc
+from exo.stdlib.scheduling import *
+
+@proc
+def sgemm(M: size, N: size, K: size, A: f32[M, K], B: f32[K, N], C: f32[M, N]):
+    for i in seq(0, M):
+        for j in seq(0, N):
+            for k in seq(0, K):
+                C[i, j] += A[i, k] * B[k, j]
+
+sgemm = reorder_loops(sgemm, "j k")
+"""
+
+_JIT = (
+    _PROCS
+    + """
+import time
+start = time.perf_counter()
+sgemm.jit()
+print(time.perf_counter() - start)
+# once NumPy and the library are loaded
+start = time.perf_counter()
+sgemm.jit()
+print(time.perf_counter() - start)
+"""
+)
+
+_CMAKE = (
+    _PROCS
+    + """
+import ctypes
+import subprocess
+import sys
+import time
+from pathlib import Path
+from exo import compile_procs
+
+tmp = Path(sys.argv[1])
+start = time.perf_counter()
+compile_procs([sgemm], tmp, "sgemm.c", "sgemm.h")
+(tmp / "CMakeLists.txt").write_text(
+    "cmake_minimum_required(VERSION 3.21)\\n"
+    "project(sgemm LANGUAGES C)\\n"
+    "add_library(sgemm SHARED sgemm.c)\\n"
+)
+subprocess.run(
+    ["cmake", "-S", tmp, "-B", tmp / "build", "-G", "Ninja",
+     "-DCMAKE_BUILD_TYPE=Release"],
+    check=True, capture_output=True,
+)
+subprocess.run(["cmake", "--build", tmp / "build"], check=True, capture_output=True)
+ctypes.CDLL(str(tmp / "build" / "libsgemm.so")).sgemm
+print(time.perf_counter() - start)
+"""
+)
+
+
+def run(script, tmp, cache_dir=None):
+    # procedures are parsed from their source, so the script is a file
+    path = os.path.join(tmp, "script.py")
+    with open(path, "w") as f:
+        f.write(script)
+    env = dict(os.environ)
+    env.pop("EXO_CACHE_DIR", None)
+    if cache_dir:
+        env["EXO_CACHE_DIR"] = cache_dir
+    out = subprocess.run(
+        [sys.executable, path, tmp],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return [float(t) for t in out.stdout.split()]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        (build,) = run(_CMAKE, tmp)
+        print(f"cmake:              {build * 1e3:8.1f} ms")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label in ["cold", "warm"]:
+            first, again = run(_JIT, tmp, cache_dir=tmp)
+            print(f"jit, {label}:          {first * 1e3:8.1f} ms")
+            print(f"jit, {label}, again:   {again * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Measures the in-memory footprint and construction throughput of LoopIR on a
+fully unrolled sgemm micro-kernel.
+
+    python benchmarks/loopir_nodes.py [--M 6] [--N 64] [--K 16]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+from exo import proc
+from exo.API_cursors import ForCursor
+from exo.core.LoopIR import LoopIR, T
+from exo.core.prelude import Sym, SrcInfo
+from exo.stdlib.scheduling import *
+
+
+@proc
+def sgemm_micro(M: size, N: size, K: size, A: f32[M, K], B: f32[K, N], C: f32[M, N]):
+    for k in seq(0, K):
+        for i in seq(0, M):
+            for j in seq(0, N):
+                C[i, j] += A[i, k] * B[k, j]
+
+
+def unrolled_kernel(M, N, K):
+    p = sgemm_micro.partial_eval(M, N, K)
+    # unroll outermost-first, using cursors rather than patterns so that
+    # matching does not have to walk the ever longer unrolled block
+    while loops := [s for s in p.body() if isinstance(s, ForCursor)]:
+        p = unroll_loop(p, loops[-1])
+    return p
+
+
+# objects whose memory is attributed to the IR
+_leaf_types = (Sym, SrcInfo, str, int, float, bool, type(None))
+_node_bases = (LoopIR.proc, LoopIR.stmt, LoopIR.expr, LoopIR.w_access, T.type)
+
+
+def ir_footprint(ir):
+    """(number of distinct nodes, bytes held by the nodes and their fields)"""
+    seen = set()
+    n_nodes = 0
+    n_bytes = 0
+    worklist = [ir]
+    while worklist:
+        obj = worklist.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        n_bytes += sys.getsizeof(obj)
+        if isinstance(obj, _node_bases):
+            n_nodes += 1
+            if (d := getattr(obj, "__dict__", None)) is not None and d:
+                n_bytes += sys.getsizeof(d)
+            worklist.extend(getattr(obj, a.name) for a in obj.__attrs_attrs__)
+        elif isinstance(obj, (list, tuple)):
+            worklist.extend(obj)
+        elif isinstance(obj, SrcInfo):
+            worklist.extend((obj.filename, obj.function))
+        elif isinstance(obj, Sym):
+            worklist.append(obj._nm)
+        elif not isinstance(obj, _leaf_types):
+            # memories, configs, instructions, ... are shared globals
+            n_bytes -= sys.getsizeof(obj)
+    return n_nodes, n_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--M", type=int, default=6)
+    parser.add_argument("--N", type=int, default=64)
+    parser.add_argument("--K", type=int, default=16)
+    args = parser.parse_args()
+
+    gc.collect()
+    start = time.perf_counter()
+    p = unrolled_kernel(args.M, args.N, args.K)
+    unroll_time = time.perf_counter() - start
+
+    ir = p.INTERNAL_proc()
+    n_nodes, n_bytes = ir_footprint(ir)
+
+    # rebuild the kernel from scratch, without any sharing of subtrees, once
+    # to time node construction and once to trace the memory it allocates
+    start = time.perf_counter()
+    ir_copy, n_built = rebuild(ir)
+    rebuild_time = time.perf_counter() - start
+    assert str(ir_copy) == str(ir)
+    del ir_copy
+
+    gc.collect()
+    tracemalloc.start()
+    ir_copy, _ = rebuild(ir)
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"kernel:               sgemm {args.M}x{args.N}x{args.K}, fully unrolled")
+    print(f"statements:           {len(ir.body)}")
+    print(f"unroll time:          {unroll_time:.2f} s")
+    print(f"distinct nodes:       {n_nodes}")
+    print(f"bytes / node:         {n_bytes / n_nodes:.1f}")
+    print(f"unshared nodes:       {n_built}")
+    print(f"traced bytes / node:  {traced / n_built:.1f}")
+    print(f"construction:         {n_built / rebuild_time / 1e3:.1f} k nodes / s")
+
+
+def rebuild(ir):
+    """
+    Copy `ir`, constructing every node and source location the way the
+    frontend does.  Returns the copy and the number of nodes constructed.
+    """
+    n_built = 0
+
+    def copy(node):
+        nonlocal n_built
+        if isinstance(node, SrcInfo):
+            return SrcInfo(
+                node.filename,
+                node.lineno,
+                node.col_offset,
+                node.end_lineno,
+                node.end_col_offset,
+                node.function,
+            )
+        elif isinstance(node, _node_bases):
+            fields = {a.name: copy(getattr(node, a.name)) for a in node.__attrs_attrs__}
+            if not fields:
+                return node  # nullary nodes are memoized
+            n_built += 1
+            return type(node)(**fields)
+        elif isinstance(node, list):
+            return [copy(n) for n in node]
+        return node
+
+    return copy(ir), n_built
+
+
+if __name__ == "__main__":
+    main()
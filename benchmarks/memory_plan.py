@@ -0,0 +1,97 @@
+"""
+Measures a kernel which stages tiles into buffers allocated inside its loops,
+compiled with the system C compiler, with and without the memory plan that
+places fixed-size DRAM buffers in one allocation per call.  Buffers in a
+subclass of DRAM are not planned, so they show the cost of allocating in
+every iteration.
+
+    python benchmarks/memory_plan.py [--rows 100000] [--reps 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+
+from exo import proc, compile_procs, DRAM
+from exo.stdlib.scheduling import *
+
+
+class UNPLANNED_DRAM(DRAM):
+    pass
+
+
+@proc
+def tiled_norms(n: size, A: f32[n, 64], y: f32[n]):
+    for i in seq(0, n):
+        y[i] = 0.0
+        for jo in seq(0, 4):
+            tile: f32[16]
+            for ji in seq(0, 16):
+                tile[ji] = A[i, 16 * jo + ji]
+            sq: f32[16]
+            for ji in seq(0, 16):
+                sq[ji] = tile[ji] * tile[ji]
+            for ji in seq(0, 16):
+                y[i] += sq[ji]
+
+
+_MAIN = """
+#include <stdio.h>
+#include <stdlib.h>
+#include <time.h>
+#include "kernels.h"
+
+static double now(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec * 1e-9;
+}
+
+int main(int argc, char **argv) {
+    int rows = atoi(argv[1]), reps = atoi(argv[2]);
+    float *A = malloc(sizeof(float) * rows * 64);
+    float *y = malloc(sizeof(float) * rows);
+    for (int i = 0; i < rows * 64; i++) A[i] = (float)(i % 7);
+
+    double start = now();
+    for (int r = 0; r < reps; r++) tiled_norms(NULL, rows, A, y);
+    printf("%.9f\\n", (now() - start) / reps);
+    return 0;
+}
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--reps", type=int, default=20)
+    args = parser.parse_args()
+
+    cc = os.environ.get("CC", "cc")
+    unplanned = set_memory(tiled_norms, "tile", UNPLANNED_DRAM)
+    unplanned = set_memory(unplanned, "sq", UNPLANNED_DRAM)
+    for label, p in [("planned", tiled_norms), ("unplanned", unplanned)]:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            compile_procs([p], tmp, "kernels.c", "kernels.h")
+            (tmp / "main.c").write_text(_MAIN)
+            subprocess.run(
+                [cc, "-O3", "kernels.c", "main.c", "-o", "main"],
+                cwd=tmp,
+                check=True,
+            )
+            out = subprocess.run(
+                [tmp / "main", str(args.rows), str(args.reps)],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            print(f"{label:10}: {float(out.stdout) * 1e6:9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Measures an AXPY over windows, compiled with the system C compiler, before
+and after `multiversion` specializes it for unit strides and sizes divisible
+by 16.  It is called with unit strides, once with a size divisible by 16 and
+once with a size that is not.
+
+    python benchmarks/multiversion.py [--n 4096] [--reps 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+
+from exo import proc, compile_procs
+from exo.stdlib.scheduling import *
+
+
+@proc
+def axpy(n: size, alpha: f32, x: [f32][n], y: [f32][n]):
+    for i in seq(0, n):
+        y[i] += alpha * x[i]
+
+
+_MAIN = """
+#include <stdio.h>
+#include <stdlib.h>
+#include <time.h>
+#include "kernels.h"
+
+static double now(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec * 1e-9;
+}
+
+int main(int argc, char **argv) {
+    int n = atoi(argv[1]), reps = atoi(argv[2]);
+    float alpha = 0.5f;
+    float *x = malloc(sizeof(float) * (n + 16));
+    float *y = malloc(sizeof(float) * (n + 16));
+    for (int i = 0; i < n + 16; i++) x[i] = y[i] = (float)(i % 7);
+
+    for (int m = n; m <= n + 1; m++) {
+        struct exo_win_1f32c wx = { x, { 1 } };
+        struct exo_win_1f32 wy = { y, { 1 } };
+        double start = now();
+        for (int r = 0; r < reps; r++) axpy(NULL, m, &alpha, wx, wy);
+        printf("%.9f\\n", (now() - start) / reps);
+    }
+    return 0;
+}
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n", type=int, default=4096)
+    parser.add_argument("--reps", type=int, default=20000)
+    args = parser.parse_args()
+
+    versioned = divide_loop(axpy, "i", 16, ["io", "ii"], tail="cut")
+    versioned, _ = multiversion(
+        versioned,
+        [
+            "stride(x, 0) == 1 and stride(y, 0) == 1 and n % 16 == 0",
+            "stride(x, 0) == 1 and stride(y, 0) == 1",
+        ],
+    )
+
+    cc = os.environ.get("CC", "cc")
+    for label, p in [("generic", axpy), ("multiversion", versioned)]:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            compile_procs([p], tmp, "kernels.c", "kernels.h")
+            (tmp / "main.c").write_text(_MAIN)
+            subprocess.run(
+                [cc, "-O3", "kernels.c", "main.c", "-o", "main"],
+                cwd=tmp,
+                check=True,
+            )
+            out = subprocess.run(
+                [tmp / "main", str(args.n), str(args.reps)],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            even, odd = map(float, out.stdout.split())
+            print(
+                f"{label:13} n={args.n}: {even * 1e6:8.2f} us"
+                f"   n={args.n + 1}: {odd * 1e6:8.2f} us"
+            )
+
+
+if __name__ == "__main__":
+    main()
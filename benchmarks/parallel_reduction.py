@@ -0,0 +1,80 @@
+"""
+Measures a column-sum kernel whose outer loop is parallelized with an OpenMP
+reduction, compiled with the system C compiler, for different numbers of
+threads.
+
+    python benchmarks/parallel_reduction.py [--threads 1 2 4 8] [--rows 8192]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+
+from exo import proc, compile_procs
+from exo.stdlib.scheduling import *
+
+
+@proc
+def colsum(M: size, A: f32[M, 64], y: f32[64]):
+    for i in seq(0, M):
+        for j in seq(0, 64):
+            y[j] += A[i, j]
+
+
+_MAIN = """
+#include <stdio.h>
+#include <stdlib.h>
+#include <omp.h>
+#include "colsum.h"
+
+int main(int argc, char **argv) {
+    int M = atoi(argv[1]), reps = atoi(argv[2]);
+    float *A = malloc(sizeof(float) * M * 64);
+    float y[64] = {0};
+    for (int i = 0; i < M * 64; i++) A[i] = (float)(i % 7);
+
+    colsum(NULL, M, A, y);
+    double start = omp_get_wtime();
+    for (int r = 0; r < reps; r++) colsum(NULL, M, A, y);
+    printf("%f\\n", (omp_get_wtime() - start) / reps);
+    return 0;
+}
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--rows", type=int, default=8192)
+    parser.add_argument("--reps", type=int, default=200)
+    args = parser.parse_args()
+
+    p = parallelize_loop(colsum, "i", schedule="static")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        compile_procs([p], tmp, "colsum.c", "colsum.h")
+        (tmp / "main.c").write_text(_MAIN)
+        cc = os.environ.get("CC", "cc")
+        subprocess.run(
+            [cc, "-O3", "-fopenmp", "colsum.c", "main.c", "-o", "colsum"],
+            cwd=tmp,
+            check=True,
+        )
+
+        for threads in args.threads:
+            out = subprocess.run(
+                [tmp / "colsum", str(args.rows), str(args.reps)],
+                env=dict(os.environ, OMP_NUM_THREADS=str(threads)),
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            print(f"threads={threads:3}: {float(out.stdout) * 1e6:9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Measures how long importing each of the platform libraries takes, each in a
+fresh interpreter and on top of an already imported `exo`.
+
+    python benchmarks/platform_import.py [--repeat 3] [platform ...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+
+PLATFORMS = ["x86", "neon", "rvv", "sve_vla", "sve_vls", "gemmini"]
+
+_SCRIPT = """
+import time
+import exo
+start = time.perf_counter()
+import exo.platforms.{platform}
+print(time.perf_counter() - start)
+"""
+
+
+def import_time(platform):
+    out = subprocess.run(
+        [sys.executable, "-c", _SCRIPT.format(platform=platform)],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return float(out.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("platforms", nargs="*", default=PLATFORMS)
+    args = parser.parse_args()
+
+    for platform in args.platforms:
+        best = min(import_time(platform) for _ in range(args.repeat))
+        print(f"{platform:10} {best * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Measures how long it takes to check every instruction of the platform
+libraries, in a fresh interpreter, without the procedure cache and with a
+cold and a warm cache.
+
+    python benchmarks/proc_cache.py [platform ...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+PLATFORMS = ["x86", "neon", "rvv"]
+
+_SCRIPT = """
+import importlib
+import time
+import exo
+start = time.perf_counter()
+for platform in {platforms!r}:
+    module = importlib.import_module("exo.platforms." + platform)
+    for val in vars(module).values():
+        if isinstance(val, exo.Procedure):
+            val.INTERNAL_proc()
+print(time.perf_counter() - start)
+"""
+
+
+def check_time(platforms, cache_dir):
+    env = dict(os.environ)
+    env.pop("EXO_CACHE_DIR", None)
+    if cache_dir:
+        env["EXO_CACHE_DIR"] = cache_dir
+    out = subprocess.run(
+        [sys.executable, "-c", _SCRIPT.format(platforms=platforms)],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return float(out.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("platforms", nargs="*", default=PLATFORMS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        print(f"no cache:    {check_time(args.platforms, None) * 1e3:8.1f} ms")
+        print(f"cold cache:  {check_time(args.platforms, cache_dir) * 1e3:8.1f} ms")
+        print(f"warm cache:  {check_time(args.platforms, cache_dir) * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
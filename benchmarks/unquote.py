@@ -0,0 +1,44 @@
+"""
+Measures how long it takes to generate metaprogrammed procedures, which
+evaluate many unquotes while they are parsed.
+
+    python benchmarks/unquote.py [--procs 50] [--unroll 16]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from exo import DRAM, proc
+
+
+def make_axpy(n_unroll, alpha):
+    @proc
+    def axpy(x: f32[{n_unroll}] @ DRAM, y: f32[{n_unroll}] @ DRAM):
+        with python:
+            for i in range(n_unroll):
+                with exo:
+                    y[{i}] += {alpha} * x[{i}]
+
+    return axpy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--procs", type=int, default=50)
+    parser.add_argument("--unroll", type=int, default=16)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    for k in range(args.procs):
+        make_axpy(args.unroll, float(k))
+    elapsed = time.perf_counter() - start
+
+    print(f"procedures:  {args.procs} x {args.unroll} unrolled statements")
+    print(f"time:        {elapsed * 1e3:.1f} ms")
+    print(f"per proc:    {elapsed / args.procs * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
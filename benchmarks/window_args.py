@@ -0,0 +1,106 @@
+"""
+Measures a blocked matrix-vector product which calls a 4x4 micro-kernel with
+window arguments, compiled with the system C compiler at -O1 and -O2, with
+windows passed to the private micro-kernel as structs, and as a pointer and
+the strides which are not constant.
+
+    python benchmarks/window_args.py [--n 4096] [--reps 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+
+from exo import proc, compile_procs
+from exo.backend import LoopIR_compiler
+
+
+@proc
+def ukernel(A: [f32][4, 4], x: [f32][4], y: [f32][4]):
+    for i in seq(0, 4):
+        for j in seq(0, 4):
+            y[i] += A[i, j] * x[j]
+
+
+@proc
+def gemv(n: size, A: f32[n, 8], x: f32[8], y: f32[n]):
+    assert n % 4 == 0
+    for io in seq(0, n / 4):
+        ukernel(A[4 * io : 4 * io + 4, 0:4], x[0:4], y[4 * io : 4 * io + 4])
+        ukernel(A[4 * io : 4 * io + 4, 4:8], x[4:8], y[4 * io : 4 * io + 4])
+
+
+_MAIN = """
+#include <stdio.h>
+#include <stdlib.h>
+#include <time.h>
+#include "kernels.h"
+
+static double now(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec * 1e-9;
+}
+
+int main(int argc, char **argv) {
+    int n = atoi(argv[1]), reps = atoi(argv[2]);
+    float *A = malloc(sizeof(float) * n * 8);
+    float *x = malloc(sizeof(float) * 8);
+    float *y = malloc(sizeof(float) * n);
+    for (int i = 0; i < n * 8; i++) A[i] = (float)(i % 7);
+    for (int i = 0; i < 8; i++) x[i] = (float)i;
+    for (int i = 0; i < n; i++) y[i] = 0.0f;
+
+    // the best of several runs, since this machine may be noisy
+    double best = 1e9;
+    for (int r = 0; r < 10; r++) {
+        double start = now();
+        for (int k = 0; k < reps / 10; k++) gemv(NULL, n, A, x, y);
+        double t = (now() - start) / (reps / 10);
+        best = t < best ? t : best;
+    }
+    printf("%.9f\\n", best);
+    return 0;
+}
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n", type=int, default=4096)
+    parser.add_argument("--reps", type=int, default=20000)
+    args = parser.parse_args()
+
+    cc = os.environ.get("CC", "cc")
+    conventions = LoopIR_compiler._window_conventions
+    for label, windows in [
+        ("structs", lambda proc_list, exposed: dict()),
+        ("scattered", conventions),
+    ]:
+        LoopIR_compiler._window_conventions = windows
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            compile_procs([gemv], tmp, "kernels.c", "kernels.h")
+            (tmp / "main.c").write_text(_MAIN)
+            for opt in ["-O1", "-O2"]:
+                subprocess.run(
+                    [cc, opt, "kernels.c", "main.c", "-o", "main"],
+                    cwd=tmp,
+                    check=True,
+                )
+                out = subprocess.run(
+                    [tmp / "main", str(args.n), str(args.reps)],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                )
+                print(f"{label:9} {opt}: {float(out.stdout) * 1e6:8.2f} us")
+    LoopIR_compiler._window_conventions = conventions
+
+
+if __name__ == "__main__":
+    main()
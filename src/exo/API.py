@@ -1,4 +1,5 @@
 import ast as pyast
+import dis
 import inspect
 import re
 import types
@@ -17,12 +18,31 @@ from .core.memory import Memory
 from .frontend.parse_fragment import parse_fragment
 from .frontend.pattern_match import match_pattern
 from .core.prelude import *
-from .rewrite.new_eff import Check_Aliasing
+from .rewrite.new_eff import (
+    Check_Aliasing,
+    begin_obligations,
+    end_obligations,
+    discharge_obligations,
+)
 
 # Moved to new file
-from .core.proc_eqv import decl_new_proc, derive_proc, assert_eqv_proc, check_eqv_proc
-from .frontend.pyparser import get_ast_from_python, Parser, get_parent_scope
+from .core.proc_eqv import (
+    decl_new_proc,
+    derive_proc,
+    assert_eqv_proc,
+    check_eqv_proc,
+    snapshot_eqv,
+    restore_eqv,
+)
+from .frontend.pyparser import (
+    get_ast_from_python,
+    Parser,
+    get_parent_scope,
+    DummyScope,
+    UNQUOTE_BLOCK_KEYWORD,
+)
 from .frontend.typecheck import TypeChecker
+from .frontend import proc_cache
 
 from . import API_cursors as C
 from .core import internal_cursors as IC
@@ -36,17 +56,8 @@ def proc(f, _instr=None) -> "Procedure":
     if not isinstance(f, types.FunctionType):
         raise TypeError("@proc decorator must be applied to a function")
 
-    body, src_info = get_ast_from_python(f)
-    assert isinstance(body, pyast.FunctionDef)
-
-    parser = Parser(
-        body,
-        src_info,
-        parent_scope=get_parent_scope(depth=3 if _instr else 2),
-        instr=_instr,
-        as_func=True,
-    )
-    return Procedure(parser.result())
+    parent_scope = get_parent_scope(depth=3 if _instr else 2)
+    return Procedure(_load_proc(f, _instr, parent_scope))
 
 
 def instr(c_instr, c_global=""):
@@ -57,11 +68,90 @@ def instr(c_instr, c_global=""):
         if not isinstance(f, types.FunctionType):
             raise TypeError("@instr decorator must be applied to a function")
 
+        # Platform libraries define many more instructions than any one
+        # program uses, so unless the definition runs metaprogramming code
+        # (which must happen right away) we postpone parsing and checking it
+        # until the instruction is first used.
+        if not _may_run_python(f):
+            parent_scope = get_parent_scope(depth=2)
+            return Procedure(_LazyProc(f, (c_instr, c_global), parent_scope))
+
         return proc(f, _instr=(c_instr, c_global))
 
     return inner
 
 
+def _load_proc(f, instr, parent_scope):
+    """
+    Parse and check the definition `f`, unless the resulting LoopIR can be
+    loaded from the procedure cache (see `frontend.proc_cache`).
+    """
+    body, src_info = get_ast_from_python(f)
+    assert isinstance(body, pyast.FunctionDef)
+
+    key = None
+    if proc_cache.cache_dir() and not _may_run_python(f):
+        key = proc_cache.proc_cache_key(body, src_info, instr, parent_scope)
+        if key and (cached := proc_cache.load_proc(key)):
+            return cached
+
+    parser = Parser(
+        body,
+        src_info,
+        parent_scope=parent_scope,
+        instr=instr,
+        as_func=True,
+    )
+    proc = _check_uast_proc(parser.result())
+
+    if key:
+        proc_cache.store_proc(key, proc)
+    return proc
+
+
+def _may_run_python(f):
+    """
+    Conservatively check whether parsing `f` as an Exo procedure could
+    evaluate metaprogramming code, i.e. `with python:` blocks or `{...}`
+    unquotes in its body or its annotations.
+    """
+    build_set = dis.opmap["BUILD_SET"]
+    code = f.__code__
+    return (
+        UNQUOTE_BLOCK_KEYWORD in code.co_names
+        or any(isinstance(c, types.CodeType) for c in code.co_consts)
+        or any(op == build_set for op in code.co_code[::2])
+        or not all(
+            isinstance(a, str) and "{" not in a for a in f.__annotations__.values()
+        )
+    )
+
+
+class _LazyProc:
+    """
+    A procedure definition whose parsing has been postponed.  Since the
+    definition is not parsed until later, it keeps a snapshot of the scope
+    that it was defined in.
+    """
+
+    def __init__(self, f, instr, parent_scope):
+        self.f = f
+        self.instr = instr
+        self.parent_scope = DummyScope(
+            dict(parent_scope.get_globals()), parent_scope.read_locals()
+        )
+
+    def materialize(self):
+        return _load_proc(self.f, self.instr, self.parent_scope)
+
+
+def _check_uast_proc(proc):
+    proc = TypeChecker(proc).get_loopir()
+    CheckBounds(proc)
+    Check_Aliasing(proc)
+    return proc
+
+
 def config(_cls=None, *, readwrite=True):
     def parse_config(cls):
         if not inspect.isclass(cls):
@@ -84,6 +174,93 @@ def config(_cls=None, *, readwrite=True):
         return parse_config(_cls)
 
 
+def transaction(proc, parallel=False) -> "Transaction":
+    """
+    Open a scheduling transaction on `proc`, for use as
+
+        with transaction(p) as t:
+            p = divide_loop(p, ...)
+            p = reorder_loops(p, ...)
+
+    Inside of the transaction, scheduling operations apply their rewrites
+    right away, but queue their safety checks.  When the block exits, the
+    queued checks are verified in one batch (in parallel worker processes if
+    `parallel` is set).  If any check fails, the whole transaction is rolled
+    back and a SchedulingError naming the failing check is raised.
+
+    After a successful commit, `t.proc` is the last procedure derived from
+    `proc` inside of the transaction.  After a rollback it is `proc` itself.
+    Note that because checks are deferred, scheduling operations inside of a
+    transaction do not raise on failed safety checks, so code which catches
+    SchedulingError to try an alternative rewrite should not be run inside
+    of one.
+    """
+    if not isinstance(proc, Procedure):
+        raise TypeError("transaction() expects a Procedure")
+    return Transaction(proc, parallel)
+
+
+_open_transactions = []
+
+
+class Transaction:
+    def __init__(self, proc, parallel=False):
+        self.proc = proc
+        self.parallel = parallel
+        self._latest = proc
+        self._members = {id(proc): proc}
+        self._obligations = None
+        self._eqv_snapshot = None
+
+    def __enter__(self):
+        if self._obligations is not None:
+            raise ValueError("cannot re-enter a transaction")
+        self._eqv_snapshot = snapshot_eqv()
+        self._obligations = begin_obligations()
+        _open_transactions.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        assert _open_transactions[-1] is self
+        _open_transactions.pop()
+        obligations = end_obligations(self._obligations)
+
+        if exc_type is not None:
+            self._rollback()
+            return False
+
+        try:
+            failure = discharge_obligations(obligations, parallel=self.parallel)
+        except BaseException:
+            # e.g. a solver error, so the rewrites were not verified
+            self._rollback()
+            raise
+
+        if failure:
+            self._rollback()
+            obligation, err = failure
+            raise SchedulingError(
+                f"transaction rolled back; {obligation} failed", error=err
+            ) from err
+
+        self.proc = self._latest
+        return False
+
+    def _rollback(self):
+        restore_eqv(self._eqv_snapshot)
+        self._latest = self.proc
+
+    def _record(self, proc):
+        prov = proc._provenance_eq_Procedure
+        if prov is not None and id(prov) in self._members:
+            self._members[id(proc)] = proc
+            self._latest = proc
+
+    def pending(self):
+        """the number of safety checks queued so far"""
+        return len(self._obligations or [])
+
+
 # --------------------------------------------------------------------------- #
 # --------------------------------------------------------------------------- #
 #   iPython Display Object
@@ -120,18 +297,17 @@ class FindBefore(LoopIR.LoopIR_Do):
 class FindDup(LoopIR.LoopIR_Do):
     def __init__(self, proc):
         self.result = False
-        self.env = []
+        self.env = set()
         super().__init__(proc)
 
     def result(self):
         return self.result
 
     def do_s(self, s):
-        for e in self.env:
-            if s is e:
-                self.result = True
-                print(s)
-        self.env.append(s)
+        if id(s) in self.env:
+            self.result = True
+            print(s)
+        self.env.add(id(s))
 
         super().do_s(s)
 
@@ -143,14 +319,139 @@ class FindDup(LoopIR.LoopIR_Do):
 
 def compile_procs(proc_list, basedir: Path, c_file: str, h_file: str):
     c_data, h_data = compile_procs_to_strings(proc_list, h_file)
-    (basedir / c_file).write_text(c_data)
-    (basedir / h_file).write_text(h_data)
+    _write_if_changed(basedir / c_file, c_data)
+    _write_if_changed(basedir / h_file, h_data)
+
+
+def _write_if_changed(path: Path, data: str):
+    # leave unchanged outputs untouched, so that their timestamps do not
+    # trigger rebuilds of everything that depends on them
+    try:
+        if path.read_text() == data:
+            return
+    except (OSError, ValueError):
+        pass
+    path.write_text(data)
 
 
 def compile_procs_to_strings(proc_list, h_file_name: str):
     assert isinstance(proc_list, list)
-    assert all(isinstance(p, Procedure) for p in proc_list)
-    return run_compile([p._loopir_proc for p in proc_list], h_file_name)
+    assert all(isinstance(p, (Procedure, CPUDispatch)) for p in proc_list)
+    return run_compile(
+        [p._loopir_proc for p in proc_list if isinstance(p, Procedure)],
+        h_file_name,
+        dispatches=[p._dispatch for p in proc_list if isinstance(p, CPUDispatch)],
+    )
+
+
+def interpret(proc, *args, configs=None, **kwargs):
+    """
+    Run `proc` on NumPy arrays with the reference interpreter, without
+    compiling it.  The arguments are passed as to the callable returned by
+    `Procedure.jit()`, and buffers which `proc` writes are updated in place.
+
+    `configs` is a dictionary from pairs `(config, field)` to the values of
+    configuration fields before the call, and is updated with the values
+    that `proc` writes.
+    """
+    from .backend.LoopIR_interpreter import run_interpreter
+
+    if not isinstance(proc, Procedure):
+        raise TypeError("interpret() expects a Procedure")
+    run_interpreter(proc._loopir_proc, args, kwargs, configs)
+
+
+def bench(proc, sizes, flops=None, **kwargs):
+    """
+    Time `proc` for each of `sizes` with a generated C driver, and return
+    the results as Google Benchmark JSON (see `exo.benchmark.bench`)
+    """
+    from .benchmark import bench
+
+    return bench(proc, sizes, flops, **kwargs)
+
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# CPU feature dispatch
+
+_cpu_features_re = re.compile(r"[a-z0-9_.\-]+(,[a-z0-9_.\-]+)*")
+
+
+def cpu_dispatch(proc, variants) -> "CPUDispatch":
+    """
+    Make a public procedure, named like `proc`, which runs the first of
+    `variants` whose CPU features are all supported by the CPU that it runs
+    on, or `proc` if there is none.  The result can be passed to
+    `compile_procs` in place of a procedure.
+
+    `variants` is a dictionary, in order of preference, from features to
+    procedures with the same arguments as `proc`, usually scheduled with the
+    instructions of an ISA.  Features are comma-separated names accepted by
+    `__builtin_cpu_supports`, such as "avx2,fma" or "avx512f".  Each variant,
+    and the procedures only it calls, is compiled with
+    `__attribute__((target(features)))`, so the library itself needs no
+    flags such as -mavx2.  `proc` is compiled as `{name}_generic`.
+
+    The choice is made on the first call and kept in a function pointer.
+    Setting the environment variable EXO_OVERRIDE_CPUINFO to a list of
+    feature names replaces the features of the CPU, as it does in the tests.
+    """
+    if not isinstance(proc, Procedure) or proc.is_instr():
+        raise TypeError("cpu_dispatch() expects a Procedure")
+    return CPUDispatch(proc, variants)
+
+
+class CPUDispatch:
+    def __init__(self, proc, variants):
+        if not variants:
+            raise ValueError("cpu_dispatch() expects at least one variant")
+
+        fallback = proc._loopir_proc
+        name = fallback.name
+        self._name = name
+        self._proc = proc
+        self._variants = dict(variants)
+
+        dispatch = []
+        for features, v in self._variants.items():
+            if not isinstance(features, str) or not _cpu_features_re.fullmatch(
+                features
+            ):
+                raise ValueError(f"invalid CPU features {features!r} for {name}")
+            if not isinstance(v, Procedure) or v.is_instr():
+                raise TypeError(f"variant of {name} for {features} is not a proc")
+            _check_variant(fallback, v._loopir_proc)
+            dispatch.append((features, v._loopir_proc))
+        dispatch.append((None, fallback.update(name=f"{name}_generic")))
+        self._dispatch = (name, dispatch)
+
+    def name(self):
+        return self._name
+
+    def proc(self):
+        return self._proc
+
+    def variants(self):
+        return dict(self._variants)
+
+    def __str__(self):
+        features = ", ".join(
+            f"{features}: {v.name()}" for features, v in self._variants.items()
+        )
+        return f"cpu_dispatch({self._name}, {{{features}}})"
+
+
+def _check_variant(proc, variant):
+    def signature(p):
+        writes = {nm for nm, _ in LoopIR.get_writes_of_stmts(p.body)}
+        return [(str(a.type), a.mem and a.mem.name(), a.name in writes) for a in p.args]
+
+    if signature(proc) != signature(variant):
+        raise TypeError(
+            f"{variant.name} is not a variant of {proc.name}: they must have "
+            f"the same argument types and memories, and write the same arguments"
+        )
 
 
 class Procedure(ProcedureBase):
@@ -165,10 +466,23 @@ class Procedure(ProcedureBase):
 
         _mod_config = _mod_config or frozenset()
 
+        if _forward is None:
+
+            def _forward(_):
+                raise NotImplementedError(
+                    "This forwarding function has not been implemented"
+                )
+
+        self._provenance_eq_Procedure = _provenance_eq_Procedure
+        self._forward = _forward
+
+        if isinstance(proc, _LazyProc):
+            # see __getattr__
+            self._lazy_proc = proc
+            return
+
         if isinstance(proc, LoopIR.UAST.proc):
-            proc = TypeChecker(proc).get_loopir()
-            CheckBounds(proc)
-            Check_Aliasing(proc)
+            proc = _check_uast_proc(proc)
 
         assert isinstance(proc, LoopIR.LoopIR.proc)
 
@@ -180,16 +494,26 @@ class Procedure(ProcedureBase):
         else:
             decl_new_proc(proc)
 
-        if _forward is None:
+        self._loopir_proc = proc
 
-            def _forward(_):
-                raise NotImplementedError(
-                    "This forwarding function has not been implemented"
-                )
+        for t in _open_transactions:
+            t._record(self)
 
-        self._loopir_proc = proc
-        self._provenance_eq_Procedure = _provenance_eq_Procedure
-        self._forward = _forward
+    def __getattr__(self, name):
+        # only called when `name` is not found normally, i.e. for a
+        # procedure whose definition has not been parsed yet
+        if name == "_loopir_proc" and "_lazy_proc" in self.__dict__:
+            # the definition is only dropped once it has been checked, so that
+            # a definition with errors raises them on every use
+            proc = self.__dict__["_lazy_proc"].materialize()
+            decl_new_proc(proc)
+            self._loopir_proc = proc
+            del self.__dict__["_lazy_proc"]
+            return proc
+
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{name}'"
+        )
 
     def forward(self, cur: C.Cursor):
         p = self
@@ -210,6 +534,8 @@ class Procedure(ProcedureBase):
     def __eq__(self, other):
         if not isinstance(other, Procedure):
             return False
+        if self._loopir_proc is other._loopir_proc:
+            return True
         return self._loopir_proc == other._loopir_proc
 
     def _repr_markdown_(self):
@@ -300,6 +626,50 @@ class Procedure(ProcedureBase):
     def compile_c(self, directory: Path, filename: str):
         compile_procs([self], directory, f"{filename}.c", f"{filename}.h")
 
+    def jit(self, cc=None, cflags=None):
+        """
+        Compile the procedure with the C compiler into a shared library, and
+        return a callable which runs it on NumPy arrays (see `exo.jit`)
+        """
+        from .jit import jit
+
+        return jit(self, cc=cc, cflags=cflags)
+
+    def work_stats(self, **sizes):
+        """
+        Count the arithmetic, the loads and stores, the instruction calls and
+        the footprints of the procedure, as polynomials in the sizes which are
+        not given by name (see `exo.rewrite.work_analysis.WorkStats`)
+        """
+        from .rewrite.work_analysis import work_stats
+
+        p = self._loopir_proc
+        names = {str(a.name) for a in p.args if not a.type.is_numeric()}
+        for nm in sizes:
+            if nm not in names:
+                raise ValueError(
+                    f"{p.name}() has no size, index or stride argument {nm}"
+                )
+        return work_stats(p).subs(**sizes)
+
+    def cache_stats(self, caches=None, simulate=False, **sizes):
+        """
+        Estimate the misses of the procedure in each level of `caches` (a
+        sequence of `exo.rewrite.cache_analysis.Cache`), given the values of
+        all its sizes by name, and simulate them exactly if `simulate` is set
+        (see `exo.rewrite.cache_analysis.CacheStats`)
+        """
+        from .rewrite.cache_analysis import cache_stats, DEFAULT_CACHES
+
+        p = self._loopir_proc
+        names = {str(a.name) for a in p.args if not a.type.is_numeric()}
+        for nm in sizes:
+            if nm not in names:
+                raise ValueError(
+                    f"{p.name}() has no size, index or stride argument {nm}"
+                )
+        return cache_stats(p, sizes, caches or DEFAULT_CACHES, simulate)
+
     # ------------------------------- #
     #     scheduling operations
     # ------------------------------- #
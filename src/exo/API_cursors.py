@@ -7,7 +7,7 @@ from typing import List, Any
 
 from . import API  # TODO: remove this circular import
 from .API_types import ExoType, loopir_type_to_exotype
-from .core.LoopIR import LoopIR
+from .core.LoopIR import LoopIR, struct_eq
 from .core.configs import Config
 from .core.memory import Memory
 
@@ -417,6 +417,17 @@ class ExprCursor(ExprCursorPrototype):
         assert isinstance(self._impl._node, LoopIR.expr)
         return loopir_type_to_exotype(self._impl._node.type.basetype())
 
+    def is_structurally_equal(self, other: ExprCursor) -> bool:
+        """
+        Returns True if this expression and the other one are the same
+        expression, ignoring source locations.  This is a constant-time
+        check once the expressions have been compared before.
+        """
+        assert isinstance(self._impl, C.Node)
+        assert isinstance(other._impl, C.Node)
+
+        return struct_eq(self._impl._node, other._impl._node)
+
 
 class ExprListCursor(ListCursorPrototype):
     """
@@ -14,6 +14,7 @@ import exo.rewrite.LoopIR_scheduling as scheduling
 from .API_types import ExoType
 
 from .rewrite.LoopIR_unification import DoReplace, UnificationError
+from .rewrite.new_eff import sched_op_obligations
 from .core.configs import Config
 from .core.memory import Memory
 from .frontend.parse_fragment import parse_fragment
@@ -97,7 +98,8 @@ class AtomicSchedulingOp:
             bargs[nm] = argp(bargs[nm], bargs)
 
         # invoke the scheduling function with the modified arguments
-        return self.func(*bound_args.args, **bound_args.kwargs)
+        with sched_op_obligations(self.__name__):
+            return self.func(*bound_args.args, **bound_args.kwargs)
 
 
 # decorator for building Atomic Scheduling Operations in the
@@ -179,6 +181,30 @@ class ConfigFieldA(ArgumentProcessor):
         return field
 
 
+class NumThreadsA(ArgumentProcessor):
+    def __call__(self, val, all_args):
+        if is_pos_int(val):
+            return LoopIR.Const(val, T.int, null_srcinfo())
+        elif (
+            isinstance(val, tuple)
+            and len(val) == 2
+            and isinstance(val[0], Config)
+            and isinstance(val[1], str)
+        ):
+            config, field = val
+            if not config.has_field(field):
+                self.err(
+                    f"expected '{field}' to be a field of config '{config.name()}'",
+                    ValueError,
+                )
+            typ = config.lookup_type(field)
+            if not typ.is_indexable():
+                self.err(f"expected '{config.name()}.{field}' to be an integer field")
+            return LoopIR.ReadConfig(config, field, typ, null_srcinfo())
+        else:
+            self.err("expected a positive integer or a (config, field) pair")
+
+
 class NameA(ArgumentProcessor):
     def __call__(self, name, all_args):
         if not is_valid_name(name):
@@ -793,8 +819,16 @@ def simplify(proc):
     to constants and eliminate dead branches and loops. Uses branch
     conditions to simplify expressions inside the branches.
     """
+    # nothing changed since the last time this procedure was simplified
+    if scheduling.is_simplified(proc._loopir_proc):
+        return proc
+
+    simplified = scheduling.DoSimplify(proc)
+    if simplified.ir is proc._loopir_proc:
+        return proc
+
     # TODO: remove provenance handling from simplifier implementation
-    return scheduling.DoSimplify(proc).result()
+    return simplified.result()
 
 
 @sched_op([NameA])
@@ -893,11 +927,43 @@ def reorder_stmts(proc, block_cursor):
     return Procedure(ir, _provenance_eq_Procedure=proc, _forward=fwd)
 
 
-@sched_op([ForCursorA])
-def parallelize_loop(proc, loop_cursor):
+@sched_op(
+    [
+        ForCursorA,
+        OptionalA(EnumA(["static", "dynamic", "guided", "auto", "runtime"])),
+        OptionalA(PosIntA),
+        PosIntA,
+        OptionalA(NumThreadsA),
+    ]
+)
+def parallelize_loop(
+    proc, loop_cursor, schedule=None, chunk=None, collapse=1, num_threads=None
+):
+    """
+    Turn a loop into a parallel loop, compiled to an OpenMP parallel for.
+    Whether the iterations of the loop may run in parallel is checked when
+    compiling the procedure.  Buffers which the loop only reduces into are
+    privatized by a parallel reduction when that is needed.
+
+    args:
+        loop_cursor     - cursor pointing to the loop to parallelize
+        schedule        - OpenMP schedule kind of the loop
+        chunk           - chunk size of the schedule
+        collapse        - number of perfectly nested loops, starting from
+                          this one, to parallelize together
+        num_threads     - number of threads to run the loop with, either a
+                          positive integer or a `(config, field)` pair
+
+    rewrite:
+        `for i in seq(lo, hi):`
+        `    s`
+        ->
+        `for i in par(lo, hi):`
+        `    s`
+    """
     loop = loop_cursor._impl
 
-    ir, fwd = scheduling.DoParallelizeLoop(loop)
+    ir, fwd = scheduling.DoParallelizeLoop(loop, schedule, chunk, collapse, num_threads)
     return Procedure(ir, _provenance_eq_Procedure=proc, _forward=fwd)
 
 
@@ -1,10 +1,14 @@
 from .API import (
     Procedure,
+    bench,
     compile_procs,
     compile_procs_to_strings,
+    cpu_dispatch,
+    interpret,
     proc,
     instr,
     config,
+    transaction,
     ExoType,
 )
 from .rewrite.LoopIR_scheduling import SchedulingError
@@ -19,11 +23,15 @@ __version__ = "1.0.0"
 
 __all__ = [
     "Procedure",
+    "bench",
     "compile_procs",
     "compile_procs_to_strings",
+    "cpu_dispatch",
+    "interpret",
     "proc",
     "instr",
     "config",
+    "transaction",
     "Config",
     "Memory",
     "Extern",
@@ -7,6 +7,8 @@ from dataclasses import dataclass
 from pathlib import Path
 
 from ..core.LoopIR import LoopIR, LoopIR_Do, get_writes_of_stmts, T, CIR
+from ..frontend.proc_cache import cache_dir
+from .codegen_cache import codegen_cache_key, load_compiled, store_compiled
 from ..core.configs import ConfigError
 from .mem_analysis import MemoryAnalysis
 from ..core.memory import MemGenError, Memory, DRAM, StaticMemory
@@ -14,7 +16,7 @@ from .parallel_analysis import ParallelAnalysis
 from .prec_analysis import PrecisionAnalysis
 from ..core.prelude import *
 from .win_analysis import WindowAnalysis
-from ..rewrite.range_analysis import IndexRangeEnvironment
+from ..rewrite.range_analysis import IndexRangeEnvironment, constant_bound
 
 
 def sanitize_str(s):
@@ -215,6 +217,26 @@ class LoopIR_FindExterns(LoopIR_Do):
         pass
 
 
+class LoopIR_FindExternFns(LoopIR_Do):
+    """Like LoopIR_FindExterns, but does not need the types to be known"""
+
+    def __init__(self, proc):
+        self._externs = set()
+        super().__init__(proc)
+
+    def result(self):
+        return self._externs
+
+    def do_e(self, e):
+        if isinstance(e, LoopIR.Extern):
+            self._externs.add(e.f)
+        else:
+            super().do_e(e)
+
+    def do_t(self, t):
+        pass
+
+
 class LoopIR_FindConfigs(LoopIR_Do):
     def __init__(self, proc):
         self._configs = set()
@@ -263,6 +285,68 @@ def find_all_configs(proc_list):
     return list(configs)
 
 
+def _binops(e):
+    if isinstance(e, LoopIR.BinOp):
+        yield e.op
+        yield from _binops(e.lhs)
+        yield from _binops(e.rhs)
+    elif isinstance(e, LoopIR.USub):
+        yield from _binops(e.arg)
+
+
+def _conjuncts(e):
+    """Comparisons which hold whenever the predicate `e` holds"""
+    if isinstance(e, LoopIR.BinOp) and e.op == "and":
+        yield from _conjuncts(e.lhs)
+        yield from _conjuncts(e.rhs)
+    else:
+        yield e
+
+
+_cmp_ops = {
+    "==": lambda x, y: x == y,
+    "<": lambda x, y: x < y,
+    ">": lambda x, y: x > y,
+    "<=": lambda x, y: x <= y,
+    ">=": lambda x, y: x >= y,
+}
+
+
+def _fold_strides(e, strides):
+    """
+    The predicate `e` with the constant `strides`, by (buffer, dimension),
+    substituted, and comparisons of constants, and the logical operators on
+    them, evaluated
+    """
+    if isinstance(e, LoopIR.StrideExpr) and (e.name, e.dim) in strides:
+        return LoopIR.Const(strides[(e.name, e.dim)], T.stride, e.srcinfo)
+    elif isinstance(e, LoopIR.BinOp):
+        lhs = _fold_strides(e.lhs, strides)
+        rhs = _fold_strides(e.rhs, strides)
+        if e.op in ("and", "or"):
+            for a, b in ((lhs, rhs), (rhs, lhs)):
+                if isinstance(a, LoopIR.Const):
+                    # `true and b` and `false or b` are `b`
+                    return b if a.val == (e.op == "and") else a
+        elif (
+            e.op in _cmp_ops
+            and isinstance(lhs, LoopIR.Const)
+            and isinstance(rhs, LoopIR.Const)
+        ):
+            return LoopIR.Const(_cmp_ops[e.op](lhs.val, rhs.val), T.bool, e.srcinfo)
+        return e.update(lhs=lhs, rhs=rhs)
+    return e
+
+
+def _is_stride_fact(e):
+    return (
+        isinstance(e, LoopIR.BinOp)
+        and e.op == "=="
+        and isinstance(e.lhs, LoopIR.StrideExpr)
+        and isinstance(e.rhs, LoopIR.Const)
+    )
+
+
 # --------------------------------------------------------------------------- #
 # --------------------------------------------------------------------------- #
 
@@ -273,15 +357,21 @@ class WindowStruct:
     definition: str
 
 
+# Window arguments never alias each other (see `Check_Aliasing`), so their
+# data pointers are restrict-qualified.  Windows held in local variables
+# alias the buffers they were taken from, and get a separate struct type
+# without the qualifier.
 @functools.cache
-def _window_struct(typename, ctype, n_dims, is_const) -> WindowStruct:
+def _window_struct(typename, ctype, n_dims, is_const, is_local) -> WindowStruct:
     const_kwd = "const " if is_const else ""
     const_suffix = "c" if is_const else ""
+    local_suffix = "_local" if is_local else ""
+    restrict_kwd = "" if is_local else "EXO_RESTRICT "
 
-    sname = f"exo_win_{n_dims}{typename}{const_suffix}"
+    sname = f"exo_win_{n_dims}{typename}{const_suffix}{local_suffix}"
     sdef = (
         f"struct {sname}{{\n"
-        f"    {const_kwd}{ctype} * const data;\n"
+        f"    {const_kwd}{ctype} * {restrict_kwd}const data;\n"
         f"    const int_fast32_t strides[{n_dims}];\n"
         f"}};"
     )
@@ -295,7 +385,7 @@ def _window_struct(typename, ctype, n_dims, is_const) -> WindowStruct:
     return WindowStruct(sname, sdef)
 
 
-def window_struct(base_type, n_dims, is_const) -> WindowStruct:
+def window_struct(base_type, n_dims, is_const, is_local=False) -> WindowStruct:
     assert n_dims >= 1
 
     _window_struct_shorthand = {
@@ -309,7 +399,11 @@ def window_struct(base_type, n_dims, is_const) -> WindowStruct:
     }
 
     return _window_struct(
-        _window_struct_shorthand[base_type], base_type.ctype(), n_dims, is_const
+        _window_struct_shorthand[base_type],
+        base_type.ctype(),
+        n_dims,
+        is_const,
+        is_local,
     )
 
 
@@ -320,10 +414,10 @@ def window_struct(base_type, n_dims, is_const) -> WindowStruct:
 # top level compiler function called by tests!
 
 
-def run_compile(proc_list, h_file_name: str):
+def run_compile(proc_list, h_file_name: str, dispatches=()):
     file_stem = str(Path(h_file_name).stem)
     lib_name = sanitize_str(file_stem)
-    fwd_decls, body = compile_to_strings(lib_name, proc_list)
+    fwd_decls, body = compile_to_strings(lib_name, proc_list, dispatches=dispatches)
 
     source = f'#include "{h_file_name}"\n\n{body}'
 
@@ -357,39 +451,108 @@ _static_helpers = {
         }
         """
     ),
+    "exo_cpu_supports": textwrap.dedent(
+        """
+        #include <stdlib.h>
+        #include <string.h>
+
+        #if defined(__GNUC__) || defined(__clang__)
+        #  define EXO_TARGET(features) __attribute__((target(features)))
+        #else
+        #  define EXO_TARGET(features)
+        #endif
+
+        #if (defined(__GNUC__) || defined(__clang__)) && \\
+            (defined(__x86_64__) || defined(__i386__))
+        #  define EXO_CPU_SUPPORTS(feature) \\
+              exo_cpu_supports(feature, __builtin_cpu_supports(feature))
+        #else
+        #  define EXO_CPU_SUPPORTS(feature) exo_cpu_supports(feature, 0)
+        #endif
+
+        // EXO_OVERRIDE_CPUINFO replaces the features of the CPU with a list
+        // of feature names, as in the flags of /proc/cpuinfo
+        static int exo_cpu_supports(const char *feature, int supported) {
+          const char *flags = getenv("EXO_OVERRIDE_CPUINFO");
+          if (!flags) return supported;
+          size_t n = strlen(feature);
+          for (const char *p = strstr(flags, feature); p; p = strstr(p + 1, feature)) {
+            if ((p == flags || p[-1] == ' ') && (p[n] == ' ' || p[n] == '\\0'))
+              return 1;
+          }
+          return 0;
+        }
+        """
+    ),
 }
 
 
-def compile_to_strings(lib_name, proc_list):
+def compile_to_strings(lib_name, proc_list, dispatches=()):
+    """
+    Compile the procedures in `proc_list`, and all the procedures that they
+    call, to the contents of a header and a source file.
+
+    `dispatches` are pairs `(name, variants)` of public procedures which
+    run the first of `variants`, a list of `(features, proc)` pairs, whose
+    CPU features are supported (see `API.cpu_dispatch`).  The variants are
+    compiled as private procedures for their features.
+    """
     # Get transitive closure of call-graph
     orig_procs = [id(p) for p in proc_list]
+    targets = _dispatch_targets(proc_list, dispatches)
+    variants = [v for _, vs in dispatches for _, v in vs]
+    exposed = {p.name for p in proc_list} | {v.name for v in variants}
+    proc_list = list(proc_list) + variants
 
     def from_lines(x):
         return "\n".join(x)
 
     proc_list = list(sorted(find_all_subprocs(proc_list), key=lambda x: x.name))
+    windows = _window_conventions(proc_list, exposed)
+
+    mems = find_all_mems(proc_list)
 
     # Header contents
-    ctxt_name, ctxt_def = _compile_context_struct(find_all_configs(proc_list), lib_name)
+    ctxt_name, ctxt_def = _compile_context_struct(
+        find_all_configs(proc_list), mems, lib_name
+    )
     struct_defns = set()
     public_fwd_decls = []
 
     # Body contents
-    memory_code = _compile_memories(find_all_mems(proc_list))
+    memory_code = _compile_memories(mems)
     private_fwd_decls = []
     proc_bodies = []
     instrs_global = []
-    analyzed_proc_list = []
+    externs = set()
 
     needed_helpers = set()
 
-    # Compile proc bodies
     seen_procs = set()
-    for p in proc_list:
-        if p.name in seen_procs:
-            raise TypeError(f"multiple procs named {p.name}")
-        seen_procs.add(p.name)
+    for name in [p.name for p in proc_list] + [name for name, _ in dispatches]:
+        if name in seen_procs:
+            raise TypeError(f"multiple procs named {name}")
+        seen_procs.add(name)
+
+    # Compile proc bodies, reusing cached code for unchanged procs
+    cache_keys = dict()
+    compiled = dict()
+    if cache_dir():
+        for p in proc_list:
+            if p.instr is None:
+                key = codegen_cache_key(
+                    p,
+                    ctxt_name,
+                    id(p) in orig_procs,
+                    targets.get(p.name),
+                    _windows_used(p, windows),
+                )
+                if key and (result := _load_compiled(key, p)):
+                    compiled[p.name] = result
+                elif key:
+                    cache_keys[p.name] = key
 
+    for p in proc_list:
         # don't compile instruction procedures, but add a comment.
         if p.instr is not None:
             argstr = ",".join([str(a.name) for a in p.args])
@@ -407,15 +570,16 @@ def compile_to_strings(lib_name, proc_list):
         else:
             is_public_decl = id(p) in orig_procs
 
-            p = ParallelAnalysis().run(p)
-            p = PrecisionAnalysis().run(p)
-            p = WindowAnalysis().apply_proc(p)
-            p = MemoryAnalysis().run(p)
-
-            comp = Compiler(p, ctxt_name, is_public_decl=is_public_decl)
-            d, b = comp.comp_top()
-            struct_defns |= comp.struct_defns()
-            needed_helpers |= comp.needed_helpers()
+            if (result := compiled.get(p.name)) is None:
+                result = _compile_proc(
+                    p, ctxt_name, is_public_decl, targets.get(p.name), windows
+                )
+            if p.name in cache_keys:
+                store_compiled(cache_keys[p.name], result)
+            d, b, p_structs, p_helpers, p_externs = result
+            struct_defns |= p_structs
+            needed_helpers |= p_helpers
+            externs |= p_externs
 
             if is_public_decl:
                 public_fwd_decls.append(d)
@@ -424,7 +588,12 @@ def compile_to_strings(lib_name, proc_list):
 
             proc_bodies.append(b)
 
-            analyzed_proc_list.append(p)
+    for name, variants in dispatches:
+        d, b, p_structs, p_helpers = _compile_dispatch(name, variants, ctxt_name)
+        struct_defns |= p_structs
+        needed_helpers |= p_helpers
+        public_fwd_decls.append(d)
+        proc_bodies.append(b)
 
     # Structs are just blobs of code... still sort them for output stability
     struct_defns = [x.definition for x in sorted(struct_defns, key=lambda x: x.name)]
@@ -442,13 +611,31 @@ def compile_to_strings(lib_name, proc_list):
 #  define EXO_HAS_BUILTIN(builtin) (0)
 #endif
 
-#if EXO_HAS_BUILTIN(__builtin_assume)
-#  define EXO_ASSUME(expr) __builtin_assume(expr)
-#elif EXO_HAS_BUILTIN(__builtin_unreachable)
-#  define EXO_ASSUME(expr) \\
-      ((void)((expr) ? 1 : (__builtin_unreachable(), 1)))
-#else
-#  define EXO_ASSUME(expr) ((void)(expr))
+#ifndef EXO_ASSUME
+#  if EXO_HAS_BUILTIN(__builtin_assume)
+#    define EXO_ASSUME(expr) __builtin_assume(expr)
+#  elif EXO_HAS_BUILTIN(__builtin_unreachable)
+#    define EXO_ASSUME(expr) \\
+        ((void)((expr) ? 1 : (__builtin_unreachable(), 1)))
+#  else
+#    define EXO_ASSUME(expr) ((void)(expr))
+#  endif
+#endif
+
+#ifndef EXO_ASSUME_ALIGNED
+#  if EXO_HAS_BUILTIN(__builtin_assume_aligned)
+#    define EXO_ASSUME_ALIGNED(ptr, n) __builtin_assume_aligned((ptr), (n))
+#  else
+#    define EXO_ASSUME_ALIGNED(ptr, n) (ptr)
+#  endif
+#endif
+
+#ifndef EXO_RESTRICT
+#  if defined(__cplusplus)
+#    define EXO_RESTRICT __restrict
+#  else
+#    define EXO_RESTRICT restrict
+#  endif
 #endif
 
 {from_lines(ctxt_def)}
@@ -456,9 +643,9 @@ def compile_to_strings(lib_name, proc_list):
 {from_lines(public_fwd_decls)}
 """
 
-    extern_code = _compile_externs(find_all_externs(analyzed_proc_list))
+    extern_code = _compile_externs(externs)
 
-    helper_code = [_static_helpers[v] for v in needed_helpers]
+    helper_code = [_static_helpers[v] for v in sorted(needed_helpers)]
     body_contents = [
         helper_code,
         instrs_global,
@@ -474,6 +661,182 @@ def compile_to_strings(lib_name, proc_list):
     return header_contents, body_contents
 
 
+def _compile_proc(p, ctxt_name, is_public_decl, target=None, windows=None):
+    parallel = ParallelAnalysis()
+    p = parallel.run(p)
+    p = PrecisionAnalysis().run(p)
+    p = WindowAnalysis().apply_proc(p)
+    mem = MemoryAnalysis()
+    p = mem.run(p)
+
+    comp = Compiler(
+        p,
+        ctxt_name,
+        is_public_decl=is_public_decl,
+        reductions=parallel.reductions,
+        mem_plan=mem.plan,
+        target=target,
+        windows=windows,
+    )
+    d, b = comp.comp_top()
+    return d, b, comp.struct_defns(), comp.needed_helpers(), find_all_externs([p])
+
+
+def _load_compiled(key, p):
+    extern_fns = {f.name(): f for f in LoopIR_FindExternFns(p).result()}
+    return load_compiled(key, extern_fns)
+
+
+def _dispatch_targets(proc_list, dispatches):
+    """
+    Returns a dictionary from the names of procedures which are only called,
+    directly or not, by variants for the same CPU features, to those features.
+    """
+    callers = defaultdict(set)
+    roots = [(None, p) for p in proc_list]
+    roots += [(features, v) for _, variants in dispatches for features, v in variants]
+    for features, root in roots:
+        for p in find_all_subprocs([root]):
+            callers[p.name].add(features)
+
+    return {
+        name: features
+        for name, (features, *others) in callers.items()
+        if features is not None and not others
+    }
+
+
+def _all_stmts(stmts):
+    for s in stmts:
+        yield s
+        if isinstance(s, LoopIR.For):
+            yield from _all_stmts(s.body)
+        elif isinstance(s, LoopIR.If):
+            yield from _all_stmts(s.body)
+            yield from _all_stmts(s.orelse)
+
+
+def _window_conventions(proc_list, exposed):
+    """
+    Returns a dictionary from the names of the procedures with window
+    arguments which are only called by the procedures of `proc_list`, and not
+    in `exposed`, to the strides of those arguments.  These are tuples, by
+    argument, of None for other arguments and of the strides of each
+    dimension of a window: the constant passed by every call, or None.
+    """
+    calls = defaultdict(list)
+    for p in proc_list:
+        if p.instr is None:
+            for s in _all_stmts(p.body):
+                if isinstance(s, LoopIR.Call) and s.f.instr is None:
+                    calls[s.f.name].append((p, s))
+
+    conventions = dict()
+
+    def merge(old, new):
+        return tuple(a if a == b else None for a, b in zip(old, new))
+
+    def known_strides(p):
+        # the strides of the window arguments of `p` which are constant
+        strides = {
+            a.name: [None] * len(a.type.shape()) for a in p.args if a.type.is_win()
+        }
+        for i, a in enumerate(convention(p) or ()):
+            if a is not None:
+                strides[p.args[i].name] = list(a)
+        for pred in p.preds:
+            for fact in _conjuncts(pred):
+                # tensors may assert their strides too, which are known anyway
+                if _is_stride_fact(fact) and fact.lhs.name in strides:
+                    strides[fact.lhs.name][fact.lhs.dim] = fact.rhs.val
+        return strides
+
+    def window_strides(buffers, e):
+        # the strides of the window `e`, passed by a call
+        if isinstance(e, LoopIR.WindowExpr):
+            src = buffer_strides(buffers, e.name)
+            return tuple(
+                s for s, w in zip(src, e.idx) if isinstance(w, LoopIR.Interval)
+            )
+        return buffer_strides(buffers, e.name)
+
+    def buffer_strides(buffers, name):
+        buf = buffers[name]
+        if isinstance(buf, LoopIR.WindowExpr):
+            return window_strides(buffers, buf)
+        elif isinstance(buf, list):
+            return tuple(buf)
+        strides, size = [], 1
+        for hi in reversed(buf.shape()):
+            strides.append(size)
+            if size is not None and isinstance(hi, LoopIR.Const):
+                size *= hi.val
+            else:
+                size = None
+        return tuple(reversed(strides))
+
+    def convention(q):
+        if q.name in exposed or not any(a.type.is_win() for a in q.args):
+            return None
+        if q.name in conventions:
+            return conventions[q.name]
+
+        result = None
+        for p, s in calls[q.name]:
+            # window arguments, local windows and tensors of the caller
+            buffers = known_strides(p)
+            for a in p.args:
+                if a.type.is_tensor_or_window() and not a.type.is_win():
+                    buffers[a.name] = a.type
+            for s2 in _all_stmts(p.body):
+                if isinstance(s2, LoopIR.Alloc):
+                    buffers[s2.name] = s2.type
+                elif isinstance(s2, LoopIR.WindowStmt):
+                    buffers[s2.name] = s2.rhs
+
+            strides = tuple(
+                window_strides(buffers, e) if a.type.is_win() else None
+                for e, a in zip(s.args, q.args)
+            )
+            if result is None:
+                result = strides
+            else:
+                result = tuple(
+                    merge(old, new) if old is not None else None
+                    for old, new in zip(result, strides)
+                )
+        conventions[q.name] = result
+        return result
+
+    for p in proc_list:
+        if p.instr is None:
+            convention(p)
+    return {name: c for name, c in conventions.items() if c is not None}
+
+
+def _windows_used(p, windows):
+    # the calling conventions which the code generated for `p` depends on
+    return tuple(
+        (q.name, windows[q.name])
+        for q in sorted(find_all_subprocs([p]), key=lambda x: x.name)
+        if q.name in windows
+    )
+
+
+def _compile_dispatch(name, variants, ctxt_name):
+    # the dispatcher takes the same arguments as the variants
+    fallback = variants[-1][1]
+    entry = fallback.update(name=name, preds=[])
+    comp = Compiler(
+        entry,
+        ctxt_name,
+        is_public_decl=True,
+        dispatch=[(features, v.name) for features, v in variants],
+    )
+    d, b = comp.comp_top()
+    return d, b, comp.struct_defns(), comp.needed_helpers()
+
+
 def _compile_externs(externs):
     extern_code = []
     for f, t in sorted(externs, key=lambda x: x[0].name() + x[1]):
@@ -489,8 +852,13 @@ def _compile_memories(mems):
     return memory_code
 
 
-def _compile_context_struct(configs, lib_name):
-    if not configs:
+def _compile_context_struct(configs, mems, lib_name):
+    mem_fields = [
+        (m.name(), lines)
+        for m in sorted(mems, key=lambda x: x.name())
+        if (lines := m.ctxt_def())
+    ]
+    if not configs and not mem_fields:
         return "void", []
 
     ctxt_name = f"{lib_name}_Context"
@@ -512,6 +880,11 @@ def _compile_context_struct(configs, lib_name):
         else:
             ctxt_def += [f"// config '{name}' not materialized", ""]
 
+    for name, lines in mem_fields:
+        ctxt_def += [f"    // memory '{name}'"]
+        ctxt_def += [f"    {line}" for line in lines]
+        ctxt_def += [""]
+
     ctxt_def += [f"}} {ctxt_name};"]
     return ctxt_name, ctxt_def
 
@@ -522,11 +895,28 @@ def _compile_context_struct(configs, lib_name):
 
 
 class Compiler:
-    def __init__(self, proc, ctxt_name, *, is_public_decl):
+    def __init__(
+        self,
+        proc,
+        ctxt_name,
+        *,
+        is_public_decl,
+        reductions=None,
+        mem_plan=None,
+        target=None,
+        dispatch=None,
+        windows=None,
+    ):
         assert isinstance(proc, LoopIR.proc)
 
         self.proc = proc
         self.ctxt_name = ctxt_name
+        self.reductions = reductions or dict()
+        self.mem_plan = mem_plan
+        # strides of the window arguments of private procedures, by name
+        self.windows = windows or dict()
+        # number of nested loops still to be collapsed into a parallel loop
+        self._collapsed = 0
         self.env = ChainMap()
         self.range_env = IndexRangeEnvironment(proc, fast=False)
         self.names = ChainMap()
@@ -549,8 +939,10 @@ class Compiler:
         arg_strs.append(f"{ctxt_name} *ctxt")
 
         self.non_const = set(e for e, _ in get_writes_of_stmts(self.proc.body))
+        self._arg_names = set(a.name for a in proc.args)
 
-        for a in proc.args:
+        convention = None if is_public_decl else self.windows.get(name)
+        for i, a in enumerate(proc.args):
             mem = a.mem if a.type.is_numeric() else None
             name_arg = self.new_varname(a.name, typ=a.type, mem=mem)
             if a.type in (T.size, T.index, T.bool, T.stride):
@@ -562,43 +954,79 @@ class Compiler:
                 assert a.type.basetype() != T.R
                 if a.type.is_real_scalar():
                     self._scalar_refs.add(a.name)
-                if a.type.is_win():
+                if a.type.is_win() and convention:
+                    arg_strs += self.comp_window_arg(a, name_arg, convention[i])
+                elif a.type.is_win():
                     wintyp = self.get_window_type(a)
                     arg_strs.append(f"struct {wintyp} {name_arg}")
                 else:
                     const_kwd = "const " if a.name not in self.non_const else ""
                     ctyp = a.type.basetype().ctype()
-                    arg_strs.append(f"{const_kwd}{ctyp}* {name_arg}")
+                    arg_strs.append(f"{const_kwd}{ctyp}* EXO_RESTRICT {name_arg}")
+                    if not a.type.is_real_scalar() and (align := a.mem.alignment()):
+                        self.add_line(
+                            f"{name_arg} = EXO_ASSUME_ALIGNED({name_arg}, {align});"
+                        )
                 mem = f" @{a.mem.name()}" if a.mem else ""
                 comment_str = f"{name_arg} : {a.type}{mem}"
                 typ_comments.append(comment_str)
 
+        # strides fixed by a predicate, or by a conjunct of one such as the
+        # condition of a version made by `multiversion`, are known constants
+        strides = {
+            (f.lhs.name, f.lhs.dim): f.rhs.val
+            for pred in proc.preds
+            for f in _conjuncts(pred)
+            if _is_stride_fact(f)
+        }
+        for key, val in strides.items():
+            self._known_strides[key] = CIR.Const(val)
+
         for pred in proc.preds:
             if isinstance(pred, LoopIR.Const):
                 # TODO: filter these out earlier?
                 continue
 
-            if (
-                isinstance(pred, LoopIR.BinOp)
-                and pred.op == "=="
-                and isinstance(pred.lhs, LoopIR.StrideExpr)
-                and isinstance(pred.rhs, LoopIR.Const)
-            ):
-                self._known_strides[(pred.lhs.name, pred.lhs.dim)] = CIR.Const(
-                    pred.rhs.val
-                )
+            facts = list(_conjuncts(pred))
+            if any(_is_stride_fact(f) for f in facts):
                 self.add_line(f"// assert {pred}")
-            else:
+            # the other facts are simplified with the known strides
+            facts = [_fold_strides(f, strides) for f in facts if not _is_stride_fact(f)]
+            facts = [f for f in facts if not isinstance(f, LoopIR.Const) or not f.val]
+            if len(facts) == 1:
                 # Default to just informing the compiler about the constraint
                 # on a best-effort basis
-                self.add_line(f"EXO_ASSUME({self.comp_e(pred)});")
+                self.add_line(f"EXO_ASSUME({self.comp_e(facts[0])});")
+            elif facts:
+                facts = " && ".join(self.comp_e(f, op_prec["and"]) for f in facts)
+                self.add_line(f"EXO_ASSUME({facts});")
 
         if not self.static_memory_check(self.proc):
             raise MemGenError("Cannot generate static memory in non-leaf procs")
 
-        self.comp_stmts(self.proc.body)
+        if self.mem_plan:
+            # fixed-size DRAM buffers are carved out of one allocation
+            self._plan_buf = self.new_varname(Sym("exo_mem"), None)
+            self.add_line(f"// memory plan: {self.mem_plan}")
+            self.add_line(
+                f"uint8_t *{self._plan_buf} = (uint8_t*) "
+                f"aligned_alloc(64, {self.mem_plan.size});"
+            )
+
+        if dispatch:
+            self.comp_dispatch(dispatch, arg_strs)
+        else:
+            self.comp_stmts(self.proc.body)
+
+        if self.mem_plan:
+            self.add_line(f"free({self._plan_buf});")
 
         static_kwd = "" if is_public_decl else "static "
+        if convention:
+            static_kwd = "static inline "
+        if target:
+            self._needed_helpers.add("exo_cpu_supports")
+            static_kwd = f'EXO_TARGET("{target}") {static_kwd}'
 
         # Generate headers here?
         comment = (
@@ -653,6 +1081,26 @@ class Compiler:
         if line:
             self._lines.append(self._tab + line)
 
+    def comp_dispatch(self, variants, arg_strs):
+        # the variant to run is chosen on the first call
+        self._needed_helpers.add("exo_cpu_supports")
+        impl = self.new_varname(Sym("impl"), None)
+        self.add_line(f"static void (*{impl})( {', '.join(arg_strs)} ) = NULL;")
+        self.add_line(f"if (!{impl}) {{")
+        for i, (features, name) in enumerate(variants):
+            if features:
+                cond = " && ".join(
+                    f'EXO_CPU_SUPPORTS("{f}")' for f in features.split(",")
+                )
+                self.add_line(f"  {'} else if' if i else 'if'} ({cond}) {{")
+            else:
+                self.add_line("  } else {")
+            self.add_line(f"    {impl} = {name};")
+        self.add_line("  }")
+        self.add_line("}")
+        args = ["ctxt"] + [self.env[a.name] for a in self.proc.args]
+        self.add_line(f"{impl}({','.join(args)});")
+
     def comp_stmts(self, stmts):
         for b in stmts:
             self.comp_s(b)
@@ -660,6 +1108,9 @@ class Compiler:
     def comp_top(self):
         return self.proc_decl, self.proc_def
 
+    def is_planned(self, name):
+        return self.mem_plan is not None and name in self.mem_plan.offsets
+
     def struct_defns(self):
         return self.window_defns
 
@@ -759,6 +1210,69 @@ class Compiler:
         else:
             return f"{buf}.data[{idx_expr_s}]"
 
+    def comp_trip_count_assume(self, s):
+        # tell the C compiler the bounds on the trip count of the loop which
+        # the range analysis found, when they are not evident from the loop
+        if isinstance(s.lo, LoopIR.Const) and isinstance(s.hi, LoopIR.Const):
+            return ""
+        if isinstance(s.lo, LoopIR.Const) and s.lo.val == 0:
+            trip_count = s.hi
+            # the bounds of arguments come from the assumed predicates
+            if isinstance(s.hi, LoopIR.Read) and s.hi.name in self._arg_names:
+                return ""
+        else:
+            trip_count = LoopIR.BinOp("-", s.hi, s.lo, T.index, s.srcinfo)
+        lo, hi = constant_bound(trip_count, self.range_env.env)
+        # divisions may be compiled to calls, which compilers do not assume
+        if hi is None or any(op == "/" for op in _binops(trip_count)):
+            return ""
+
+        trip_count = self.comp_e(trip_count, op_prec["<="] + 1)
+        if lo == hi:
+            return f"EXO_ASSUME({trip_count} == {hi});"
+        facts = [f"{trip_count} <= {hi}"]
+        if lo is not None and lo > 0:
+            facts.insert(0, f"{lo} <= {trip_count}")
+        return f"EXO_ASSUME({' && '.join(facts)});"
+
+    def comp_omp_pragma(self, s):
+        mode = s.loop_mode
+        clauses = []
+        loops = [s]
+        if mode.collapse:
+            clauses.append(f"collapse({mode.collapse})")
+            self._collapsed = mode.collapse - 1
+            for _ in range(self._collapsed):
+                loops.append(loops[-1].body[0])
+        if mode.schedule:
+            chunk = f", {mode.chunk}" if mode.chunk is not None else ""
+            clauses.append(f"schedule({mode.schedule}{chunk})")
+        if mode.num_threads is not None:
+            clauses.append(f"num_threads({self.comp_e(mode.num_threads)})")
+
+        reductions = []
+        for loop in loops:
+            for x in self.reductions.get(loop.iter, []):
+                if x not in reductions:
+                    reductions.append(x)
+        if reductions:
+            clauses.append(
+                f"reduction(+:{', '.join(self.reduction_var(x) for x in reductions)})"
+            )
+
+        return " ".join(["#pragma omp parallel for", *clauses])
+
+    def reduction_var(self, x):
+        name = self.env[x]
+        typ = self.envtyp[x]
+        if x in self._scalar_refs:
+            return f"{name}[:1]"
+        elif typ.is_real_scalar():
+            return name
+        else:
+            size = " * ".join(self.shape_strs(typ.shape()))
+            return f"{name}[:{size}]"
+
     def shape_strs(self, shape, prec=100) -> str:
         comp_res = [
             self.comp_cir(simplify_cir(lift_to_cir(i, self.range_env)), self.env, prec)
@@ -802,7 +1316,7 @@ class Compiler:
 
         return acc
 
-    def get_window_type(self, typ, is_const=None):
+    def get_window_type(self, typ, is_const=None, is_local=False):
         assert isinstance(typ, T.Window) or (
             isinstance(typ, LoopIR.fnarg) and typ.type.is_win()
         )
@@ -818,7 +1332,7 @@ class Compiler:
             if is_const is None:
                 is_const = typ.name not in self.non_const
 
-        win = window_struct(base, n_dims, is_const)
+        win = window_struct(base, n_dims, is_const, is_local)
         self.window_defns.add(win)
         return win.name
 
@@ -870,7 +1384,7 @@ class Compiler:
             self.add_line(f"ctxt->{nm}.{s.field} = {rhs};")
 
         elif isinstance(s, LoopIR.WindowStmt):
-            win_struct = self.get_window_type(s.rhs.type)
+            win_struct = self.get_window_type(s.rhs.type, is_local=True)
             rhs = self.comp_e(s.rhs)
             assert isinstance(s.rhs, LoopIR.WindowExpr)
             mem = self.mems[s.rhs.name]
@@ -899,8 +1413,12 @@ class Compiler:
                 s.lo,
                 s.hi,
             )
-            if isinstance(s.loop_mode, LoopIR.Par):
-                self.add_line(f"#pragma omp parallel for")
+            if self._collapsed:
+                self._collapsed -= 1
+            else:
+                self.add_line(self.comp_trip_count_assume(s))
+                if isinstance(s.loop_mode, LoopIR.Par):
+                    self.add_line(self.comp_omp_pragma(s))
             self.add_line(f"for (int_fast32_t {itr} = {lo}; {itr} < {hi}; {itr}++) {{")
             self.push(only="tab")
             self.comp_stmts(s.body)
@@ -913,9 +1431,16 @@ class Compiler:
             assert s.type.basetype() != T.R
             ctype = s.type.basetype().ctype()
             mem = s.mem or DRAM
-            line = mem.alloc(name, ctype, self.shape_strs(s.type.shape()), s.srcinfo)
+            if self.is_planned(s.name):
+                offset = self.mem_plan.offsets[s.name]
+                line = f"{ctype} *{name} = ({ctype}*) ({self._plan_buf} + {offset});"
+            else:
+                shape = self.shape_strs(s.type.shape())
+                line = mem.alloc(name, ctype, shape, s.srcinfo)
 
             self.add_line(line)
+        elif isinstance(s, LoopIR.Free) and self.is_planned(s.name):
+            pass  # freed with the buffer of the memory plan
         elif isinstance(s, LoopIR.Free):
             name = self.env[s.name]
             assert s.type.basetype().is_real_scalar()
@@ -927,8 +1452,8 @@ class Compiler:
             assert all(
                 a.type.is_win() == fna.type.is_win() for a, fna in zip(s.args, s.f.args)
             )
-            args = [self.comp_fnarg(e, s.f, i) for i, e in enumerate(s.args)]
             if s.f.instr is not None:
+                args = [self.comp_fnarg(e, s.f, i) for i, e in enumerate(s.args)]
                 d = dict()
                 assert len(s.f.args) == len(args)
                 for i in range(len(args)):
@@ -946,7 +1471,13 @@ class Compiler:
                 self.add_line(f"{s.f.instr.c_instr.format(**d)}")
             else:
                 fname = s.f.name
-                args = ["ctxt"] + args
+                convention = self.windows.get(fname)
+                args = ["ctxt"]
+                for i, e in enumerate(s.args):
+                    if convention and convention[i] is not None:
+                        args += self.comp_window_fields(e, convention[i])
+                    else:
+                        args.append(self.comp_fnarg(e, s.f, i))
                 self.add_line(f"{fname}({','.join(args)});")
         else:
             assert False, "bad case"
@@ -963,25 +1494,68 @@ class Compiler:
                 return self.env[e.name]
             elif e.name in self._scalar_refs:
                 return self.env[e.name]
+            elif isinstance(rtyp, T.Window):
+                # local windows have a struct type of their own
+                win_struct = self.get_window_type(rtyp, self.is_const_arg(fn, i))
+                name = self.env[e.name]
+                strides = ", ".join(
+                    f"{name}.strides[{d}]" for d in range(len(rtyp.as_tensor.shape()))
+                )
+                return f"(struct {win_struct}){{ {name}.data, {{ {strides} }} }}"
             elif rtyp.is_tensor_or_window():
                 return self.env[e.name]
             else:
                 assert rtyp.is_real_scalar()
                 return f"&{self.env[e.name]}"
         elif isinstance(e, LoopIR.WindowExpr):
-            if isinstance(fn, LoopIR.proc):
-                callee_buf = fn.args[i].name
-                is_const = callee_buf not in set(
-                    x for x, _ in get_writes_of_stmts(fn.body)
-                )
-            else:
-                raise NotImplementedError("Passing windows to externs")
-            win_struct = self.get_window_type(e.type, is_const)
+            win_struct = self.get_window_type(e.type, self.is_const_arg(fn, i))
             data, strides = self.window_struct_fields(e)
-            return f"(struct {win_struct}){{ &{data}, {{ {strides} }} }}"
+            return f"(struct {win_struct}){{ &{data}, {{ {', '.join(strides)} }} }}"
         else:
             return self.comp_e(e, prec)
 
+    def comp_window_arg(self, a, name, strides):
+        # windows are passed to private procedures as a pointer and the
+        # strides which are not the same constant in every call
+        wintyp = self.get_window_type(a)
+        const_kwd = "const " if a.name not in self.non_const else ""
+        ctyp = a.type.basetype().ctype()
+        data = self.new_varname(Sym(f"{name}_data"), None)
+        arg_strs = [f"{const_kwd}{ctyp}* EXO_RESTRICT {data}"]
+        fields = []
+        for d, stride in enumerate(strides):
+            if stride is None:
+                sym = Sym(f"{name}_stride{d}")
+                fields.append(self.new_varname(sym, typ=T.index))
+                arg_strs.append(f"int_fast32_t {fields[-1]}")
+                self._known_strides[(a.name, d)] = CIR.Read(sym, True)
+            else:
+                fields.append(str(stride))
+                self._known_strides[(a.name, d)] = CIR.Const(stride)
+        self.add_line(
+            f"struct {wintyp} {name} = {{ {data}, {{ {', '.join(fields)} }} }};"
+        )
+        return arg_strs
+
+    def comp_window_fields(self, e, strides):
+        # the arguments which pass the window `e` to a private procedure
+        if isinstance(e, LoopIR.WindowExpr):
+            data, all_strides = self.window_struct_fields(e)
+            data = f"&{data}"
+        else:
+            data = f"{self.env[e.name]}.data"
+            all_strides = [
+                self.comp_cir(simplify_cir(st), self.env, prec=0)
+                for st in self.get_strides(e.name, self.envtyp[e.name])
+            ]
+        return [data] + [st for st, c in zip(all_strides, strides) if c is None]
+
+    def is_const_arg(self, fn, i):
+        if not isinstance(fn, LoopIR.proc):
+            raise NotImplementedError("Passing windows to externs")
+        callee_buf = fn.args[i].name
+        return callee_buf not in set(x for x, _ in get_writes_of_stmts(fn.body))
+
     def comp_e(self, e, prec=0):
         if isinstance(e, LoopIR.Read):
             rtyp = self.envtyp[e.name]
@@ -1004,9 +1578,9 @@ class Compiler:
                 return self.access_str(e.name, e.idx)
 
         elif isinstance(e, LoopIR.WindowExpr):
-            win_struct = self.get_window_type(e.type)
+            win_struct = self.get_window_type(e.type, is_local=True)
             data, strides = self.window_struct_fields(e)
-            return f"(struct {win_struct}){{ &{data}, {{ {strides} }} }}"
+            return f"(struct {win_struct}){{ &{data}, {{ {', '.join(strides)} }} }}"
 
         elif isinstance(e, LoopIR.Const):
             if isinstance(e.val, bool):
@@ -1090,7 +1664,7 @@ class Compiler:
         ]
         assert 0 < len(all_strides_s) == len(e.idx)
         dataptr = mem.window(basetyp, base, idxs, all_strides_s, e.srcinfo)
-        strides = ", ".join(
+        strides = [
             s for s, w in zip(all_strides_s, e.idx) if isinstance(w, LoopIR.Interval)
-        )
+        ]
         return dataptr, strides
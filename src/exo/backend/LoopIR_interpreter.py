@@ -0,0 +1,447 @@
+"""
+A reference interpreter of LoopIR procedures on NumPy arrays.
+
+Buffers are NumPy arrays, windows are views of them, and scalars are 0-d
+arrays, so that writes through windows and scalar arguments are visible
+to the caller, as they are in C.  Arithmetic follows C: floating-point
+values keep the precision of their buffers, integer buffers are read as
+Python ints and wrap when stored, and `/` on integers rounds towards
+zero, except on indices, which Exo divides with `exo_floor_div`.  This
+relies on the promotion rules of NumPy 2, under which Python numbers do
+not widen NumPy values.
+
+Perfectly nested loops whose body only assigns and reduces are run as
+whole-array NumPy operations over all their iterations, when that does not
+change the result: every buffer that the body writes is either accessed at
+a different element in each iteration, or only reduced into.  Reductions
+are accumulated in the order of the iterations, with `np.add.at`, so the
+results are the same as running the loops one iteration at a time.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from ..core.LoopIR import LoopIR, T
+from .call_args import bind_args, dtypes
+
+# buffers of unspecified precision are allocated as single precision
+_dtypes = {T.R: np.float32, **dtypes}
+
+
+def run_interpreter(proc, args, kwargs, configs=None):
+    """
+    Run the LoopIR procedure `proc` on `args` and `kwargs` (see
+    `API.interpret`).  `configs` is a dictionary from pairs of a
+    configuration and a field name to their values, which is updated with
+    the values that the procedure writes.
+    """
+    interp = Interpreter(configs)
+    interp.call(proc, interp.bind(proc, args, kwargs))
+
+
+class Interpreter:
+    def __init__(self, configs=None):
+        self.configs = dict() if configs is None else configs
+        self._nests = dict()
+
+    # ----------------------------------------------------------------- #
+    # arguments
+
+    def bind(self, p, args, kwargs):
+        values = bind_args(p, args, kwargs)
+        env = dict()
+        for a in p.args:
+            env[a.name] = self.bind_arg(p, a, values[a.name], env)
+        return env
+
+    def bind_arg(self, p, a, val, env):
+        nm = f"{p.name}() argument '{a.name}'"
+        if a.type == T.bool:
+            return bool(val)
+        elif not a.type.is_numeric():
+            return int(val)
+
+        base = a.type.basetype()
+        if a.type.is_real_scalar():
+            if not isinstance(val, np.ndarray):
+                return np.array(val, dtype=_dtypes[base])
+            if val.size != 1:
+                raise ValueError(f"{nm} must have one element")
+            val = val.reshape(())
+        elif not isinstance(val, np.ndarray):
+            raise TypeError(f"{nm} must be a NumPy array")
+        else:
+            shape = tuple(self.expr(e, env) for e in a.type.shape())
+            if val.shape != shape:
+                raise ValueError(f"{nm} must have shape {shape}, not {val.shape}")
+
+        if base == T.R:
+            if not np.issubdtype(val.dtype, np.floating):
+                raise ValueError(f"{nm} must have a floating-point dtype")
+        elif val.dtype != np.dtype(_dtypes[base]):
+            dtype = np.dtype(_dtypes[base])
+            raise ValueError(f"{nm} must have dtype {dtype}, not {val.dtype}")
+        return val
+
+    # ----------------------------------------------------------------- #
+    # statements
+
+    def call(self, p, env):
+        for pred in p.preds:
+            if not self.expr(pred, env):
+                raise ValueError(
+                    f"the arguments of {p.name}() violate the assertion {pred}"
+                )
+        self.stmts(p.body, env)
+
+    def stmts(self, body, env):
+        for s in body:
+            self.stmt(s, env)
+
+    def stmt(self, s, env):
+        # LoopIR nodes are ABCs, on which isinstance() is slow
+        t = type(s)
+        if t is LoopIR.Assign or t is LoopIR.Reduce:
+            buf = env[s.name]
+            idx = self.index(s.name, buf, s.idx, env)
+            val = self.expr(s.rhs, env)
+            if t is LoopIR.Reduce:
+                val = _read(buf[idx]) + val
+            buf[idx] = _cast(val, buf.dtype)
+        elif t is LoopIR.WriteConfig:
+            self.configs[(s.config, s.field)] = self.expr(s.rhs, env)
+        elif t is LoopIR.Pass:
+            pass
+        elif t is LoopIR.If:
+            if self.expr(s.cond, env):
+                self.stmts(s.body, env)
+            else:
+                self.stmts(s.orelse, env)
+        elif t is LoopIR.For:
+            if self.vectorize(s, env):
+                return
+            lo, hi = self.expr(s.lo, env), self.expr(s.hi, env)
+            for i in range(lo, hi):
+                env[s.iter] = i
+                self.stmts(s.body, env)
+        elif t is LoopIR.Alloc:
+            shape = tuple(self.expr(e, env) for e in s.type.shape())
+            env[s.name] = np.zeros(shape, dtype=_dtypes[s.type.basetype()])
+        elif t is LoopIR.Free:
+            pass
+        elif t is LoopIR.Call:
+            callee_env = dict()
+            for a, e in zip(s.f.args, s.args):
+                if a.type.is_numeric():
+                    callee_env[a.name] = self.ref(e, env)
+                else:
+                    callee_env[a.name] = self.expr(e, env)
+            # instructions run their semantic bodies
+            self.call(s.f, callee_env)
+        elif t is LoopIR.WindowStmt:
+            env[s.name] = self.expr(s.rhs, env)
+        else:
+            assert False, f"bad case: {type(s)}"
+
+    def ref(self, e, env):
+        # the buffer passed for a numeric argument, which the callee writes
+        # through
+        if isinstance(e, LoopIR.WindowExpr):
+            return self.expr(e, env)
+        assert isinstance(e, LoopIR.Read)
+        buf = env[e.name]
+        if not e.idx:
+            return buf
+        idx = self.index(e.name, buf, e.idx, env)
+        return buf[tuple(slice(i, i + 1) for i in idx)].reshape(())
+
+    def index(self, name, buf, idx, env):
+        idx = tuple(self.expr(i, env) for i in idx)
+        for i, n in zip(idx, buf.shape):
+            if isinstance(i, np.ndarray):
+                lo, hi = i.min(), i.max()
+            else:
+                lo = hi = i
+            if lo < 0 or hi >= n:
+                raise IndexError(f"{name}{list(idx)} is out of bounds {buf.shape}")
+        return idx
+
+    # ----------------------------------------------------------------- #
+    # expressions
+
+    def expr(self, e, env):
+        t = type(e)
+        if t is LoopIR.Read:
+            val = env[e.name]
+            if not isinstance(val, np.ndarray):
+                return val
+            return _read(val[_slices(self.index(e.name, val, e.idx, env))])
+        elif t is LoopIR.Const:
+            return e.val
+        elif t is LoopIR.USub:
+            return -self.expr(e.arg, env)
+        elif t is LoopIR.BinOp:
+            lhs = self.expr(e.lhs, env)
+            rhs = self.expr(e.rhs, env)
+            return _binop(e.op, lhs, rhs, e.type)
+        elif t is LoopIR.Extern:
+            return e.f.interpret([self.expr(a, env) for a in e.args])
+        elif t is LoopIR.WindowExpr:
+            buf = env[e.name]
+            idx = []
+            for w, n in zip(e.idx, buf.shape):
+                if isinstance(w, LoopIR.Interval):
+                    lo, hi = self.expr(w.lo, env), self.expr(w.hi, env)
+                    if not 0 <= lo <= hi <= n:
+                        raise IndexError(f"{e} is out of bounds {buf.shape}")
+                    idx.append(slice(lo, hi))
+                else:
+                    pt = self.expr(w.pt, env)
+                    if not 0 <= pt < n:
+                        raise IndexError(f"{e} is out of bounds {buf.shape}")
+                    idx.append(pt)
+            return buf[tuple(idx)]
+        elif t is LoopIR.StrideExpr:
+            buf = env[e.name]
+            return buf.strides[e.dim] // buf.itemsize
+        elif t is LoopIR.ReadConfig:
+            try:
+                return self.configs[(e.config, e.field)]
+            except KeyError:
+                raise ValueError(
+                    f"{e.config.name()}.{e.field} is read before it is written"
+                ) from None
+        else:
+            assert False, f"bad case: {type(e)}"
+
+    # ----------------------------------------------------------------- #
+    # vectorized loops
+
+    def vectorize(self, s, env):
+        """
+        Run the loop nest `s` as whole-array operations, if its body allows
+        it, and return whether it did
+        """
+        if (nest := self.nest(s)) is None:
+            return False
+        loops, reads = nest
+
+        ranges = []
+        for loop in loops:
+            lo, hi = self.expr(loop.lo, env), self.expr(loop.hi, env)
+            ranges.append(np.arange(lo, hi))
+        n = int(np.prod([len(r) for r in ranges]))
+        if n < _MIN_ITERATIONS or n > _MAX_ITERATIONS:
+            return False
+
+        # the iterations in order, as one vector per iterator
+        env = dict(env)
+        if len(loops) == 1:
+            env[s.iter] = ranges[0]
+        else:
+            grid = np.meshgrid(*ranges, indexing="ij")
+            for loop, g in zip(loops, grid):
+                env[loop.iter] = g.ravel()
+
+        # the element of every access to a buffer, in every iteration
+        accesses = dict()
+        body = loops[-1].body
+        for b, b_reads in zip(body, reads):
+            for nm, idx in b_reads:
+                accesses.setdefault(nm, []).append((None, self.indices(idx, env, n)))
+            accesses.setdefault(b.name, []).append((b, self.indices(b.idx, env, n)))
+
+        # how each buffer that the body writes is written
+        modes = dict()
+        for nm in {b.name for b in body}:
+            buf = env[nm]
+            if any(
+                other != nm and np.may_share_memory(buf, env[other])
+                for other in accesses
+            ):
+                return False
+
+            (first, idx), *rest = accesses[nm]
+            if _distinct(idx, buf.shape, n) and all(
+                all(np.array_equal(i, j) for i, j in zip(idx, other))
+                for _, other in rest
+            ):
+                modes[nm] = "elementwise"
+            elif not rest and isinstance(first, LoopIR.Reduce):
+                # reductions which add to the same element more than once
+                # are accumulated in order
+                modes[nm] = "accumulate"
+            else:
+                return False
+
+        for b in body:
+            buf = env[b.name]
+            idx = self.index(b.name, buf, b.idx, env)
+            val = np.broadcast_to(self.expr(b.rhs, env), (n,))
+            if modes[b.name] == "accumulate":
+                if buf.ndim == 0:
+                    buf, idx = buf.reshape(1), (np.zeros(n, dtype=np.intp),)
+                idx = tuple(np.broadcast_to(i, (n,)) for i in idx)
+                np.add.at(buf, idx, _cast(val, buf.dtype))
+            else:
+                idx = _slices(idx)
+                if isinstance(b, LoopIR.Reduce):
+                    val = _read(buf[idx]) + val
+                buf[idx] = _cast(val, buf.dtype)
+        return True
+
+    def nest(self, s):
+        # the perfectly nested loops starting at `s`, whose bounds do not
+        # depend on each other, and the buffer reads of each statement in
+        # their body, or None if the body does not only assign and reduce
+        if id(s) not in self._nests:
+            loops = [s]
+            while len(loops[-1].body) == 1 and isinstance(
+                loops[-1].body[0], LoopIR.For
+            ):
+                loops.append(loops[-1].body[0])
+            iters = {loop.iter for loop in loops}
+            nest = None
+            try:
+                if all(
+                    isinstance(b, (LoopIR.Assign, LoopIR.Reduce))
+                    for b in loops[-1].body
+                ) and not any(
+                    _free_names(loop.lo) & iters or _free_names(loop.hi) & iters
+                    for loop in loops
+                ):
+                    nest = (loops, [list(_buffer_reads(b.rhs)) for b in loops[-1].body])
+            except _NotVectorizable:
+                pass
+            self._nests[id(s)] = nest
+        return self._nests[id(s)]
+
+    def indices(self, idx, env, n):
+        return tuple(np.broadcast_to(self.expr(i, env), (n,)) for i in idx)
+
+
+# the sizes of the loop nests that are run as whole-array operations:
+# checking whether a nest can be is slower than running a smaller one an
+# iteration at a time, and the index vectors of larger ones take too much
+# memory
+_MIN_ITERATIONS = 16
+_MAX_ITERATIONS = 1 << 22
+
+
+class _NotVectorizable(Exception):
+    pass
+
+
+def _free_names(e):
+    if isinstance(e, LoopIR.Read):
+        return {e.name}.union(*(_free_names(i) for i in e.idx))
+    elif isinstance(e, LoopIR.USub):
+        return _free_names(e.arg)
+    elif isinstance(e, LoopIR.BinOp):
+        return _free_names(e.lhs) | _free_names(e.rhs)
+    return set()
+
+
+def _buffer_reads(e):
+    if isinstance(e, LoopIR.Read):
+        if e.type.is_numeric():
+            yield e.name, e.idx
+    elif isinstance(e, LoopIR.USub):
+        yield from _buffer_reads(e.arg)
+    elif isinstance(e, LoopIR.BinOp):
+        yield from _buffer_reads(e.lhs)
+        yield from _buffer_reads(e.rhs)
+    elif isinstance(e, LoopIR.Extern):
+        for a in e.args:
+            yield from _buffer_reads(a)
+    elif not isinstance(e, (LoopIR.Const, LoopIR.StrideExpr, LoopIR.ReadConfig)):
+        raise _NotVectorizable()
+
+
+def _distinct(idx, shape, n):
+    # whether every iteration accesses a different element
+    if not idx:
+        return False
+    if any(_step(i) for i in idx):
+        return True
+    # out of bounds indices are clipped, and raise when the loop is run
+    # one iteration at a time
+    flat = np.ravel_multi_index(idx, shape, mode="clip")
+    return len(np.unique(flat)) == n
+
+
+def _step(i):
+    # the step between the evenly spaced indices `i`, or 0
+    if len(i) < 2 or (step := int(i[1] - i[0])) == 0:
+        return 0
+    return (
+        step
+        if (i[-1] - i[0]) == step * (len(i) - 1) and (np.all(np.diff(i) == step))
+        else 0
+    )
+
+
+def _slices(idx):
+    # indices with one vector of evenly spaced indices are slices, and give
+    # views instead of copies
+    vectors = [d for d, i in enumerate(idx) if type(i) is np.ndarray]
+    if len(vectors) == 1:
+        (d,) = vectors
+        i = idx[d]
+        if step := _step(i):
+            stop = int(i[-1]) + (1 if step > 0 else -1)
+            idx = list(idx)
+            idx[d] = slice(int(i[0]), stop if stop >= 0 else None, step)
+    return tuple(idx)
+
+
+def _is_int(dtype):
+    return dtype.kind in "iu"
+
+
+def _read(val):
+    # integers are computed with Python ints (or 64-bit ones), as C
+    # promotes narrow integers before doing arithmetic
+    if isinstance(val, np.ndarray):
+        return val.astype(np.int64) if _is_int(val.dtype) else val
+    return int(val) if _is_int(val.dtype) else val
+
+
+def _cast(val, dtype):
+    # conversions to integers wrap, as they do in C
+    return np.asarray(val).astype(dtype)
+
+
+def _binop(op, lhs, rhs, typ):
+    if op == "+":
+        return lhs + rhs
+    elif op == "-":
+        return lhs - rhs
+    elif op == "*":
+        return lhs * rhs
+    elif op == "/":
+        if typ.is_indexable() or typ.is_stridable():
+            return lhs // rhs
+        elif isinstance(typ, (T.INT8, T.UINT8, T.UINT16, T.INT32)):
+            return np.trunc(np.true_divide(lhs, rhs)).astype(np.int64)
+        return lhs / rhs
+    elif op == "%":
+        if typ.is_indexable() or typ.is_stridable():
+            return lhs % rhs
+        return np.fmod(lhs, rhs)
+    elif op == "==":
+        return lhs == rhs
+    elif op == "<":
+        return lhs < rhs
+    elif op == ">":
+        return lhs > rhs
+    elif op == "<=":
+        return lhs <= rhs
+    elif op == ">=":
+        return lhs >= rhs
+    elif op == "and":
+        return np.logical_and(lhs, rhs)
+    elif op == "or":
+        return np.logical_or(lhs, rhs)
+    assert False, f"bad case: {op}"
@@ -0,0 +1,75 @@
+"""
+Binding the arguments of calls to procedures from Python to their names,
+which is shared by `exo.jit`, the reference interpreter and `exo.testing`.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from ..core.LoopIR import LoopIR, T
+
+# the NumPy dtype of each precision
+dtypes = {
+    T.f16: np.float16,
+    T.f32: np.float32,
+    T.f64: np.float64,
+    T.i8: np.int8,
+    T.ui8: np.uint8,
+    T.ui16: np.uint16,
+    T.i32: np.int32,
+}
+
+
+def inferable_sizes(p):
+    """
+    The size arguments of `p` which are dimensions of its tensor arguments,
+    and so may be left out of calls
+    """
+    return {
+        e.name
+        for a in p.args
+        if a.type.is_tensor_or_window()
+        for e in a.type.shape()
+        if isinstance(e, LoopIR.Read)
+    }
+
+
+def bind_args(p, args, kwargs, inferable=None):
+    """
+    Map the names of the arguments of `p` to the values in `args` and
+    `kwargs`.  Sizes which are dimensions of tensor arguments may be left
+    out, if all the other arguments are passed by position, or if they are
+    passed by name, and are then taken from the shapes of the NumPy arrays.
+    `inferable` is `inferable_sizes(p)`, if it has already been computed.
+    """
+    if len(args) > len(p.args):
+        raise TypeError(
+            f"{p.name}() takes {len(p.args)} arguments but {len(args)} were given"
+        )
+    if inferable is None:
+        inferable = inferable_sizes(p)
+
+    names = [a.name for a in p.args]
+    if not kwargs and len(args) == len(names) - len(inferable) < len(names):
+        names = [nm for nm in names if nm not in inferable]
+    values = dict(zip(names, args))
+    by_name = {str(a.name): a.name for a in p.args}
+    for nm, val in kwargs.items():
+        if nm not in by_name:
+            raise TypeError(f"{p.name}() got an unexpected argument '{nm}'")
+        if by_name[nm] in values:
+            raise TypeError(f"{p.name}() got multiple values for argument '{nm}'")
+        values[by_name[nm]] = val
+
+    for a in p.args:
+        arr = values.get(a.name)
+        if a.type.is_tensor_or_window() and isinstance(arr, np.ndarray):
+            for dim, e in enumerate(a.type.shape()):
+                if isinstance(e, LoopIR.Read) and dim < arr.ndim:
+                    values.setdefault(e.name, arr.shape[dim])
+
+    for a in p.args:
+        if a.name not in values:
+            raise TypeError(f"{p.name}() missing argument '{a.name}'")
+    return values
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import hashlib
+import inspect
+import io
+import os
+import pickle
+import tempfile
+import weakref
+from typing import Optional
+
+from ..core.configs import Config
+from ..core.extern import Extern
+from ..core.LoopIR import LoopIR
+from ..core.memory import Memory
+from ..core.prelude import Sym, SrcInfo
+from ..frontend import proc_cache
+from ..frontend.proc_cache import cache_dir
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Content-addressed cache of generated C code
+#
+# The C code that `compile_to_strings` generates for a procedure is a pure
+# function of the procedure, the procedures it calls, the memories, configs
+# and externs it uses, and the version and sources of Exo generating it.  When
+# EXO_CACHE_DIR is set (see `frontend.proc_cache`), the output for each
+# procedure is stored under a hash of those inputs, so that rebuilding a
+# library only runs the analyses and the Compiler for procedures that changed.
+#
+# The hash is structural: symbols are numbered in order of appearance and
+# source locations are ignored.  Memories and externs are identified by their
+# class, including the source code of that class, since it is the class that
+# generates their part of the C code.
+
+
+def codegen_cache_key(
+    proc: LoopIR.proc,
+    ctxt_name: str,
+    is_public_decl: bool,
+    target: Optional[str] = None,
+    windows: tuple = (),
+):
+    """
+    Returns the cache key of the code generated for `proc`, or None if the
+    code cannot be cached.
+    """
+    from .. import __version__
+
+    try:
+        fingerprint = _ProcFingerprint(proc).result()
+    except _Uncacheable:
+        return None
+
+    # the sources of Exo change the generated code without changing its
+    # version in a development checkout, as for cached procedures
+    exo = proc_cache._exo_fingerprint()
+    key = (__version__, exo, ctxt_name, is_public_decl, fingerprint)
+    if target:
+        key += (target,)
+    if windows:
+        # the strides passed to private procedures depend on all their calls
+        key += (windows,)
+    return hashlib.sha256(repr(key).encode()).hexdigest()
+
+
+def load_compiled(key: str, extern_fns: dict[str, Extern]):
+    """
+    Returns the cached result of `_compile_proc` stored under `key`, if
+    there is one.  Externs are stored by name, and looked up in `extern_fns`.
+    """
+    try:
+        with open(_cache_path(key), "rb") as f:
+            d, b, structs, helpers, externs = pickle.load(f)
+        externs = {(extern_fns[nm], t) for nm, t in externs}
+    except Exception:
+        # missing, unreadable or stale entries are simply rebuilt
+        return None
+    return d, b, structs, helpers, externs
+
+
+def store_compiled(key: str, result):
+    d, b, structs, helpers, externs = result
+    externs = {(f.name(), t) for f, t in externs}
+
+    buf = io.BytesIO()
+    pickle.dump((d, b, structs, helpers, externs), buf)
+
+    path = _cache_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(buf.getvalue())
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _cache_path(key):
+    return os.path.join(cache_dir(), "c", key[:2], key[2:] + ".pickle")
+
+
+# --------------------------------------------------------------------------- #
+# Structural fingerprints
+
+
+class _Uncacheable(Exception):
+    pass
+
+
+# fingerprints of callees are shared between all the procedures that call
+# them, and of classes between all procedures that use them
+_proc_fingerprints = weakref.WeakKeyDictionary()
+_class_fingerprints = weakref.WeakKeyDictionary()
+
+
+class _ProcFingerprint:
+    def __init__(self, proc):
+        self.syms = dict()
+        if (fingerprint := _proc_fingerprints.get(proc)) is None:
+            fingerprint = self.fingerprint(proc)
+            _proc_fingerprints[proc] = fingerprint
+        self._result = fingerprint
+
+    def result(self):
+        return self._result
+
+    def fingerprint(self, val):
+        if isinstance(val, Sym):
+            if (i := self.syms.get(val)) is None:
+                i = self.syms[val] = len(self.syms)
+            return ("sym", val.name(), i)
+        elif isinstance(val, SrcInfo):
+            return None
+        elif isinstance(val, list):
+            return tuple(self.fingerprint(x) for x in val)
+        elif isinstance(val, LoopIR.Call):
+            callee = _ProcFingerprint(val.f).result()
+            return ("Call", callee, self.fingerprint(val.args))
+        elif hasattr(type(val), "__attrs_attrs__"):
+            return (type(val).__name__,) + tuple(
+                self.fingerprint(getattr(val, a.name))
+                for a in type(val).__attrs_attrs__
+            )
+        elif val is None or isinstance(val, (bool, int, float, str)):
+            # including identifiers, which are a subclass of str
+            return repr(val)
+        elif isinstance(val, type) and issubclass(val, Memory):
+            return ("mem", val.name(), _class_fingerprint(val))
+        elif isinstance(val, Extern):
+            return ("extern", val.name(), _class_fingerprint(type(val)))
+        elif isinstance(val, Config):
+            fields = tuple((nm, str(typ)) for nm, typ in val.fields())
+            return ("config", val.name(), val.is_allow_rw(), fields)
+        else:
+            raise _Uncacheable()
+
+
+def _class_fingerprint(cls):
+    if (fingerprint := _class_fingerprints.get(cls)) is None:
+        fingerprint = tuple(
+            (c.__module__, c.__qualname__, _class_source(c))
+            for c in cls.__mro__
+            if c not in (object, Memory, Extern) and c.__module__ != "abc"
+        )
+        _class_fingerprints[cls] = fingerprint
+    return fingerprint
+
+
+def _class_source(cls):
+    try:
+        return inspect.getsource(cls)
+    except (OSError, TypeError):
+        pass
+    # classes made by factories such as DRAM_ALIGNED(n) have no source, but
+    # are fully described by their attributes if they define no methods
+    attrs = {
+        k: v
+        for k, v in vars(cls).items()
+        if not k.startswith("__") and k != "_abc_impl"
+    }
+    if not all(type(v) in (bool, int, float, str) for v in attrs.values()):
+        raise _Uncacheable()
+    return repr(sorted(attrs.items()))
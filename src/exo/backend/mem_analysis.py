@@ -1,7 +1,7 @@
 from collections import ChainMap
-from ..core.LoopIR import LoopIR
+from ..core.LoopIR import LoopIR, T
 
-from ..core.memory import Memory
+from ..core.memory import Memory, DRAM
 
 
 # --------------------------------------------------------------------------- #
@@ -13,12 +13,17 @@ class MemoryAnalysis:
     def __init__(self):
         self.mem_env = ChainMap()
         self.tofree = []
+        # the buffers that windows created by WindowStmts point into
+        self.win_base = dict()
+        # the MemoryPlan of the last procedure, if it has one
+        self.plan = None
 
     def run(self, proc):
         assert isinstance(proc, LoopIR.proc)
 
         self.mem_env = ChainMap()
         self.tofree = []
+        self.win_base = dict()
 
         for a in proc.args:
             if a.type.is_numeric():
@@ -31,6 +36,8 @@ class MemoryAnalysis:
         self.pop()
         assert len(self.tofree) == 0
 
+        self.plan = plan_memory(body)
+
         return LoopIR.proc(
             proc.name,
             proc.args,
@@ -99,7 +106,8 @@ class MemoryAnalysis:
                     res += used_e(e)
             elif isinstance(s, LoopIR.WindowStmt):
                 res += used_e(s.rhs)
-            return res
+            # using a window uses the buffer it points into
+            return res + [self.win_base[nm] for nm in res if nm in self.win_base]
 
         body = []
         for b in reversed([self.mem_s(b) for b in stmts]):
@@ -135,6 +143,7 @@ class MemoryAnalysis:
         elif styp is LoopIR.WindowStmt:
             mem = self.get_e_mem(s.rhs)
             self.mem_env[s.name] = mem
+            self.win_base[s.name] = self.win_base.get(s.rhs.name, s.rhs.name)
             return s
 
         elif styp is LoopIR.Call:
@@ -176,3 +185,123 @@ class MemoryAnalysis:
             assert False, "There should not be frees inserted before mem " "analysis"
         else:
             assert False, f"bad case {styp}"
+
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Memory Planning
+#
+# Fixed-size DRAM buffers are placed in one buffer that is allocated once when
+# the procedure is entered, rather than being malloc'd and freed where they
+# are allocated, which for buffers allocated inside a loop is once per
+# iteration.  Buffers whose live ranges, from their Alloc to the Free placed
+# by MemoryAnalysis, do not overlap share the same slot of that buffer.
+#
+# Buffers are uninitialized when allocated, so a buffer allocated inside a
+# loop may keep its slot across iterations.  Buffers allocated inside a
+# parallel loop are left alone, since every thread needs its own copy.
+
+_PLAN_ALIGN = 64
+
+_sizeof = {
+    T.F16: 2,
+    T.F32: 4,
+    T.F64: 8,
+    T.INT8: 1,
+    T.UINT8: 1,
+    T.UINT16: 2,
+    T.INT32: 4,
+}
+
+
+class MemoryPlan:
+    def __init__(self, offsets, n_slots, size):
+        # byte offsets of the planned buffers, by name
+        self.offsets = offsets
+        self.n_slots = n_slots
+        # the peak footprint of the planned buffers, in bytes
+        self.size = size
+
+    def __str__(self):
+        return (
+            f"{len(self.offsets)} DRAM buffers in {self.n_slots} slots, "
+            f"{self.size} bytes"
+        )
+
+
+def plan_memory(body):
+    """
+    Returns the MemoryPlan of a procedure body with Frees placed, or None if
+    it would not save any allocations.
+    """
+    # live ranges of the buffers, by position in a preorder walk of the body
+    ranges = dict()
+    sizes = dict()
+    in_loop = set()
+    pos = 0
+
+    def walk(stmts, loop, par):
+        nonlocal pos
+        for s in stmts:
+            pos += 1
+            if isinstance(s, LoopIR.Alloc) and not par and _plannable(s):
+                ranges[s.name] = [pos, None]
+                sizes[s.name] = _plan_size(s.type)
+                if loop:
+                    in_loop.add(s.name)
+            elif isinstance(s, LoopIR.Free) and s.name in ranges:
+                ranges[s.name][1] = pos
+            elif isinstance(s, LoopIR.If):
+                walk(s.body, loop, par)
+                walk(s.orelse, loop, par)
+            elif isinstance(s, LoopIR.For):
+                walk(s.body, True, par or isinstance(s.loop_mode, LoopIR.Par))
+
+    walk(body, False, False)
+
+    if not in_loop and len(ranges) < 2:
+        return None
+
+    # greedy interval coloring, in order of allocation
+    slots = []  # [size, end of the live range of its last buffer]
+    slot_of = dict()
+    for nm, (start, end) in sorted(ranges.items(), key=lambda x: x[1][0]):
+        free = [i for i, (_, last) in enumerate(slots) if last < start]
+        if free:
+            # prefer the smallest slot that is large enough, else grow the
+            # largest one
+            fits = [i for i in free if slots[i][0] >= sizes[nm]]
+            if fits:
+                i = min(fits, key=lambda i: slots[i][0])
+            else:
+                i = max(free, key=lambda i: slots[i][0])
+            slots[i] = [max(slots[i][0], sizes[nm]), end]
+        else:
+            i = len(slots)
+            slots.append([sizes[nm], end])
+        slot_of[nm] = i
+
+    slot_offsets = []
+    size = 0
+    for slot_size, _ in slots:
+        slot_offsets.append(size)
+        size += slot_size
+
+    offsets = {nm: slot_offsets[i] for nm, i in slot_of.items()}
+    return MemoryPlan(offsets, len(slots), size)
+
+
+def _plannable(s):
+    # other memories have allocators of their own
+    return (
+        s.mem is DRAM
+        and len(s.type.shape()) > 0
+        and all(isinstance(e, LoopIR.Const) for e in s.type.shape())
+    )
+
+
+def _plan_size(typ):
+    n = _sizeof[type(typ.basetype())]
+    for e in typ.shape():
+        n *= e.val
+    return (n + _PLAN_ALIGN - 1) // _PLAN_ALIGN * _PLAN_ALIGN
@@ -1,11 +1,18 @@
 from ..core.LoopIR import LoopIR, LoopIR_Rewrite
 
-from ..rewrite.new_eff import Check_ParallelizeLoop
+from ..rewrite.new_eff import (
+    SchedulingError,
+    Check_CollapseLoops,
+    get_parallel_reductions,
+)
 
 
 class ParallelAnalysis(LoopIR_Rewrite):
     def __init__(self):
         self._errors = []
+        # buffers to privatize by a parallel reduction, by loop iteration
+        # variable of the parallel loops
+        self.reductions = dict()
 
     def run(self, proc):
         assert isinstance(proc, LoopIR.proc)
@@ -21,10 +28,22 @@ class ParallelAnalysis(LoopIR_Rewrite):
 
     def map_s(self, s):
         if isinstance(s, LoopIR.For) and isinstance(s.loop_mode, LoopIR.Par):
+            if s.loop_mode.collapse:
+                try:
+                    loops = Check_CollapseLoops(s, s.loop_mode.collapse)
+                    if not all(isinstance(l.loop_mode, LoopIR.Par) for l in loops):
+                        self.err(s, "collapsed loops must all be parallel loops")
+                except SchedulingError as e:
+                    self.err(s, str(e))
             try:
-                Check_ParallelizeLoop(self.proc, s)
+                reductions = get_parallel_reductions(self.proc, s)
+                self.reductions.setdefault(s.iter, [])
+                self.reductions[s.iter] += [
+                    x for x in reductions if x not in self.reductions[s.iter]
+                ]
             except:
                 self.err(
                     s,
                     "parallel loop's body is not parallelizable because of potential data races",
                 )
+        return super().map_s(s)
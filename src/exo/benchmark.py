@@ -0,0 +1,396 @@
+"""
+Benchmarking compiled procedures.
+
+`bench(proc, sizes)` compiles a procedure together with a generated C
+driver which times it with clock_gettime(), runs the driver in a
+subprocess for every size, and returns the timings in the JSON format of
+Google Benchmark, which `apps/plot.py` reads.  Drivers are cached on disk
+as the libraries of `Procedure.jit()` are.
+"""
+
+from __future__ import annotations
+
+import datetime
+import hashlib
+import json
+import math
+import os
+import platform
+import re
+import shlex
+import statistics
+import subprocess
+
+from .API import Procedure, compile_procs_to_strings
+from .core.LoopIR import T, eval_expr
+from .jit import _LIB_NAME, _build, _compiler, cache_dir
+
+# the number of bytes written between samples to flush the caches, when
+# `flush_cache=True`, which is larger than the last level caches of most CPUs
+FLUSH_BYTES = 64 << 20
+
+# the percentiles of the samples which are reported besides their mean and
+# standard deviation
+_PERCENTILES = {"p10": 10, "median": 50, "p90": 90}
+
+# integer inputs are small, as in exo.testing
+_INT_SCALES = {T.i8: 8, T.ui8: 16, T.ui16: 256, T.i32: 100}
+
+
+def bench(
+    proc,
+    sizes,
+    flops=None,
+    *,
+    warmup=3,
+    repeats=30,
+    min_time=1e-3,
+    flush_cache=False,
+    pin_cpu=None,
+    name=None,
+    out=None,
+    cc=None,
+    cflags=None,
+) -> dict:
+    """
+    Time `proc` for each of `sizes`, and return the results as Google
+    Benchmark JSON.
+
+    Each entry of `sizes` gives the size, index, stride and bool arguments
+    of `proc`, as a dictionary by name or as a sequence in the order of the
+    arguments (or an int, if there is one).  Buffers are allocated by the
+    driver and filled with random values.  `flops(**sizes)`, if given,
+    counts the floating point operations of one call, and is reported as a
+    rate of FLOP/s in the "flops" counter.
+
+    After `warmup` calls, `proc` is timed `repeats` times.  Each sample runs
+    `proc` as many times as it takes at least `min_time` seconds, unless
+    `flush_cache` is set, in which case every sample is one call after
+    writing `FLUSH_BYTES` (or `flush_cache` bytes, if it is an int).  The
+    benchmark of each size is reported as one iteration named
+    `{name}/{size}/...` (`name` defaults to the name of `proc`), whose
+    times are the medians of the samples, followed by aggregates of the
+    samples: mean, median, stddev, p10 and p90.
+
+    `pin_cpu` pins the driver to one CPU, on platforms which support it.
+    The results are also written to the file `out`, if given.  `cc` and
+    `cflags` are the compiler and flags, as for `Procedure.jit()`.
+    """
+    if not isinstance(proc, Procedure) or proc.is_instr():
+        raise TypeError("bench() expects a Procedure which is not an instruction")
+    if warmup < 0 or repeats < 1:
+        raise ValueError("bench() needs warmup >= 0 and repeats >= 1")
+    if pin_cpu is not None and not hasattr(os, "sched_setaffinity"):
+        raise ValueError("pin_cpu is not supported on this platform")
+
+    p = proc._loopir_proc
+    name = name or p.name
+    if flush_cache is True:
+        flush_cache = FLUSH_BYTES
+    flush_bytes = int(flush_cache or 0)
+
+    cc, cflags = _compiler(cc, cflags)
+    exe = _driver(proc, cc, cflags)
+    preexec = (
+        (lambda: os.sched_setaffinity(0, {pin_cpu})) if pin_cpu is not None else None
+    )
+
+    benchmarks = []
+    for instance, entry in enumerate(sizes):
+        env = _sizes(p, entry)
+        argv = [*_argv(p, env), warmup, repeats, min_time * 1e9, flush_bytes]
+        result = subprocess.run(
+            [str(exe), *map(str, argv)],
+            capture_output=True,
+            text=True,
+            preexec_fn=preexec,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(
+                f"benchmarking {p.name}() failed with exit status "
+                f"{result.returncode}:\n{result.stderr}"
+            )
+        iterations, *samples = result.stdout.splitlines()
+        iterations = int(iterations)
+        real, cpu = zip(*(map(float, s.split()) for s in samples))
+
+        controls = [a for a in p.args if not a.type.is_numeric()]
+        run_name = "/".join([name, *(str(int(env[a.name])) for a in controls)])
+        n_flops = (
+            flops(**{str(a.name): env[a.name] for a in controls}) if flops else None
+        )
+
+        def record(run_type, real_time, cpu_time, **fields):
+            b = {
+                "name": run_name,
+                "family_index": 0,
+                "per_family_instance_index": instance,
+                "run_name": run_name,
+                "run_type": run_type,
+                "repetitions": repeats,
+                **fields,
+                "threads": 1,
+                "iterations": iterations,
+                "real_time": real_time,
+                "cpu_time": cpu_time,
+                "time_unit": "ns",
+            }
+            if n_flops is not None and real_time > 0:
+                b["flops"] = n_flops / (real_time * 1e-9)
+            return b
+
+        # one iteration per size, so that plots have one point per size
+        median = _percentile(real, 50), _percentile(cpu, 50)
+        b = record("iteration", *median, repetition_index=0)
+        b["iterations"] = iterations * repeats
+        benchmarks.append(b)
+
+        aggregates = {
+            "mean": (statistics.fmean(real), statistics.fmean(cpu)),
+            **{
+                agg: (_percentile(real, q), _percentile(cpu, q))
+                for agg, q in _PERCENTILES.items()
+            },
+            "stddev": (_stddev(real), _stddev(cpu)),
+        }
+        for agg, times in aggregates.items():
+            b = record("aggregate", *times, aggregate_name=agg, aggregate_unit="time")
+            b["name"] = f"{run_name}_{agg}"
+            if agg == "stddev":
+                b.pop("flops", None)
+            benchmarks.append(b)
+
+    results = {
+        "context": {
+            "date": datetime.datetime.now().astimezone().isoformat(timespec="seconds"),
+            "host_name": platform.node(),
+            "executable": str(exe),
+            "num_cpus": os.cpu_count(),
+            "library_build_type": "release",
+            "compiler": shlex.join(cc + cflags),
+        },
+        "benchmarks": benchmarks,
+    }
+    if out is not None:
+        with open(out, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+def _sizes(p, entry):
+    controls = [a for a in p.args if not a.type.is_numeric()]
+    if isinstance(entry, dict):
+        names = {str(a.name) for a in controls}
+        if unknown := set(entry) - names:
+            raise ValueError(
+                f"{p.name}() has no size, index, stride or bool argument "
+                f"{', '.join(sorted(unknown))}"
+            )
+        values = [entry.get(str(a.name)) for a in controls]
+    else:
+        values = list(entry) if hasattr(entry, "__iter__") else [entry]
+        if len(values) != len(controls):
+            raise ValueError(
+                f"{p.name}() takes {len(controls)} sizes, but {len(values)} "
+                f"were given"
+            )
+    env = dict()
+    for a, val in zip(controls, values):
+        if val is None:
+            raise ValueError(f"missing size {a.name} of {p.name}()")
+        env[a.name] = bool(val) if a.type == T.bool else int(val)
+
+    for a in p.args:
+        if a.type.is_tensor_or_window():
+            shape = [eval_expr(e, env) for e in a.type.shape()]
+            stride = 1
+            for dim in reversed(range(len(shape))):
+                env[(a.name, dim)] = stride
+                stride *= shape[dim]
+    for pred in p.preds:
+        try:
+            holds = eval_expr(pred, env)
+        except KeyError:
+            # depends on configurations, or on the contents of buffers
+            continue
+        if not holds:
+            raise ValueError(
+                f"the sizes {entry} of {p.name}() violate the assertion {pred}"
+            )
+    return env
+
+
+def _argv(p, env):
+    # the sizes, and the number of elements of every buffer followed by its
+    # strides if it is a window
+    argv = []
+    for a in p.args:
+        if not a.type.is_numeric():
+            argv.append(int(env[a.name]))
+        elif a.type.is_tensor_or_window():
+            argv.append(math.prod(eval_expr(e, env) for e in a.type.shape()))
+            if a.type.is_win():
+                argv += [env[(a.name, dim)] for dim in range(len(a.type.shape()))]
+        else:
+            argv.append(1)
+    return argv
+
+
+def _percentile(samples, q):
+    s = sorted(samples)
+    pos = (len(s) - 1) * q / 100
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(s) - 1)
+    return s[lo] + (s[hi] - s[lo]) * (pos - lo)
+
+
+def _stddev(samples):
+    return statistics.stdev(samples) if len(samples) > 1 else 0.0
+
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# The timing driver
+
+
+def _driver(proc, cc, cflags):
+    p = proc._loopir_proc
+    source, header = compile_procs_to_strings([proc], f"{_LIB_NAME}.h")
+    has_ctxt = f"typedef struct {_LIB_NAME}_Context" in header
+    source += _main(p, header, has_ctxt)
+
+    key = hashlib.sha256(
+        repr(("bench", cc, cflags, source, header)).encode()
+    ).hexdigest()
+    path = cache_dir() / f"{key}.bench"
+    if not path.exists():
+        _build(path, cc + cflags, source, header, shared=False)
+    return path
+
+
+def _main(p, header, has_ctxt):
+    # the parameters of the procedure as declared in the header, which give
+    # the names of the window structs
+    decl = re.search(rf"\bvoid {p.name}\((.*?)\);", header, re.S)
+    params = [s.strip() for s in decl.group(1).split(",")][1:]
+
+    align = max([64] + [a.mem.alignment() or 1 for a in p.args if a.mem])
+    lines = []
+    args = ["&ctxt" if has_ctxt else "NULL"]
+    i = 1
+    for n, (a, param) in enumerate(zip(p.args, params)):
+        v = f"exo_arg_{n}"
+        if not a.type.is_numeric():
+            ctype = "bool" if a.type == T.bool else "int_fast32_t"
+            lines.append(f"{ctype} {v} = atol(argv[{i}]);")
+            args.append(v)
+            i += 1
+            continue
+
+        ctype = a.type.basetype().ctype()
+        scale = _INT_SCALES.get(a.type.basetype(), 1)
+        lines += [
+            f"long {v}_count = atol(argv[{i}]);",
+            f"{ctype} *{v} = exo_bench_alloc({v}_count, sizeof({ctype}), {align});",
+            f"for (long i = 0; i < {v}_count; i++)",
+            f"  {v}[i] = ({ctype})(exo_bench_random() * {scale});",
+        ]
+        i += 1
+        if a.type.is_win():
+            n_dims = len(a.type.shape())
+            wtype = param.rsplit(" ", 1)[0]
+            strides = ", ".join(f"atol(argv[{i + d}])" for d in range(n_dims))
+            lines.append(f"{wtype} {v}_win = {{ {v}, {{ {strides} }} }};")
+            args.append(f"{v}_win")
+            i += n_dims
+        else:
+            args.append(v)
+
+    setup = "\n".join(f"  {line}" for line in lines)
+    return _MAIN.format(
+        ctxt=f"static {_LIB_NAME}_Context ctxt;" if has_ctxt else "",
+        setup=setup,
+        call=f"{p.name}({', '.join(args)})",
+        i=i,
+    )
+
+
+_MAIN = """
+#include <string.h>
+#include <time.h>
+
+static uint64_t exo_bench_state = 0x9E3779B97F4A7C15ull;
+
+// uniform in [-1, 1)
+static double exo_bench_random(void) {{
+  exo_bench_state ^= exo_bench_state << 13;
+  exo_bench_state ^= exo_bench_state >> 7;
+  exo_bench_state ^= exo_bench_state << 17;
+  return (double)(exo_bench_state >> 11) * 0x1.0p-52 - 1.0;
+}}
+
+static void *exo_bench_alloc(long count, size_t size, size_t align) {{
+  size_t bytes = (count * size + align - 1) / align * align;
+  void *p = aligned_alloc(align, bytes ? bytes : align);
+  if (!p) {{
+    fprintf(stderr, "cannot allocate %zu bytes\\n", bytes);
+    exit(1);
+  }}
+  return p;
+}}
+
+static double exo_bench_ns(clockid_t clock) {{
+  struct timespec ts;
+  clock_gettime(clock, &ts);
+  return ts.tv_sec * 1e9 + ts.tv_nsec;
+}}
+
+{ctxt}
+
+// calls are not optimized away when the procedure is inlined, as the
+// barrier may read what they write
+#if defined(__GNUC__)
+#define EXO_BENCH_CALL \\
+  do {{ {call}; __asm__ __volatile__("" ::: "memory"); }} while (0)
+#else
+#define EXO_BENCH_CALL {call}
+#endif
+
+int main(int argc, char **argv) {{
+  (void)argc;
+{setup}
+  long warmup = atol(argv[{i}]);
+  long repeats = atol(argv[{i} + 1]);
+  double min_time = atof(argv[{i} + 2]);
+  long flush_bytes = atol(argv[{i} + 3]);
+  volatile char *flush = flush_bytes ? calloc(flush_bytes, 1) : NULL;
+
+  for (long w = 0; w < warmup; w++)
+    EXO_BENCH_CALL;
+
+  // the calls in every sample, so that a sample takes at least min_time
+  long iterations = 1;
+  while (!flush) {{
+    double start = exo_bench_ns(CLOCK_MONOTONIC);
+    for (long it = 0; it < iterations; it++)
+      EXO_BENCH_CALL;
+    if (exo_bench_ns(CLOCK_MONOTONIC) - start >= min_time || iterations >= (1L << 30))
+      break;
+    iterations *= 2;
+  }}
+  printf("%ld\\n", iterations);
+
+  for (long r = 0; r < repeats; r++) {{
+    for (long b = 0; b < flush_bytes; b += 64)
+      flush[b]++;
+    double real = exo_bench_ns(CLOCK_MONOTONIC);
+    double cpu = exo_bench_ns(CLOCK_PROCESS_CPUTIME_ID);
+    for (long it = 0; it < iterations; it++)
+      EXO_BENCH_CALL;
+    cpu = exo_bench_ns(CLOCK_PROCESS_CPUTIME_ID) - cpu;
+    real = exo_bench_ns(CLOCK_MONOTONIC) - real;
+    printf("%.17g %.17g\\n", real / iterations, cpu / iterations);
+  }}
+  return 0;
+}}
+"""
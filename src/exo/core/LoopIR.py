@@ -1,4 +1,5 @@
 import re
+import weakref
 from collections import ChainMap, defaultdict
 from typing import List, Type
 
@@ -85,8 +86,12 @@ module LoopIR {
          | WindowStmt( sym name, expr rhs )
          attributes( srcinfo srcinfo )
 
+    -- Par loops carry optional OpenMP hints: the schedule kind and chunk
+    -- size, how many perfectly nested parallel loops to collapse, and the
+    -- number of threads, which is a constant or a configuration field
     loop_mode = Seq()
-                | Par()
+                | Par( string? schedule, int? chunk, int? collapse,
+                       expr? num_threads )
 
     expr = Read( sym name, expr* idx )
          | Const( object val )
@@ -615,6 +620,13 @@ def create_window_type(in_name: Sym, in_typ: LoopIR.type, idx):
     return w_typ
 
 
+def loop_mode_exprs(loop_mode):
+    """The expressions which a loop evaluates for its `loop_mode`"""
+    if isinstance(loop_mode, LoopIR.Par) and loop_mode.num_threads is not None:
+        return [loop_mode.num_threads]
+    return []
+
+
 # --------------------------------------------------------------------------- #
 # --------------------------------------------------------------------------- #
 
@@ -722,11 +734,18 @@ class LoopIR_Rewrite:
         elif isinstance(s, LoopIR.For):
             new_lo = self.map_e(s.lo)
             new_hi = self.map_e(s.hi)
+            new_mode = None
+            if loop_mode_exprs(s.loop_mode):
+                if new_threads := self.map_e(s.loop_mode.num_threads):
+                    new_mode = s.loop_mode.update(num_threads=new_threads)
             new_body = self.map_stmts(s.body)
-            if any((new_lo, new_hi, new_body is not None)):
+            if any((new_lo, new_hi, new_mode, new_body is not None)):
                 return [
                     s.update(
-                        lo=new_lo or s.lo, hi=new_hi or s.hi, body=new_body or s.body
+                        lo=new_lo or s.lo,
+                        hi=new_hi or s.hi,
+                        body=new_body or s.body,
+                        loop_mode=new_mode or s.loop_mode,
                     )
                 ]
         elif isinstance(s, LoopIR.Call):
@@ -882,6 +901,8 @@ class LoopIR_Do:
         elif styp is LoopIR.For:
             self.do_e(s.lo)
             self.do_e(s.hi)
+            for e in loop_mode_exprs(s.loop_mode):
+                self.do_e(e)
             self.do_stmts(s.body)
         elif styp is LoopIR.Call:
             for e in s.args:
@@ -988,6 +1009,8 @@ class LoopIR_Compare:
     def match_e(self, e1, e2):
         if type(e1) is not type(e2):
             return False
+        if struct_eq(e1, e2):
+            return True
 
         if isinstance(e1, LoopIR.Read):
             return self.match_name(e1.name, e2.name) and all(
@@ -1045,6 +1068,124 @@ class LoopIR_Compare:
             return type(t1) == type(t2)
 
 
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Structural hashing / hash-consing
+#
+# `struct_key(node)` maps a LoopIR node to an interned StructKey, so that two
+# nodes are structurally equal (ignoring source locations) exactly when their
+# keys are the same object.  A key is built from the already interned keys of
+# the node's children and hashes its fields once at construction, so after
+# the first query comparing or hashing a subtree is constant-time.
+
+
+class StructKey:
+    __slots__ = ("cls", "fields", "_hash", "__weakref__")
+
+    def __init__(self, cls, fields):
+        self.cls = cls
+        self.fields = fields
+        self._hash = hash((cls, fields))
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        # children are interned, so the tuple comparison below only ever
+        # needs identity checks on sub-keys
+        return self is other or (
+            type(other) is StructKey
+            and self._hash == other._hash
+            and self.cls is other.cls
+            and self.fields == other.fields
+        )
+
+
+class _NodeRef(weakref.ref):
+    __slots__ = ("key",)
+
+
+_interned_keys = weakref.WeakValueDictionary()
+_node_keys = dict()
+_struct_fields = dict()
+_LoopIR_nodes = (LoopIR.expr, LoopIR.stmt, LoopIR.type, LoopIR.w_access)
+
+
+def _forget_node(ref):
+    _node_keys.pop(ref.key, None)
+
+
+def _field_key(val):
+    if isinstance(val, list):
+        return tuple([_field_key(v) for v in val])
+    elif isinstance(val, _LoopIR_nodes) or isinstance(val, LoopIR.loop_mode):
+        return struct_key(val)
+    elif isinstance(val, (bool, int, float)):
+        # keep 1, 1.0 and True apart
+        return (type(val), val)
+    else:
+        # symbols, strings and objects compared by identity
+        return val
+
+
+def struct_key(node):
+    """Return the interned structural key of a LoopIR node"""
+    entry = _node_keys.get(id(node))
+    if entry is not None:
+        return entry[1]
+
+    cls = type(node)
+    if (names := _struct_fields.get(cls)) is None:
+        names = tuple(a.name for a in cls.__attrs_attrs__ if a.name != "srcinfo")
+        _struct_fields[cls] = names
+
+    key = StructKey(cls, tuple([_field_key(getattr(node, f)) for f in names]))
+    key = _interned_keys.setdefault(key, key)
+
+    ref = _NodeRef(node, _forget_node)
+    ref.key = id(node)
+    _node_keys[id(node)] = (ref, key)
+    return key
+
+
+def struct_eq(n1, n2):
+    """Structural equality of two LoopIR nodes, ignoring source locations"""
+    return n1 is n2 or struct_key(n1) is struct_key(n2)
+
+
+class _ShareSubtrees(LoopIR_Rewrite):
+    def __init__(self):
+        self.canon = dict()
+
+    def share(self, node):
+        node = self.canon.setdefault(struct_key(node), node)
+        return node
+
+    def map_e(self, e):
+        e2 = super().map_e(e) or e
+        e2 = self.share(e2)
+        return None if e2 is e else e2
+
+    def map_w_access(self, w):
+        w2 = super().map_w_access(w) or w
+        w2 = self.share(w2)
+        return None if w2 is w else w2
+
+    def map_t(self, t):
+        t2 = super().map_t(t) or t
+        t2 = self.share(t2)
+        return None if t2 is t else t2
+
+
+def hashcons_stmts(stmts):
+    """
+    Rewrite `stmts` so that structurally equal expressions, window accesses
+    and types inside of them are represented by one shared node.  Statements
+    themselves are never shared.
+    """
+    return _ShareSubtrees().apply_stmts(stmts)
+
+
 class GetReads(LoopIR_Do):
     def __init__(self):
         self.reads = []
@@ -1170,6 +1311,42 @@ def is_const_zero(e):
     return isinstance(e, LoopIR.Const) and e.val == 0
 
 
+def eval_expr(e, env):
+    """
+    Evaluate the size, index, stride or boolean expression `e` on `env`,
+    which maps names to values and pairs of a name and a dimension to
+    strides.  Raises `KeyError` if `e` reads anything else.
+    """
+    if isinstance(e, LoopIR.Const):
+        return e.val
+    elif isinstance(e, LoopIR.Read) and not e.idx:
+        return env[e.name]
+    elif isinstance(e, LoopIR.StrideExpr):
+        return env[(e.name, e.dim)]
+    elif isinstance(e, LoopIR.USub):
+        return -eval_expr(e.arg, env)
+    elif isinstance(e, LoopIR.BinOp):
+        lhs = eval_expr(e.lhs, env)
+        if e.op == "and":
+            return lhs and eval_expr(e.rhs, env)
+        elif e.op == "or":
+            return lhs or eval_expr(e.rhs, env)
+        rhs = eval_expr(e.rhs, env)
+        return {
+            "+": lambda: lhs + rhs,
+            "-": lambda: lhs - rhs,
+            "*": lambda: lhs * rhs,
+            "/": lambda: lhs // rhs,
+            "%": lambda: lhs % rhs,
+            "==": lambda: lhs == rhs,
+            "<": lambda: lhs < rhs,
+            ">": lambda: lhs > rhs,
+            "<=": lambda: lhs <= rhs,
+            ">=": lambda: lhs >= rhs,
+        }[e.op]()
+    raise KeyError(e)
+
+
 class FreeVars(LoopIR_Do):
     def __init__(self, node):
         assert isinstance(node, list)
@@ -1210,6 +1387,8 @@ class FreeVars(LoopIR_Do):
         elif styp is LoopIR.For:
             self.do_e(s.lo)
             self.do_e(s.hi)
+            for e in loop_mode_exprs(s.loop_mode):
+                self.do_e(e)
             self.push()
             self.env[s.iter] = True
             self.do_stmts(s.body)
@@ -1515,6 +1694,8 @@ class LoopIR_Dependencies(LoopIR_Do):
             self._depends[s.iter].add(s.iter)
             self.do_e(s.lo)
             self.do_e(s.hi)
+            for e in loop_mode_exprs(s.loop_mode):
+                self.do_e(e)
             self._lhs = None
             self._control = False
 
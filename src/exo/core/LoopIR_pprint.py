@@ -458,7 +458,8 @@ def _print_stmt(stmt, env: PrintEnv, indent: str) -> list[str]:
         body_env = env.push()
         loop_type = "par" if isinstance(stmt.loop_mode, LoopIR.Par) else "seq"
         lines = [
-            f"{indent}for {body_env.get_name(stmt.iter)} in {loop_type}({lo}, {hi}):"
+            *_print_loop_hints(stmt.loop_mode, env, indent),
+            f"{indent}for {body_env.get_name(stmt.iter)} in {loop_type}({lo}, {hi}):",
         ]
         lines.extend(_print_block(stmt.body, body_env, indent + "  "))
         return lines
@@ -466,6 +467,21 @@ def _print_stmt(stmt, env: PrintEnv, indent: str) -> list[str]:
     assert False, f"unrecognized stmt: {type(stmt)}"
 
 
+def _print_loop_hints(loop_mode, env: PrintEnv, indent: str) -> list[str]:
+    if not isinstance(loop_mode, LoopIR.Par):
+        return []
+
+    hints = []
+    if loop_mode.schedule is not None:
+        chunk = f", {loop_mode.chunk}" if loop_mode.chunk is not None else ""
+        hints.append(f"schedule({loop_mode.schedule}{chunk})")
+    if loop_mode.collapse is not None:
+        hints.append(f"collapse({loop_mode.collapse})")
+    if loop_mode.num_threads is not None:
+        hints.append(f"num_threads({_print_expr(loop_mode.num_threads, env)})")
+    return [f"{indent}# {' '.join(hints)}"] if hints else []
+
+
 def _print_fnarg(a, env: PrintEnv) -> str:
     if a.type == T.size:
         return f"{env.get_name(a.name)} : size"
@@ -714,5 +730,7 @@ def _print_cursor_stmt(
         lines = _print_stmt(stmt, env, indent)
     if cur == target:
         lines[0] = f"{lines[0]}  # <-- NODE"
+    if isinstance(stmt, LoopIR.For):
+        lines = _print_loop_hints(stmt.loop_mode, env, indent) + lines
 
     return lines
@@ -117,6 +117,23 @@ class Memory(ABC):
     def can_read(cls):
         raise NotImplementedError()
 
+    @classmethod
+    def alignment(cls):
+        """
+        The alignment in bytes that buffers in this memory are guaranteed to
+        have, or None.  Generated code assumes that buffer arguments in this
+        memory are aligned to it.
+        """
+        return None
+
+    @classmethod
+    def ctxt_def(cls):
+        """
+        Lines of C member declarations that this memory needs in the
+        context struct passed to every procedure as `ctxt`.
+        """
+        return []
+
     @classmethod
     def write(cls, s, lhs, rhs):
         raise MemGenError(
@@ -1,5 +1,6 @@
 from inspect import currentframe as _curr_frame, getframeinfo as _get_frame_info
 from re import compile as _re_compile
+from sys import intern as _intern
 
 
 def is_pos_int(obj):
@@ -19,6 +20,8 @@ def is_valid_name(obj):
 
 
 class Sym:
+    __slots__ = ("_nm", "_id", "__weakref__")
+
     _unq_count = 1
 
     def __init__(self, nm):
@@ -62,6 +65,21 @@ def extclass(cls):
 
 
 class SrcInfo:
+    """
+    Source location of a node.  Every LoopIR/UAST node carries one of these,
+    so they are kept compact: no instance dictionary, and the file and
+    function names are interned so that all locations in a file share them.
+    """
+
+    __slots__ = (
+        "filename",
+        "lineno",
+        "col_offset",
+        "end_lineno",
+        "end_col_offset",
+        "function",
+    )
+
     def __init__(
         self,
         filename,
@@ -71,12 +89,12 @@ class SrcInfo:
         end_col_offset=None,
         function=None,
     ):
-        self.filename = filename
+        self.filename = _intern(filename) if type(filename) is str else filename
         self.lineno = lineno
         self.col_offset = col_offset
         self.end_lineno = end_lineno
         self.end_col_offset = end_col_offset
-        self.function = function
+        self.function = _intern(function) if type(function) is str else function
 
     def __str__(self):
         colstr = "" if self.col_offset is None else f":{self.col_offset}"
@@ -90,7 +108,7 @@ def get_srcinfo(depth=1):
     finfo = _get_frame_info(f)
     filename, lineno, function = finfo.filename, finfo.lineno, finfo.function
     del f, finfo
-    return SrcInfo(filename, lineno, function)
+    return SrcInfo(filename, lineno, function=function)
 
 
 _null_srcinfo_obj = SrcInfo("unknown", 0)
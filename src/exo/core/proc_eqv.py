@@ -161,6 +161,27 @@ def check_eqv_proc(proc1, proc2, config_set=frozenset()):
     )
 
 
+def snapshot_eqv():
+    """capture the current equivalence relations so they can be restored"""
+    return (
+        _UF_Strict.copy_entire_UF(),
+        _UF_Unv.copy_entire_UF(),
+        {key: uf.copy_entire_UF() for key, uf in _UF_Unv_key.items()},
+    )
+
+
+def restore_eqv(snapshot):
+    """forget all equivalences asserted since `snapshot` was taken"""
+    global _UF_Strict, _UF_Unv, _UF_Unv_key
+    strict, unv, unv_key = snapshot
+    # procedures declared after the snapshot stay declared, but only
+    # as singletons, i.e. without any of their derived equivalences
+    for proc in list(_UF_Unv.lookup.keys()):
+        for uf in chain([strict, unv], unv_key.values()):
+            uf.new_node(proc)
+    _UF_Strict, _UF_Unv, _UF_Unv_key = strict, unv, unv_key
+
+
 def get_strictest_eqv_proc(proc1, proc2):
     # under the weakest assumptions, are these procedures equivalent?
     is_eqv = _UF_Unv.check_eqv(proc1, proc2)
@@ -1,4 +1,3 @@
-import inspect
 from collections import ChainMap
 
 from . import pyparser
@@ -22,17 +21,16 @@ class ParseFragmentError(Exception):
 def parse_fragment(
     proc, fragment, ctx_stmt, call_depth=1, configs=[], scope="before", expr_holes=None
 ):
-    stack_frames: [inspect.FrameInfo] = inspect.stack()
     # get source location where this is getting called from
-    caller = inspect.getframeinfo(stack_frames[call_depth][0])
-    func_locals = ChainMap(stack_frames[call_depth].frame.f_locals)
-    func_globals = ChainMap(stack_frames[call_depth].frame.f_globals)
+    frame = pyparser.get_caller_frame(depth=call_depth)
+    func_locals = ChainMap(frame.f_locals)
+    func_globals = ChainMap(frame.f_globals)
 
     # parse the pattern we're going to use to match
     p_ast = pyparser.pattern(
         fragment,
-        filename=caller.filename,
-        lineno=caller.lineno,
+        filename=frame.f_code.co_filename,
+        lineno=frame.f_lineno,
         srclocals=func_locals,
         srcglobals=func_globals,
     )
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import ast as pyast
+import builtins
+import functools
+import hashlib
+import io
+import os
+import pickle
+import sys
+import tempfile
+import types
+from typing import Optional
+
+from ..core.configs import Config
+from ..core.extern import Extern
+from ..core.LoopIR import LoopIR
+from ..core.prelude import Sym
+from .pyparser import Scope, SourceInfo
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# On-disk cache of checked procedure definitions
+#
+# Parsing, typechecking and bounds checking a procedure definition only
+# depends on its source, on the Python values that the names in that source
+# resolve to, and on the sources of Exo doing the checking.  When the
+# environment variable EXO_CACHE_DIR names a directory, the LoopIR that a
+# definition produces is stored there under a hash of exactly those inputs,
+# and later definitions with the same hash load the LoopIR instead of
+# checking it again.
+#
+# Only definitions whose inputs we can faithfully fingerprint and whose
+# LoopIR we can faithfully restore are cached.  In particular, definitions
+# which run metaprogramming code, call other procedures, access
+# configurations or use externs are always checked from scratch.
+
+CACHE_DIR_VAR = "EXO_CACHE_DIR"
+
+
+def cache_dir() -> Optional[str]:
+    return os.environ.get(CACHE_DIR_VAR) or None
+
+
+def proc_cache_key(
+    fdef: pyast.FunctionDef, src_info: SourceInfo, instr, parent_scope: Scope
+) -> Optional[str]:
+    """
+    Returns the cache key of the definition `fdef`, or None if the
+    definition cannot be cached.
+    """
+    from .. import __version__
+
+    if (scope := _scope_fingerprint(fdef, parent_scope)) is None:
+        return None
+
+    key = (
+        __version__,
+        _exo_fingerprint(),
+        sys.version_info[:2],
+        src_info.src_file,
+        src_info.src_line_offset,
+        src_info.src_col_offset,
+        pyast.dump(fdef, include_attributes=True),
+        instr,
+        scope,
+    )
+    return hashlib.sha256(repr(key).encode()).hexdigest()
+
+
+def load_proc(key: str) -> Optional[LoopIR.proc]:
+    """Returns the cached procedure stored under `key`, if there is one"""
+    try:
+        with open(_cache_path(key), "rb") as f:
+            proc = _Unpickler(f).load()
+    except Exception:
+        # missing, unreadable or stale entries are simply rebuilt
+        return None
+    return proc if isinstance(proc, LoopIR.proc) else None
+
+
+def store_proc(key: str, proc: LoopIR.proc):
+    """Stores `proc` under `key`, if it can be restored faithfully"""
+    buf = io.BytesIO()
+    try:
+        _Pickler(buf, protocol=pickle.HIGHEST_PROTOCOL).dump(proc)
+    except (_Uncacheable, pickle.PicklingError, AttributeError, TypeError):
+        # e.g. memories that are not defined at the top level of a module
+        return
+
+    path = _cache_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temporary file first, so that concurrent builds never
+        # observe partially written entries
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(buf.getvalue())
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+@functools.cache
+def _exo_fingerprint():
+    # the version alone does not change in a development checkout, so the
+    # modification times and sizes of the sources of the package are part of
+    # every key
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    stats = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for nm in sorted(filenames):
+            if nm.endswith(".py"):
+                st = os.stat(os.path.join(dirpath, nm))
+                stats.append(
+                    (
+                        os.path.relpath(os.path.join(dirpath, nm), root),
+                        st.st_mtime_ns,
+                        st.st_size,
+                    )
+                )
+    return hashlib.sha256(repr(stats).encode()).hexdigest()
+
+
+def _cache_path(key):
+    return os.path.join(cache_dir(), "procs", key[:2], key[2:] + ".pickle")
+
+
+# --------------------------------------------------------------------------- #
+# Fingerprints of captured Python values
+
+
+def _scope_fingerprint(fdef, parent_scope):
+    global_vals = parent_scope.get_globals()
+    local_vals = parent_scope.read_locals()
+
+    fingerprint = []
+    for nm in sorted({n.id for n in pyast.walk(fdef) if isinstance(n, pyast.Name)}):
+        if nm in local_vals:
+            if local_vals[nm] is None:
+                fingerprint.append((nm, "unbound"))
+                continue
+            val = local_vals[nm].val
+        elif nm in global_vals:
+            val = global_vals[nm]
+        elif hasattr(builtins, nm):
+            val = getattr(builtins, nm)
+        else:
+            fingerprint.append((nm, "undefined"))
+            continue
+
+        if (val_fingerprint := _value_fingerprint(val)) is None:
+            return None
+        fingerprint.append((nm, val_fingerprint))
+
+    return tuple(fingerprint)
+
+
+def _value_fingerprint(val):
+    if val is None or type(val) in (bool, int, float, str):
+        return (type(val).__name__, repr(val))
+    elif isinstance(val, (type, types.FunctionType, types.BuiltinFunctionType)):
+        # classes (e.g. memories) and functions are identified by the
+        # name that they can be imported under
+        if _lookup_global(val.__module__, val.__qualname__) is val:
+            return ("global", val.__module__, val.__qualname__)
+    return None
+
+
+def _lookup_global(module, qualname):
+    obj = sys.modules.get(module)
+    for attr in qualname.split("."):
+        obj = getattr(obj, attr, None)
+    return obj
+
+
+# --------------------------------------------------------------------------- #
+# Serialization of LoopIR
+
+
+class _Uncacheable(Exception):
+    pass
+
+
+_node_classes = {cls: nm for nm, cls in vars(LoopIR).items() if isinstance(cls, type)}
+
+
+def _make_node(nm, fields):
+    return getattr(LoopIR, nm)(*fields)
+
+
+class _Pickler(pickle.Pickler):
+    def persistent_id(self, obj):
+        if isinstance(obj, Sym):
+            return (obj._nm, obj._id)
+        return None
+
+    def reducer_override(self, obj):
+        if isinstance(obj, (LoopIR.Call, Config, Extern)):
+            # these refer to objects whose identity matters, and which can
+            # therefore not be copied into the cache
+            raise _Uncacheable()
+        elif (nm := _node_classes.get(type(obj))) is not None:
+            fields = tuple(getattr(obj, a.name) for a in type(obj).__attrs_attrs__)
+            return _make_node, (nm, fields)
+        return NotImplemented
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, f):
+        super().__init__(f)
+        self.syms = dict()
+
+    def persistent_load(self, pid):
+        # symbols must be fresh in every process that loads the procedure
+        nm, sym_id = pid
+        if (sym := self.syms.get(sym_id)) is None:
+            sym = self.syms[sym_id] = Sym(nm)
+        return sym
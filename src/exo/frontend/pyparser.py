@@ -2,10 +2,13 @@ from __future__ import annotations
 
 import ast as pyast
 import inspect
+import linecache
+import os
 import re
 import sys
 import textwrap
-from collections import ChainMap
+import types
+from collections import ChainMap, OrderedDict
 
 from asdl_adt.validators import ValidationError
 
@@ -71,6 +74,20 @@ class SourceInfo:
 
 
 def get_ast_from_python(f: Callable[..., Any]) -> tuple[pyast.stmt, SourceInfo]:
+    if isinstance(f, types.FunctionType):
+        code = f.__code__
+        source_file = _get_source_file(code.co_filename, f.__globals__)
+        if source_file is not None:
+            node = source_file.defs.get(code.co_firstlineno)
+            if isinstance(node, pyast.FunctionDef) and node.name == f.__name__:
+                # the node is part of the AST of the whole file, so its
+                # locations need no adjustment
+                return node, SourceInfo(
+                    src_file=source_file.filename,
+                    src_line_offset=0,
+                    src_col_offset=0,
+                )
+
     # note that we must dedent in case the function is defined
     # inside of a local scope
     rawsrc = inspect.getsource(f)
@@ -90,6 +107,60 @@ def get_ast_from_python(f: Callable[..., Any]) -> tuple[pyast.stmt, SourceInfo]:
     )
 
 
+@dataclass
+class _SourceFile:
+    """
+    A parsed source file, with its function and class definitions indexed
+    by the line that they start on (including decorators).
+    """
+
+    filename: str
+    version: Optional[tuple[int, int]]
+    lines: list[str]
+    defs: dict[int, pyast.stmt]
+
+
+# A module typically defines many procedures, so rather than scanning and
+# parsing its source once per definition, we parse every source file once.
+_source_files: dict[str, _SourceFile] = {}
+
+
+def _get_source_file(filename, module_globals) -> Optional[_SourceFile]:
+    try:
+        stat = os.stat(filename)
+        version = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        # e.g. notebook cells, which are only known to linecache
+        version = None
+
+    source_file = _source_files.get(filename)
+    if source_file is not None and version is not None:
+        if source_file.version == version:
+            return source_file
+
+    linecache.checkcache(filename)
+    lines = linecache.getlines(filename, module_globals)
+    if not lines:
+        return None
+    elif source_file is not None and source_file.lines == lines:
+        return source_file
+
+    try:
+        module = pyast.parse("".join(lines))
+    except SyntaxError:
+        return None
+
+    defs = {}
+    for node in pyast.walk(module):
+        if isinstance(node, (pyast.FunctionDef, pyast.ClassDef)):
+            start = min([d.lineno for d in node.decorator_list] + [node.lineno])
+            defs.setdefault(start, node)
+
+    source_file = _SourceFile(filename, version, lines, defs)
+    _source_files[filename] = source_file
+    return source_file
+
+
 @dataclass
 class BoundLocal:
     """
@@ -157,14 +228,24 @@ Scope = Union[
 ]  # Type to represent scopes, which have an API for getting global and local variables.
 
 
+def get_caller_frame(*, depth) -> types.FrameType:
+    """
+    Get the frame `depth` levels up the stack from the caller of this
+    function, i.e. the caller's `inspect.stack()[depth].frame`, without
+    loading the source context of every frame on the stack
+    """
+    frame = inspect.currentframe().f_back
+    for _ in range(depth):
+        frame = frame.f_back
+        assert frame is not None
+    return frame
+
+
 def get_parent_scope(*, depth) -> Scope:
     """
     Get global and local environments for context capture purposes
     """
-    stack_frames = inspect.stack()
-    assert len(stack_frames) >= depth
-    frame = stack_frames[depth].frame
-    return FrameScope(frame)
+    return FrameScope(get_caller_frame(depth=depth))
 
 
 # --------------------------------------------------------------------------- #
@@ -413,6 +494,7 @@ class UnquoteEnv:
         self,
         stmts: list[pyast.stmt],
         quote_stmt_processor: Optional[Callable[[Any], None]],
+        src_info: SourceInfo,
     ) -> Any:
         """
         Interpret a metalanguage block of code. This is done by pasting the AST of the metalanguage code
@@ -427,11 +509,13 @@ class UnquoteEnv:
             for name, val in self.exo_locals.items()
             if isinstance(val, Sym)
         }
-        unbound_names = {
-            name
-            for name, val in self.parent_locals.items()
-            if val is None and name not in quote_locals
-        }
+        unbound_names = tuple(
+            sorted(
+                name
+                for name, val in self.parent_locals.items()
+                if val is None and name not in quote_locals
+            )
+        )
         bound_locals = {
             name: val.val
             for name, val in self.parent_locals.items()
@@ -444,150 +528,211 @@ class UnquoteEnv:
             else None
         )
         self.parent_globals[QUOTE_STMT_PROCESSOR] = quote_stmt_processor
+        code = _compile_unquote_block(
+            stmts, src_info, tuple(bound_locals), unbound_names, tuple(quote_locals)
+        )
         exec(
-            compile(
-                pyast.fix_missing_locations(
-                    pyast.Module(
+            code,
+            self.parent_globals,
+            env_locals,
+        )
+        self.parent_globals[QUOTE_STMT_PROCESSOR] = old_stmt_processor
+        return env_locals[UNQUOTE_RETURN_HELPER]
+
+    def interpret_unquote_expr(self, expr: pyast.expr, src_info: SourceInfo):
+        """
+        Parse a metalanguage expression using the machinery provided by interpret_unquote_block.
+        """
+        return self.interpret_unquote_block([pyast.Return(value=expr)], None, src_info)
+
+
+# Generators of metaprogrammed procedures evaluate the same unquotes over and
+# over again, so we compile the helper module for each distinct unquote only
+# once, and afterwards merely run it with fresh values for its arguments.
+_unquote_code_cache: OrderedDict[tuple, types.CodeType] = OrderedDict()
+_UNQUOTE_CODE_CACHE_SIZE = 4096
+
+
+def _unquote_source_key(stmts: list[pyast.stmt], src_info: SourceInfo) -> tuple:
+    # Quoted object code is parsed from fresh copies of its AST every time it
+    # is evaluated, so unquotes are identified by where they are in the source
+    # and by the text of the lines there, which changes if the file is edited.
+    spans = []
+    for s in stmts:
+        # unquoted expressions are wrapped in a synthesized return statement
+        node = s if hasattr(s, "lineno") else getattr(s, "value", None)
+        if getattr(node, "end_lineno", None) is None:
+            spans = None
+            break
+        spans.append(
+            (node.lineno, node.col_offset, node.end_lineno, node.end_col_offset)
+        )
+    if spans:
+        first = min(span[0] for span in spans) + src_info.src_line_offset
+        last = max(span[2] for span in spans) + src_info.src_line_offset
+        lines = linecache.getlines(src_info.src_file)[first - 1 : last]
+    if not spans or len(lines) != last - first + 1:
+        # the code was synthesized by the parser, or its source is unavailable
+        # (e.g. for code passed to exec()), so it can only be keyed by its AST
+        return tuple(pyast.dump(s, include_attributes=True) for s in stmts)
+    return (
+        src_info.src_file,
+        src_info.src_line_offset,
+        src_info.src_col_offset,
+        tuple(spans),
+        tuple(lines),
+    )
+
+
+def _compile_unquote_block(
+    stmts: list[pyast.stmt],
+    src_info: SourceInfo,
+    bound_names: tuple[str, ...],
+    unbound_names: tuple[str, ...],
+    quote_names: tuple[str, ...],
+) -> types.CodeType:
+    key = (
+        _unquote_source_key(stmts, src_info),
+        bound_names,
+        unbound_names,
+        quote_names,
+    )
+    if (code := _unquote_code_cache.get(key)) is not None:
+        _unquote_code_cache.move_to_end(key)
+        return code
+
+    code = compile(
+        pyast.fix_missing_locations(
+            pyast.Module(
+                body=[
+                    pyast.FunctionDef(
+                        name=OUTER_SCOPE_HELPER,
+                        args=pyast.arguments(
+                            posonlyargs=[],
+                            args=[
+                                *[pyast.arg(arg=arg) for arg in bound_names],
+                                *[pyast.arg(arg=arg) for arg in unbound_names],
+                                *[pyast.arg(arg=arg) for arg in quote_names],
+                            ],
+                            kwonlyargs=[],
+                            kw_defaults=[],
+                            defaults=[],
+                        ),
                         body=[
+                            *(
+                                [
+                                    pyast.Delete(
+                                        targets=[
+                                            pyast.Name(
+                                                id=name,
+                                                ctx=pyast.Del(),
+                                            )
+                                            for name in unbound_names
+                                        ]
+                                    )
+                                ]
+                                if len(unbound_names) != 0
+                                else []
+                            ),
                             pyast.FunctionDef(
-                                name=OUTER_SCOPE_HELPER,
+                                name=NESTED_SCOPE_HELPER,
                                 args=pyast.arguments(
                                     posonlyargs=[],
-                                    args=[
-                                        *[pyast.arg(arg=arg) for arg in bound_locals],
-                                        *[pyast.arg(arg=arg) for arg in unbound_names],
-                                        *[pyast.arg(arg=arg) for arg in quote_locals],
-                                    ],
+                                    args=[],
                                     kwonlyargs=[],
                                     kw_defaults=[],
                                     defaults=[],
                                 ),
                                 body=[
-                                    *(
-                                        [
-                                            pyast.Delete(
-                                                targets=[
-                                                    pyast.Name(
-                                                        id=name,
-                                                        ctx=pyast.Del(),
-                                                    )
-                                                    for name in unbound_names
-                                                ]
-                                            )
-                                        ]
-                                        if len(unbound_names) != 0
-                                        else []
-                                    ),
-                                    pyast.FunctionDef(
-                                        name=NESTED_SCOPE_HELPER,
-                                        args=pyast.arguments(
-                                            posonlyargs=[],
-                                            args=[],
-                                            kwonlyargs=[],
-                                            kw_defaults=[],
-                                            defaults=[],
-                                        ),
-                                        body=[
-                                            pyast.Expr(
-                                                value=pyast.Lambda(
-                                                    args=pyast.arguments(
-                                                        posonlyargs=[],
-                                                        args=[],
-                                                        kwonlyargs=[],
-                                                        kw_defaults=[],
-                                                        defaults=[],
-                                                    ),
-                                                    body=pyast.Tuple(
-                                                        elts=[
-                                                            *[
-                                                                pyast.Name(
-                                                                    id=arg,
-                                                                    ctx=pyast.Load(),
-                                                                )
-                                                                for arg in bound_locals
-                                                            ],
-                                                            *[
-                                                                pyast.Name(
-                                                                    id=arg,
-                                                                    ctx=pyast.Load(),
-                                                                )
-                                                                for arg in unbound_names
-                                                            ],
-                                                            *[
-                                                                pyast.Name(
-                                                                    id=arg,
-                                                                    ctx=pyast.Load(),
-                                                                )
-                                                                for arg in quote_locals
-                                                            ],
-                                                        ],
-                                                        ctx=pyast.Load(),
-                                                    ),
-                                                )
+                                    pyast.Expr(
+                                        value=pyast.Lambda(
+                                            args=pyast.arguments(
+                                                posonlyargs=[],
+                                                args=[],
+                                                kwonlyargs=[],
+                                                kw_defaults=[],
+                                                defaults=[],
                                             ),
-                                            *stmts,
-                                        ],
-                                        decorator_list=[],
-                                    ),
-                                    pyast.Return(
-                                        value=pyast.Call(
-                                            func=pyast.Name(
-                                                id=NESTED_SCOPE_HELPER,
+                                            body=pyast.Tuple(
+                                                elts=[
+                                                    *[
+                                                        pyast.Name(
+                                                            id=arg,
+                                                            ctx=pyast.Load(),
+                                                        )
+                                                        for arg in bound_names
+                                                    ],
+                                                    *[
+                                                        pyast.Name(
+                                                            id=arg,
+                                                            ctx=pyast.Load(),
+                                                        )
+                                                        for arg in unbound_names
+                                                    ],
+                                                    *[
+                                                        pyast.Name(
+                                                            id=arg,
+                                                            ctx=pyast.Load(),
+                                                        )
+                                                        for arg in quote_names
+                                                    ],
+                                                ],
                                                 ctx=pyast.Load(),
                                             ),
-                                            args=[],
-                                            keywords=[],
                                         )
                                     ),
+                                    *stmts,
                                 ],
                                 decorator_list=[],
                             ),
-                            pyast.Assign(
-                                targets=[
-                                    pyast.Name(
-                                        id=UNQUOTE_RETURN_HELPER, ctx=pyast.Store()
-                                    )
-                                ],
+                            pyast.Return(
                                 value=pyast.Call(
                                     func=pyast.Name(
-                                        id=OUTER_SCOPE_HELPER,
+                                        id=NESTED_SCOPE_HELPER,
                                         ctx=pyast.Load(),
                                     ),
-                                    args=[
-                                        *[
-                                            pyast.Name(id=name, ctx=pyast.Load())
-                                            for name in bound_locals
-                                        ],
-                                        *[
-                                            pyast.Constant(value=None)
-                                            for _ in unbound_names
-                                        ],
-                                        *[
-                                            pyast.Name(id=name, ctx=pyast.Load())
-                                            for name in quote_locals
-                                        ],
-                                    ],
+                                    args=[],
                                     keywords=[],
-                                ),
+                                )
                             ),
                         ],
-                        type_ignores=[],
-                    )
-                ),
-                "",
-                "exec",
-            ),
-            self.parent_globals,
-            env_locals,
-        )
-        self.parent_globals[QUOTE_STMT_PROCESSOR] = old_stmt_processor
-        return env_locals[UNQUOTE_RETURN_HELPER]
-
-    def interpret_unquote_expr(self, expr: pyast.expr):
-        """
-        Parse a metalanguage expression using the machinery provided by interpret_unquote_block.
-        """
-        return self.interpret_unquote_block([pyast.Return(value=expr)], None)
+                        decorator_list=[],
+                    ),
+                    pyast.Assign(
+                        targets=[
+                            pyast.Name(id=UNQUOTE_RETURN_HELPER, ctx=pyast.Store())
+                        ],
+                        value=pyast.Call(
+                            func=pyast.Name(
+                                id=OUTER_SCOPE_HELPER,
+                                ctx=pyast.Load(),
+                            ),
+                            args=[
+                                *[
+                                    pyast.Name(id=name, ctx=pyast.Load())
+                                    for name in bound_names
+                                ],
+                                *[pyast.Constant(value=None) for _ in unbound_names],
+                                *[
+                                    pyast.Name(id=name, ctx=pyast.Load())
+                                    for name in quote_names
+                                ],
+                            ],
+                            keywords=[],
+                        ),
+                    ),
+                ],
+                type_ignores=[],
+            )
+        ),
+        "",
+        "exec",
+    )
+    if len(_unquote_code_cache) >= _UNQUOTE_CODE_CACHE_SIZE:
+        # evict the least recently used entry
+        _unquote_code_cache.popitem(last=False)
+    _unquote_code_cache[key] = code
+    return code
 
 
 # --------------------------------------------------------------------------- #
@@ -704,7 +849,8 @@ class Parser:
                 )
                 quote_replacer = QuoteReplacer(self.src_info, unquote_env)
                 unquoted = unquote_env.interpret_unquote_expr(
-                    quote_replacer.visit(copy.deepcopy(unquote_node.elts[0]))
+                    quote_replacer.visit(copy.deepcopy(unquote_node.elts[0])),
+                    self.src_info,
                 )
                 return (unquoted,)
         elif (
@@ -721,7 +867,7 @@ class Parser:
                         cur_globals,
                         cur_locals,
                         self.exo_locals,
-                    ).interpret_unquote_expr(unquote_node),
+                    ).interpret_unquote_expr(unquote_node, self.src_info),
                 )
                 if unquote_node.id in cur_locals or unquote_node.id in cur_globals
                 else tuple()
@@ -738,7 +884,7 @@ class Parser:
                 **{k: BoundLocal(v) for k, v in self.exo_locals.items()},
             },
             self.exo_locals,
-        ).interpret_unquote_expr(expr)
+        ).interpret_unquote_expr(expr, self.src_info)
 
     # - # - # - # - # - # - # - # - # - # - # - # - # - # - # - #
     # structural parsing rules...
@@ -1039,6 +1185,7 @@ class Parser:
                             for python_s in s.body
                         ],
                         lambda stmts: rstmts.extend(stmts),
+                        self.src_info,
                     )
                 else:
                     self.err(s, "Expected unquote")
@@ -327,7 +327,8 @@ class TypeChecker:
             if isinstance(stmt.cond, UAST.SeqRange):
                 return [LoopIR.For(stmt.iter, lo, hi, body, LoopIR.Seq(), stmt.srcinfo)]
             elif isinstance(stmt.cond, UAST.ParRange):
-                return [LoopIR.For(stmt.iter, lo, hi, body, LoopIR.Par(), stmt.srcinfo)]
+                par = LoopIR.Par(None, None, None, None)
+                return [LoopIR.For(stmt.iter, lo, hi, body, par, stmt.srcinfo)]
             else:
                 assert False, "bad case"
 
@@ -0,0 +1,314 @@
+"""
+Compiling procedures in-process, and calling them with NumPy arrays.
+
+`Procedure.jit()` compiles a procedure, and the procedures that it calls,
+with the system C compiler into a shared library, loads the library with
+ctypes and returns a `JITProcedure`.  Libraries are cached on disk under a
+hash of their C code and of the compiler command, so compiling a procedure
+which was compiled before only generates its C code again.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import functools
+import hashlib
+import operator
+import os
+import shlex
+import subprocess
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from .API import Procedure, compile_procs_to_strings
+from .backend.LoopIR_compiler import find_all_configs, find_all_subprocs
+from .backend.call_args import bind_args, dtypes, inferable_sizes
+from .core.LoopIR import T, eval_expr, get_writes_of_stmts
+from .frontend import proc_cache
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Compiling and loading libraries
+
+DEFAULT_CFLAGS = "-O3 -march=native"
+
+# the generated library and its context struct are named after this
+_LIB_NAME = "exo_jit"
+
+
+class JITCompileError(Exception):
+    pass
+
+
+def cache_dir() -> Path:
+    """
+    The directory holding compiled libraries: `jit` in EXO_CACHE_DIR when
+    that is set, and `exo/jit` in the user's cache directory otherwise.
+    """
+    if base := proc_cache.cache_dir():
+        return Path(base) / "jit"
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "exo" / "jit"
+
+
+def jit(proc, cc=None, cflags=None) -> "JITProcedure":
+    """
+    Compile `proc` with the C compiler `cc` and the flags `cflags`, and
+    return a callable which runs it (see `JITProcedure`).
+
+    `cc` defaults to the environment variable CC, or to `cc`.  `cflags` is a
+    list or a string of flags, and defaults to the environment variable
+    CFLAGS, or to `-O3 -march=native`.
+    """
+    if not isinstance(proc, Procedure) or proc.is_instr():
+        raise TypeError("jit() expects a Procedure which is not an instruction")
+
+    cc, cflags = _compiler(cc, cflags)
+    source, header = compile_procs_to_strings([proc], f"{_LIB_NAME}.h")
+    has_ctxt = f"typedef struct {_LIB_NAME}_Context" in header
+    source += _helpers(has_ctxt)
+
+    key = hashlib.sha256(repr((cc, cflags, source, header)).encode()).hexdigest()
+    lib = _load(key, cc + cflags, source, header)
+    return JITProcedure(proc, lib, has_ctxt)
+
+
+def _compiler(cc, cflags):
+    cc = shlex.split(cc or os.environ.get("CC", "cc"))
+    if cflags is None:
+        cflags = os.environ.get("CFLAGS", DEFAULT_CFLAGS)
+    cflags = shlex.split(cflags) if isinstance(cflags, str) else list(cflags)
+    return cc, cflags
+
+
+def _helpers(has_ctxt):
+    # the size of int_fast32_t depends on the platform, and the size of the
+    # context struct on the memories which add fields to it
+    lines = [
+        "",
+        "int exo_jit_sizeof_int(void) { return sizeof(int_fast32_t); }",
+    ]
+    if has_ctxt:
+        lines.append(
+            f"int exo_jit_sizeof_ctxt(void) {{ return sizeof({_LIB_NAME}_Context); }}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+# libraries loaded by this process, by key
+_libraries = dict()
+
+
+def _load(key, command, source, header) -> ctypes.CDLL:
+    if (lib := _libraries.get(key)) is None:
+        path = cache_dir() / f"{key}.so"
+        if not path.exists():
+            _build(path, command, source, header)
+        lib = _libraries[key] = ctypes.CDLL(str(path))
+    return lib
+
+
+def _build(path: Path, command, source, header, shared=True):
+    # builds a shared library, or an executable if not `shared`
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=path.parent) as tmp:
+        tmp = Path(tmp)
+        (tmp / f"{_LIB_NAME}.c").write_text(source)
+        (tmp / f"{_LIB_NAME}.h").write_text(header)
+        command = [
+            *command,
+            *(["-shared", "-fPIC"] if shared else []),
+            "-o",
+            "out",
+            f"{_LIB_NAME}.c",
+            "-lm",
+        ]
+        try:
+            result = subprocess.run(command, cwd=tmp, capture_output=True, text=True)
+        except OSError as e:
+            raise JITCompileError(f"cannot run {shlex.join(command)}: {e}") from e
+        if result.returncode != 0:
+            raise JITCompileError(
+                f"{shlex.join(command)} failed:\n{result.stdout}{result.stderr}"
+            )
+        # builds of the same key produce the same file, so it does not
+        # matter which of several concurrent builds is renamed last
+        os.replace(tmp / "out", path)
+
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Calling compiled procedures
+
+_ctypes = {
+    T.f32: ctypes.c_float,
+    T.f64: ctypes.c_double,
+    T.i8: ctypes.c_int8,
+    T.ui8: ctypes.c_uint8,
+    T.ui16: ctypes.c_uint16,
+    T.i32: ctypes.c_int32,
+    T.bool: ctypes.c_bool,
+}
+
+
+class JITProcedure:
+    """
+    A procedure compiled into a shared library.  Calling it runs the
+    procedure on the arguments, by position or by name:
+
+    - sizes, indices and strides are ints, and bools are bools.  Sizes which
+      are dimensions of tensor arguments may be left out, if all the other
+      arguments are passed by position, or if they are passed by name.
+    - tensors are C-contiguous NumPy arrays, and windows are NumPy arrays
+      with any strides which are multiples of their item size.  Their dtype
+      and shape must match the argument.
+    - scalars are NumPy arrays of one element, or Python numbers if the
+      procedure does not write them.
+
+    Assertions of the procedure which only depend on sizes and strides are
+    checked before the call.  `ctxt` holds the configurations of the
+    procedure as a ctypes struct, with a field of the same name for each
+    configuration.  It is passed to every call, so that configurations keep
+    their values between calls, as they do in C.
+    """
+
+    def __init__(self, proc: Procedure, lib: ctypes.CDLL, has_ctxt: bool):
+        p = proc._loopir_proc
+        self._proc = p
+        self._writes = {nm for nm, _ in get_writes_of_stmts(p.body)}
+        # the sizes which are dimensions of tensors can be left out
+        self._inferable = inferable_sizes(p)
+
+        int_t = {4: ctypes.c_int32, 8: ctypes.c_int64}[lib.exo_jit_sizeof_int()]
+        self._int_t = int_t
+
+        self.ctxt = None
+        if has_ctxt:
+            configs = find_all_configs(find_all_subprocs([p]))
+            self.ctxt = _context_type(configs, lib.exo_jit_sizeof_ctxt(), int_t)()
+
+        self._fn = getattr(lib, p.name)
+        self._fn.restype = None
+        self._fn.argtypes = [ctypes.c_void_p] + [self._ctype(a) for a in p.args]
+
+    def name(self):
+        return self._proc.name
+
+    def _ctype(self, a):
+        if a.type in (T.size, T.index, T.stride):
+            return self._int_t
+        elif a.type == T.bool:
+            return ctypes.c_bool
+        elif a.type.is_win():
+            return _window_type(len(a.type.shape()), self._int_t)
+        else:
+            return ctypes.c_void_p
+
+    def __call__(self, *args, **kwargs):
+        p = self._proc
+        values = bind_args(p, args, kwargs, self._inferable)
+        env = {a.name: values[a.name] for a in p.args if not a.type.is_numeric()}
+
+        # keeps the scalars passed by pointer alive until the call returns
+        refs = []
+        c_args = [self._convert(a, values[a.name], env, refs) for a in p.args]
+        self._check_preds(env)
+
+        ctxt = None if self.ctxt is None else ctypes.byref(self.ctxt)
+        self._fn(ctxt, *c_args)
+
+    def _convert(self, a, val, env, refs):
+        nm = f"{self._proc.name}() argument '{a.name}'"
+        if a.type == T.bool:
+            return bool(val)
+        elif not a.type.is_numeric():
+            return operator.index(val)
+
+        dtype = np.dtype(dtypes[a.type.basetype()])
+        if a.type.is_real_scalar():
+            if isinstance(val, np.ndarray):
+                if val.dtype != dtype or val.size != 1:
+                    raise ValueError(f"{nm} must be one element of dtype {dtype}")
+                return val.ctypes.data
+            if a.name in self._writes:
+                raise TypeError(f"{nm} is written, so it must be a NumPy array")
+            ref = np.array([val], dtype=dtype)
+            refs.append(ref)
+            return ref.ctypes.data
+
+        if not isinstance(val, np.ndarray):
+            raise TypeError(f"{nm} must be a NumPy array")
+        if val.dtype != dtype:
+            raise ValueError(f"{nm} must have dtype {dtype}, not {val.dtype}")
+        shape = tuple(eval_expr(e, env) for e in a.type.shape())
+        if val.shape != shape:
+            raise ValueError(f"{nm} must have shape {shape}, not {val.shape}")
+        if a.name in self._writes and not val.flags.writeable:
+            raise ValueError(f"{nm} is written, so it must be writeable")
+        if (align := a.mem and a.mem.alignment()) and val.ctypes.data % align:
+            raise ValueError(f"{nm} must be aligned to {align} bytes")
+
+        if not a.type.is_win():
+            if not val.flags.c_contiguous:
+                raise ValueError(f"{nm} must be C-contiguous")
+            return val.ctypes.data
+
+        if any(s % val.itemsize for s in val.strides):
+            raise ValueError(f"{nm} has strides which are not multiples of items")
+        strides = [s // val.itemsize for s in val.strides]
+        for dim, s in enumerate(strides):
+            env[(a.name, dim)] = s
+        return _window_type(val.ndim, self._int_t)(val.ctypes.data, tuple(strides))
+
+    def _check_preds(self, env):
+        for pred in self._proc.preds:
+            try:
+                holds = eval_expr(pred, env)
+            except KeyError:
+                # depends on configurations, or on the contents of buffers
+                continue
+            if not holds:
+                raise ValueError(
+                    f"the arguments of {self._proc.name}() violate the "
+                    f"assertion {pred}"
+                )
+
+
+@functools.cache
+def _window_type(n_dims, int_t):
+    return type(
+        f"exo_win_{n_dims}",
+        (ctypes.Structure,),
+        {"_fields_": [("data", ctypes.c_void_p), ("strides", int_t * n_dims)]},
+    )
+
+
+def _context_type(configs, size, int_t):
+    def field_type(c, nm):
+        typ = c.lookup_type(nm)
+        if typ in (T.size, T.index, T.stride):
+            return int_t
+        elif typ in _ctypes:
+            return _ctypes[typ]
+        raise TypeError(f"cannot pass {c.name()}.{nm} of type {typ} to C")
+
+    fields = []
+    for c in sorted(configs, key=lambda c: c.name()):
+        if c.is_allow_rw():
+            struct = type(
+                c.name(),
+                (ctypes.Structure,),
+                {"_fields_": [(nm, field_type(c, nm)) for nm, _ in c.fields()]},
+            )
+            fields.append((c.name(), struct))
+
+    # the fields which memories add to the context are not accessible, but
+    # are allocated, after the configurations as in C
+    ctxt = type("Context", (ctypes.Structure,), {"_fields_": fields})
+    if (extra := size - ctypes.sizeof(ctxt)) > 0:
+        words = -(-extra // 8)
+        fields.append(("_memories", ctypes.c_uint64 * words))
+        ctxt = type("Context", (ctypes.Structure,), {"_fields_": fields})
+    return ctxt
@@ -0,0 +1,90 @@
+#ifndef EXO_ARENA_H
+#define EXO_ARENA_H
+
+// Scratch arena for buffers in the DRAM_ARENA memory.
+//
+// Buffers are bump-allocated from a caller-provided block of memory and
+// returned to it in O(1).  Exo frees each buffer after its last use, which
+// is not always in the reverse order of allocation, so every buffer has a
+// small header, and freeing a buffer pops all freed buffers off the top of
+// the arena.  When the arena is missing or full, buffers are allocated with
+// aligned_alloc instead.
+//
+// Usage:
+//     static uint8_t scratch[1 << 20];
+//     struct exo_arena arena;
+//     exo_arena_init(&arena, scratch, sizeof(scratch));
+//     ctxt.arena = &arena;
+//
+// An arena must not be used by more than one thread at a time.
+
+#include <stdint.h>
+#include <stdlib.h>
+
+#define EXO_ARENA_ALIGN 64
+
+struct exo_arena {
+  uint8_t *base;
+  int64_t size;
+  // offset of the first unused byte
+  int64_t top;
+  // offset of the most recent buffer that was not popped, or 0
+  int64_t last;
+};
+
+struct exo_arena_header {
+  int64_t prev_top;
+  int64_t prev_last;
+  int64_t freed;
+};
+
+static inline void exo_arena_init(
+    struct exo_arena *arena, void *base, int64_t size) {
+  arena->base = (uint8_t *)base;
+  arena->size = size;
+  arena->top = 0;
+  arena->last = 0;
+}
+
+static inline int64_t exo_arena_round_up(int64_t bytes) {
+  return (bytes + EXO_ARENA_ALIGN - 1) & ~(int64_t)(EXO_ARENA_ALIGN - 1);
+}
+
+static inline void *exo_arena_alloc(struct exo_arena *arena, int64_t bytes) {
+  if (arena != NULL && arena->base != NULL) {
+    uintptr_t base = (uintptr_t)arena->base;
+    uintptr_t data = base + arena->top + sizeof(struct exo_arena_header);
+    data = (data + EXO_ARENA_ALIGN - 1) & ~(uintptr_t)(EXO_ARENA_ALIGN - 1);
+    if ((int64_t)(data - base) + bytes <= arena->size) {
+      struct exo_arena_header *h = (struct exo_arena_header *)data - 1;
+      h->prev_top = arena->top;
+      h->prev_last = arena->last;
+      h->freed = 0;
+      arena->top = (int64_t)(data - base) + bytes;
+      arena->last = (int64_t)(data - base);
+      return (void *)data;
+    }
+  }
+  return aligned_alloc(EXO_ARENA_ALIGN, exo_arena_round_up(bytes));
+}
+
+static inline void exo_arena_free(struct exo_arena *arena, void *ptr) {
+  uint8_t *p = (uint8_t *)ptr;
+  // buffers in the arena are always past a header, and may be empty
+  if (arena == NULL || arena->base == NULL || p <= arena->base ||
+      p > arena->base + arena->size) {
+    free(ptr);
+    return;
+  }
+  ((struct exo_arena_header *)p - 1)->freed = 1;
+  while (arena->last != 0) {
+    struct exo_arena_header *h =
+        (struct exo_arena_header *)(arena->base + arena->last) - 1;
+    if (!h->freed)
+      break;
+    arena->top = h->prev_top;
+    arena->last = h->prev_last;
+  }
+}
+
+#endif
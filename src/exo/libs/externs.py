@@ -20,8 +20,11 @@ class _Sin(Extern):
     def globl(self, prim_type):
         return "#include <math.h>"
 
-    #    def interpret(self, args):
-    #        return math.sin(args[0])
+    def interpret(self, args):
+        import numpy as np
+
+        # as in C, sin() computes in double
+        return np.sin(np.asarray(args[0], dtype=np.float64))
 
     def compile(self, args, prim_type):
         return f"sin(({prim_type}){args[0]})"
@@ -55,11 +58,10 @@ class _Relu(Extern):
         )
         return s
 
-    #    def interpret(self, args):
-    #        if args[0] > 0:
-    #            return args[0]
-    #        else:
-    #            return 0
+    def interpret(self, args):
+        import numpy as np
+
+        return np.where(args[0] > 0.0, args[0], 0.0).astype(np.result_type(args[0]))
 
     def compile(self, args, prim_type):
         return f"_relu_{prim_type}(({prim_type}){args[0]})"
@@ -95,15 +97,11 @@ class _Select(Extern):
         )
         return s
 
-    #    def interpret(self, args):
-    #        x = args[0]
-    #        v = args[1]
-    #        y = args[2]
-    #        z = args[3]
-    #        if x < v:
-    #            return y
-    #        else:
-    #            return z
+    def interpret(self, args):
+        import numpy as np
+
+        x, v, y, z = args
+        return np.where(x < v, y, z)
 
     def compile(self, args, prim_type):
         return f"_select_{prim_type}(({prim_type}){args[0]}, ({prim_type}){args[1]}, ({prim_type}){args[2]}, ({prim_type}){args[3]})"
@@ -131,8 +129,10 @@ class _Expf(Extern):
     def globl(self, prim_type):
         return "#include <math.h>"
 
-    #    def interpret(self, args):
-    #        return math.expf(args[0])
+    def interpret(self, args):
+        import numpy as np
+
+        return np.exp(args[0])
 
     def compile(self, args, prim_type):
         return f"expf(({prim_type})({args[0]}))"
@@ -161,8 +161,10 @@ class _FmaxF(Extern):
     def globl(self, prim_type):
         return "#include <math.h>"
 
-    #    def interpret(self, args):
-    #        return math.fmaxf(args[0], args[1])
+    def interpret(self, args):
+        import numpy as np
+
+        return np.fmax(args[0], args[1])
 
     def compile(self, args, prim_type):
         return f"fmaxf(({prim_type})({args[0]}), ({prim_type})({args[1]}))"
@@ -195,8 +197,11 @@ class _Sigmoid(Extern):
 }}
 """
 
-    #    def interpret(self, args):
-    #        return math.sigmoid(args[0])
+    def interpret(self, args):
+        import numpy as np
+
+        x = np.asarray(args[0])
+        return (1 / (1 + np.exp(-x.astype(np.float64)))).astype(x.dtype)
 
     def compile(self, args, prim_type):
         return f"sigmoid(({prim_type})({args[0]}))"
@@ -224,8 +229,10 @@ class _Sqrt(Extern):
     def globl(self, prim_type):
         return "#include <math.h>"
 
-    #    def interpret(self, args):
-    #        return math.sqrt(args[0])
+    def interpret(self, args):
+        import numpy as np
+
+        return np.sqrt(np.asarray(args[0], dtype=np.float64))
 
     def compile(self, args, prim_type):
         return f"sqrt(({prim_type})({args[0]}))"
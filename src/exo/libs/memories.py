@@ -79,6 +79,171 @@ class DRAM_STACK(DRAM):
         return ""
 
 
+# ----------- DRAM with aligned allocations ----------------
+
+
+class _DRAM_ALIGNED(DRAM):
+    _align = None
+
+    @classmethod
+    def alloc(cls, new_name, prim_type, shape, srcinfo):
+        if len(shape) == 0:
+            return f"{prim_type} {new_name};"
+
+        # aligned_alloc requires the size to be a multiple of the alignment
+        size = f"{' * '.join(shape)} * sizeof({prim_type})"
+        return (
+            f"{prim_type} *{new_name} = ({prim_type}*) aligned_alloc("
+            f"{cls._align}, (({size}) + {cls._align - 1}) & ~(size_t){cls._align - 1});"
+        )
+
+    @classmethod
+    def alignment(cls):
+        return cls._align
+
+
+_aligned_drams = dict()
+
+
+def DRAM_ALIGNED(n):
+    """
+    DRAM whose buffers are allocated with `aligned_alloc` on an `n` byte
+    boundary, where `n` is a power of two.  Procedures assume that their
+    buffer arguments in this memory are aligned too.
+    """
+    if not isinstance(n, int) or n <= 0 or n & (n - 1):
+        raise ValueError(f"alignment must be a positive power of two, got {n}")
+    if n not in _aligned_drams:
+        _aligned_drams[n] = type(
+            f"DRAM_ALIGNED_{n}",
+            (_DRAM_ALIGNED,),
+            {"_align": n, "__module__": __name__},
+        )
+    return _aligned_drams[n]
+
+
+# ----------- DRAM using a scratch arena ----------------
+# Buffers are bump-allocated from the `struct exo_arena` in exo_arena.h that
+# the caller points `ctxt->arena` to, and returned to it in O(1), instead of
+# calling malloc and free for every allocation.  Without an arena, or once it
+# is full, allocations fall back to aligned_alloc.  The arena is not
+# thread-safe, so buffers in parallel loops should use DRAM_STACK instead.
+
+
+class DRAM_ARENA(DRAM):
+    @classmethod
+    def global_(cls):
+        return '#include "exo_arena.h"'
+
+    @classmethod
+    def ctxt_def(cls):
+        return ["struct exo_arena *arena;"]
+
+    @classmethod
+    def alloc(cls, new_name, prim_type, shape, srcinfo):
+        if len(shape) == 0:
+            return f"{prim_type} {new_name};"
+
+        return (
+            f"{prim_type} *{new_name} = ({prim_type}*) exo_arena_alloc("
+            f"ctxt ? ctxt->arena : NULL, {' * '.join(shape)} * sizeof({prim_type}));"
+        )
+
+    @classmethod
+    def free(cls, new_name, prim_type, shape, srcinfo):
+        if len(shape) == 0:
+            return ""
+
+        return f"exo_arena_free(ctxt ? ctxt->arena : NULL, {new_name});"
+
+    @classmethod
+    def alignment(cls):
+        # EXO_ARENA_ALIGN
+        return 64
+
+
+# ----------- DRAM backed by huge pages ----------------
+# Large buffers, such as packed panels, are mapped with mmap on a 2 MiB
+# boundary and marked with madvise(MADV_HUGEPAGE), so that the kernel can
+# back them with transparent huge pages and fewer TLB entries.
+
+
+class DRAM_HUGEPAGE(DRAM):
+    @classmethod
+    def global_(cls):
+        return _HUGEPAGE_HELPERS
+
+    @classmethod
+    def alloc(cls, new_name, prim_type, shape, srcinfo):
+        if len(shape) == 0:
+            return f"{prim_type} {new_name};"
+
+        return (
+            f"{prim_type} *{new_name} = ({prim_type}*) exo_hugepage_alloc("
+            f"{' * '.join(shape)} * sizeof({prim_type}));"
+        )
+
+    @classmethod
+    def free(cls, new_name, prim_type, shape, srcinfo):
+        if len(shape) == 0:
+            return ""
+
+        return (
+            f"exo_hugepage_free({new_name}, "
+            f"{' * '.join(shape)} * sizeof({prim_type}));"
+        )
+
+    @classmethod
+    def alignment(cls):
+        return 1 << 21
+
+
+_HUGEPAGE_HELPERS = """
+#include <stdint.h>
+#include <stdlib.h>
+#include <sys/mman.h>
+
+#define EXO_HUGEPAGE_SIZE ((size_t)1 << 21)
+
+static inline size_t exo_hugepage_round_up(size_t bytes) {
+    return (bytes + EXO_HUGEPAGE_SIZE - 1) & ~(EXO_HUGEPAGE_SIZE - 1);
+}
+
+#if defined(MAP_ANONYMOUS)
+static inline void *exo_hugepage_alloc(size_t bytes) {
+    // over-allocate by a huge page, and unmap the unaligned head and tail
+    size_t len = exo_hugepage_round_up(bytes);
+    uint8_t *p = (uint8_t *) mmap(NULL, len + EXO_HUGEPAGE_SIZE,
+        PROT_READ | PROT_WRITE, MAP_PRIVATE | MAP_ANONYMOUS, -1, 0);
+    if (p == MAP_FAILED)
+        return NULL;
+    uint8_t *aligned = (uint8_t *)(((uintptr_t)p + EXO_HUGEPAGE_SIZE - 1)
+        & ~(uintptr_t)(EXO_HUGEPAGE_SIZE - 1));
+    if (aligned > p)
+        munmap(p, aligned - p);
+    if (p + EXO_HUGEPAGE_SIZE > aligned)
+        munmap(aligned + len, p + EXO_HUGEPAGE_SIZE - aligned);
+#if defined(MADV_HUGEPAGE)
+    madvise(aligned, len, MADV_HUGEPAGE);
+#endif
+    return aligned;
+}
+
+static inline void exo_hugepage_free(void *p, size_t bytes) {
+    munmap(p, exo_hugepage_round_up(bytes));
+}
+#else
+static inline void *exo_hugepage_alloc(size_t bytes) {
+    return aligned_alloc(EXO_HUGEPAGE_SIZE, exo_hugepage_round_up(bytes));
+}
+
+static inline void exo_hugepage_free(void *p, size_t bytes) {
+    free(p);
+}
+#endif
+"""
+
+
 # ----------- GEMMINI scratchpad ----------------
 
 
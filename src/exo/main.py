@@ -94,7 +94,17 @@ def get_procs_from_module(user_module):
             fn = getattr(user_module, sym)
             if isinstance(fn, exo.Procedure) and not fn.is_instr():
                 library.append(fn)
-    return library
+            elif isinstance(fn, exo.API.CPUDispatch):
+                library.append(fn)
+
+    # the procedures of a dispatch are compiled as part of it
+    dispatched = {
+        id(p)
+        for d in library
+        if isinstance(d, exo.API.CPUDispatch)
+        for p in [d.proc(), *d.variants().values()]
+    }
+    return [p for p in library if id(p) not in dispatched]
 
 
 def load_user_code(path):
@@ -526,3 +526,57 @@ def neon_convert_f32_upper_to_f64(dst: [f64][2] @ Neon, src: [f32][4] @ Neon):
 
     for i in seq(0, 2):
         dst[i] = src[2 + i]
+
+
+# --------------------------------------------------------------------------- #
+#   Instruction costs
+# --------------------------------------------------------------------------- #
+
+# Approximate reciprocal throughputs, in cycles, of the instructions above on
+# Cortex-A76 class cores, for `WorkStats.cycles()`.  The instructions which
+# expand to a sequence of intrinsics cost their sum.
+neon_instr_costs = {
+    "neon_vld_4xf32": 0.5,
+    "neon_vst_4xf32": 1.0,
+    "neon_broadcast_4xf32": 0.5,
+    "neon_broadcast_4xf32_scalar": 0.5,
+    "neon_zero_4xf32": 0.25,
+    "neon_vadd_4xf32": 0.5,
+    "neon_reduce_vadd_4xf32": 0.5,
+    "neon_assoc_reduce_add_instr_4xf32": 3.0,
+    "neon_vmul_4xf32": 0.5,
+    "neon_vmul2_4xf32": 0.5,
+    "neon_vfmla_4xf32_4xf32": 0.5,
+    "neon_vfmla2_4xf32_4xf32": 0.5,
+    "neon_vfmadd_4xf32_4xf32": 0.5,
+    "neon_vfmadd_ex_4xf32_4xf32": 0.5,
+    "neon_vfmadd_4xf32_1xf32": 0.5,
+    "neon_vfmadd_1xf32_4xf32": 0.5,
+    "neon_reg_copy_4xf32": 0.25,
+    "neon_vneg_4xf32": 0.5,
+    "neon_vld_8xf16": 0.5,
+    "neon_vst_8xf16": 1.0,
+    "neon_broadcast_8xf16": 0.5,
+    "neon_zero_8xf16": 0.25,
+    "neon_vadd_8xf16": 0.5,
+    "neon_vmul_8xf16": 0.5,
+    "neon_vfmla_8xf16_8xf16": 0.5,
+    "neon_vfmadd_8xf16_8xf16": 0.5,
+    "neon_vfmadd_ex_8xf16_8xf16": 0.5,
+    "neon_vfmadd_8xf16_1xf16": 0.5,
+    "neon_vfmadd_1xf16_8xf16": 0.5,
+    "neon_vld_2xf64": 0.5,
+    "neon_vst_2xf64": 1.0,
+    "neon_broadcast_2xf64": 0.5,
+    "neon_broadcast_2xf64_scalar": 0.5,
+    "neon_zero_2xf64": 0.25,
+    "neon_vadd_2xf64": 0.5,
+    "neon_reduce_vadd_2xf64": 0.5,
+    "neon_assoc_reduce_add_instr_2xf64": 2.0,
+    "neon_vmul_2xf64": 0.5,
+    "neon_vfmadd_2xf64_2xf64": 0.5,
+    "neon_reg_copy_2xf64": 0.25,
+    "neon_vneg_2xf64": 0.5,
+    "neon_convert_f32_lower_to_f64": 1.0,
+    "neon_convert_f32_upper_to_f64": 1.0,
+}
@@ -801,3 +801,74 @@ def avx2_convert_f32_upper_to_f64(dst: [f64][4] @ AVX2, src: [f32][8] @ AVX2):
 
     for i in seq(0, 4):
         dst[i] = src[4 + i]
+
+
+# --------------------------------------------------------------------------- #
+#   Instruction costs
+# --------------------------------------------------------------------------- #
+
+# Approximate reciprocal throughputs, in cycles, of the instructions above on
+# recent Intel cores (Skylake and later), for `WorkStats.cycles()`.  The
+# instructions which expand to a sequence of intrinsics cost their sum.
+x86_instr_costs = {
+    "prefetch": 0.5,
+    "mm256_setzero_ps": 0.25,
+    "mm256_setzero_pd": 0.25,
+    "mm256_loadu_ps": 0.5,
+    "mm256_loadu_pd": 0.5,
+    "mm256_storeu_ps": 1.0,
+    "mm256_storeu_pd": 1.0,
+    "mm256_fmadd_ps": 0.5,
+    "mm256_fmadd_pd": 0.5,
+    "mm256_broadcast_ss": 0.5,
+    "mm256_broadcast_sd": 0.5,
+    "mm256_broadcast_ss_scalar": 1.0,
+    "mm256_broadcast_sd_scalar": 1.0,
+    "mm256_fmadd_ps_broadcast": 0.5,
+    "mm256_mul_ps": 0.5,
+    "mm256_mul_pd": 0.5,
+    "mm256_div_ps": 5.0,
+    "mm256_div_pd": 8.0,
+    "mm256_add_ps": 0.5,
+    "mm256_add_pd": 0.5,
+    "mm256_sub_ps": 0.5,
+    "mm256_sub_pd": 0.5,
+    "mm256_loadu_si256": 0.5,
+    "mm256_storeu_si256": 1.0,
+    "mm256_add_epi16": 0.5,
+    "mm512_setzero_ps": 0.5,
+    "mm512_add_ps": 1.0,
+    "mm512_mask_add_ps": 1.0,
+    "mm512_loadu_ps": 0.5,
+    "mm512_storeu_ps": 1.0,
+    "mm512_maskz_loadu_ps": 0.5,
+    "mm512_mask_storeu_ps": 1.0,
+    "mm512_fmadd_ps": 1.0,
+    "mm512_mask_fmadd_ps": 1.0,
+    "mm512_relu_ps": 1.0,
+    "mm512_mask_set1_ps": 1.0,
+    "mm512_set1_ps": 1.0,
+    "avx2_set0_ps": 0.25,
+    "avx2_fmadd_memu_ps": 1.5,
+    "avx2_select_ps": 1.5,
+    "avx2_select_pd": 1.5,
+    "avx2_assoc_reduce_add_ps": 5.0,
+    "avx2_assoc_reduce_add_pd": 4.0,
+    "avx2_sign_ps": 0.5,
+    "avx2_sign_pd": 0.5,
+    "avx2_reduce_add_wide_ps": 0.5,
+    "avx2_reduce_add_wide_pd": 0.5,
+    "avx2_reg_copy_ps": 0.25,
+    "avx2_reg_copy_pd": 0.25,
+    "avx2_mask_storeu_ps": 1.0,
+    "avx2_ui16_divide_by_3": 2.0,
+    "mm256_prefix_load_ps": 1.0,
+    "mm256_prefix_store_ps": 1.0,
+    "mm256_prefix_add_ps": 1.0,
+    "mm256_prefix_mul_ps": 1.0,
+    "mm256_prefix_sub_ps": 1.0,
+    "mm256_prefix_div_ps": 5.5,
+    "mm256_prefix_broadcast_ss": 1.0,
+    "avx2_convert_f32_lower_to_f64": 1.0,
+    "avx2_convert_f32_upper_to_f64": 4.0,
+}
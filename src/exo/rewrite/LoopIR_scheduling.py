@@ -1,4 +1,5 @@
 import re
+import weakref
 from collections import ChainMap
 from typing import List, Tuple, Optional
 
@@ -15,6 +16,8 @@ from ..core.LoopIR import (
     get_reads_of_stmts,
     get_writes_of_stmts,
     is_const_zero,
+    struct_eq,
+    hashcons_stmts,
 )
 from .new_eff import (
     SchedulingError,
@@ -31,9 +34,12 @@ from .new_eff import (
     Check_IsIdempotent,
     Check_ExprBound,
     Check_Aliasing,
+    Check_CollapseLoops,
+    obligation,
 )
 
 from .range_analysis import IndexRangeEnvironment, IndexRange, index_range_analysis
+from .affine import affine_form
 
 from ..core.prelude import *
 from ..core.proc_eqv import get_strictest_eqv_proc
@@ -285,6 +291,12 @@ def Check_CompareExprs(proc, stmts, lhs, op, rhs):
 
 def Check_IsDivisible(proc, stmts, expr, quot):
     failed = False
+    form = affine_form(expr)
+    if form is not None and form.const % quot == 0:
+        # Fast path: every term of `expr` is divisible by `quot`
+        if all(c % quot == 0 for _, c in form.coeffs):
+            return
+
     if not isinstance(expr, LoopIR.Const):
         try:
             quot = LoopIR.Const(quot, T.int, null_srcinfo())
@@ -375,13 +387,36 @@ def DoReorderStmt(f_cursor, s_cursor):
         raise SchedulingError(
             "expected the second statement to be directly after the first"
         )
-    Check_ReorderStmts(f_cursor.get_root(), f_cursor._node, s_cursor._node)
+    obligation(Check_ReorderStmts, f_cursor.get_root(), f_cursor._node, s_cursor._node)
     ir, fwd = s_cursor._move(f_cursor.before())
     return ir, fwd
 
 
-def DoParallelizeLoop(loop_cursor):
-    return loop_cursor._child_node("loop_mode")._replace(LoopIR.Par())
+def DoParallelizeLoop(loop_cursor, schedule, chunk, collapse, num_threads):
+    loop = loop_cursor._node
+    if chunk is not None and schedule not in ("static", "dynamic", "guided"):
+        raise SchedulingError(
+            "a chunk size requires a static, dynamic or guided schedule"
+        )
+    assert num_threads is None or isinstance(
+        num_threads, (LoopIR.Const, LoopIR.ReadConfig)
+    )
+    Check_CollapseLoops(loop, collapse)
+
+    par = LoopIR.Par(schedule, chunk, collapse if collapse > 1 else None, num_threads)
+    ir, fwd = loop_cursor._child_node("loop_mode")._replace(par)
+
+    # the loops collapsed into this one are parallelized along with it
+    inner = loop_cursor
+    for _ in range(collapse - 1):
+        inner = inner.body()[0]
+        ir, fwd_repl = (
+            fwd(inner)
+            ._child_node("loop_mode")
+            ._replace(LoopIR.Par(None, None, None, None))
+        )
+        fwd = _compose(fwd_repl, fwd)
+    return ir, fwd
 
 
 def DoJoinLoops(loop1_c, loop2_c):
@@ -553,7 +588,8 @@ def same_index_exprs(proc_cursor, idx1, s1, idx2, s2):
     try:
         assert len(idx1) == len(idx2)
         for i, j in zip(idx1, idx2):
-            Check_ExprEqvInContext(proc_cursor, i, [s1], j, [s2])
+            if not struct_eq(i, j):
+                Check_ExprEqvInContext(proc_cursor, i, [s1], j, [s2])
         return True
     except SchedulingError as e:
         return False
@@ -669,7 +705,7 @@ def DoDivideWithRecompute(
 
     assert isinstance(loop, LoopIR.For)
     assert isinstance(outer_hi, LoopIR.expr)
-    Check_IsIdempotent(proc, loop.body)
+    obligation(Check_IsIdempotent, proc, loop.body)
 
     def rd(i):
         return LoopIR.Read(i, [], T.index, srcinfo)
@@ -787,7 +823,7 @@ def DoDivideLoop(
     elif tail_strategy == "perfect":
         ir = loop_cursor.get_root()
         loop = loop_cursor._node
-        Check_IsDivisible(ir, [loop], N, quot)
+        obligation(Check_IsDivisible, ir, [loop], N, quot)
         outer_hi = divide_expr(N, quot)
     else:
         assert False, f"bad tail strategy: {tail_strategy}"
@@ -885,7 +921,7 @@ def DoUnroll(c_loop):
         env = {s.iter: LoopIR.Const(i, T.index, s.srcinfo)}
         unrolled += Alpha_Rename(SubstArgs(orig_body, env).result()).result()
 
-    return c_loop._replace(unrolled)
+    return c_loop._replace(hashcons_stmts(unrolled))
 
 
 # --------------------------------------------------------------------------- #
@@ -1237,7 +1273,7 @@ def match_parent(c1, c2):
 def DoRewriteExpr(expr_cursor, new_expr):
     proc = expr_cursor.get_root()
     s = get_enclosing_stmt_cursor(expr_cursor)._node
-    Check_ExprEqvInContext(proc, expr_cursor._node, [s], new_expr, [s])
+    obligation(Check_ExprEqvInContext, proc, expr_cursor._node, [s], new_expr, [s])
     return expr_cursor._replace(new_expr)
 
 
@@ -1423,7 +1459,7 @@ def DoLiftScope(inner_c):
                     "inner loop's lo or hi depends on outer loop's iteration variable"
                 )
 
-            Check_ReorderLoops(inner_c.get_root(), outer_s)
+            obligation(Check_ReorderLoops, inner_c.get_root(), outer_s)
             body = inner_c.body()
             ir, fwd = inner_c._move(outer_c.after())
             ir, fwd_move = fwd(outer_c)._move(fwd(body).before())
@@ -1577,7 +1613,7 @@ def DoExpandDim(alloc_cursor, alloc_dim, indexing):
     assert isinstance(alloc_dim, LoopIR.expr)
     assert isinstance(indexing, LoopIR.expr)
 
-    Check_IsPositiveExpr(alloc_cursor.get_root(), [alloc_s], alloc_dim)
+    obligation(Check_IsPositiveExpr, alloc_cursor.get_root(), [alloc_s], alloc_dim)
 
     old_typ = alloc_s.type
     new_rngs = [alloc_dim]
@@ -1617,7 +1653,7 @@ def DoExpandDim(alloc_cursor, alloc_dim, indexing):
         ir, fwd = _replace_writes(ir, fwd, c, alloc_s.name, mk_write)
 
     after_alloc = [c._node for c in get_rest_of_block(fwd(alloc_cursor))]
-    Check_Bounds(ir, new_alloc, after_alloc)
+    obligation(Check_Bounds, ir, new_alloc, after_alloc)
 
     return ir, fwd
 
@@ -1628,7 +1664,7 @@ def DoResizeDim(alloc_cursor, dim_idx: int, size: LoopIR.expr, offset: LoopIR.ex
     assert isinstance(alloc_s, LoopIR.Alloc)
     assert isinstance(alloc_s.type, T.Tensor)
 
-    Check_IsPositiveExpr(alloc_cursor.get_root(), [alloc_s], size)
+    obligation(Check_IsPositiveExpr, alloc_cursor.get_root(), [alloc_s], size)
 
     ir, fwd = (
         alloc_cursor._child_node("type")._child_block("hi")[dim_idx]._replace([size])
@@ -1677,7 +1713,7 @@ def DoResizeDim(alloc_cursor, dim_idx: int, size: LoopIR.expr, offset: LoopIR.ex
 
     alloc_cursor = fwd(alloc_cursor)
     after_alloc = [c._node for c in get_rest_of_block(alloc_cursor)]
-    Check_Bounds(ir, alloc_cursor._node, after_alloc)
+    obligation(Check_Bounds, ir, alloc_cursor._node, after_alloc)
 
     return ir, fwd
 
@@ -1772,7 +1808,7 @@ def DoDivideDim(alloc_cursor, dim_idx, quotient):
     old_typ = alloc_s.type
     old_shp = old_typ.shape()
     dim = old_shp[dim_idx]
-    Check_IsDivisible(alloc_cursor.get_root(), [alloc_s], dim, quotient)
+    obligation(Check_IsDivisible, alloc_cursor.get_root(), [alloc_s], dim, quotient)
     numer = divide_expr(dim, quotient)
     new_shp = (
         old_shp[:dim_idx]
@@ -2310,7 +2346,7 @@ def DoRemoveLoop(loop, unsafe_disable_check):
 
     # 2. Body is idempotent
     if not unsafe_disable_check:
-        Check_IsIdempotent(loop.get_root(), [s])
+        obligation(Check_IsIdempotent, loop.get_root(), [s])
 
     # 3. The loop runs at least once;
     #    If not, then place a guard around the statement
@@ -2389,7 +2425,7 @@ def DoFissionAfterSimple(stmt_cursor, n_lifts, unsafe_disable_checks):
             # fission can commute appropriately
             no_loop_var_pre = par_s.iter not in _FV(pre)
             if not unsafe_disable_checks:
-                Check_FissionLoop(ir, par_s, pre, post, no_loop_var_pre)
+                obligation(Check_FissionLoop, ir, par_s, pre, post, no_loop_var_pre)
 
             # we can skip the loop iteration if the
             # body doesn't depend on the loop
@@ -2590,7 +2626,9 @@ def DoSpecialize(block_c, conds):
         if e.op in ["and", "or"]:
             return is_valid_condition(e.lhs) and is_valid_condition(e.rhs)
         elif e.op in ["==", "!=", "<", "<=", ">", ">="]:
-            return e.lhs.type.is_indexable() and e.rhs.type.is_indexable()
+            return all(
+                t.is_indexable() or t.is_stridable() for t in (e.lhs.type, e.rhs.type)
+            )
         else:
             return False
 
@@ -2634,7 +2672,7 @@ def DoFuseLoop(f_cursor, s_cursor, unsafe_disable_check=False):
     # check if the loop bounds are equivalent
     loop1 = f_cursor._node
     loop2 = s_cursor._node
-    Check_ExprEqvInContext(proc, loop1.hi, [loop1], loop2.hi, [loop2])
+    obligation(Check_ExprEqvInContext, proc, loop1.hi, [loop1], loop2.hi, [loop2])
 
     def mk_read(e):
         return LoopIR.Read(loop1.iter, [], T.index, loop1.srcinfo)
@@ -2654,7 +2692,7 @@ def DoFuseLoop(f_cursor, s_cursor, unsafe_disable_check=False):
         body1 = loop1.body
         body2 = SubstArgs(loop2.body, {y: x}).result()
         loop = fwd(f_cursor)._node
-        Check_FissionLoop(ir, loop, body1, body2)
+        obligation(Check_FissionLoop, ir, loop, body1, body2)
 
     return ir, fwd
 
@@ -2668,7 +2706,7 @@ def DoFuseIf(f_cursor, s_cursor):
 
     if1 = f_cursor._node
     if2 = s_cursor._node
-    Check_ExprEqvInContext(proc, if1.cond, [if1], if2.cond, [if2])
+    obligation(Check_ExprEqvInContext, proc, if1.cond, [if1], if2.cond, [if2])
 
     cond = if1.cond
     body1 = if1.body
@@ -2694,8 +2732,8 @@ def DoAddLoop(stmt_cursor, var, hi, guard, unsafe_disable_check):
     s = stmt_cursor._node
 
     if not unsafe_disable_check:
-        Check_IsIdempotent(proc, [s])
-        Check_IsPositiveExpr(proc, [s], hi)
+        obligation(Check_IsIdempotent, proc, [s])
+        obligation(Check_IsPositiveExpr, proc, [s], hi)
 
     sym = Sym(var)
 
@@ -2800,6 +2838,30 @@ def DoDeletePass(proc):
     return ir, fwd
 
 
+_negated_cmp = {"<": ">=", ">": "<=", "<=": ">", ">=": "<"}
+
+
+def _negate_pred(e):
+    """The negation of the predicate `e`, since LoopIR has no `not`"""
+    if isinstance(e, LoopIR.Const):
+        return LoopIR.Const(not e.val, T.bool, e.srcinfo)
+    elif isinstance(e, LoopIR.BinOp):
+
+        def binop(op, lhs, rhs):
+            return LoopIR.BinOp(op, lhs, rhs, T.bool, e.srcinfo)
+
+        if e.op in ("and", "or"):
+            op = "or" if e.op == "and" else "and"
+            return binop(op, _negate_pred(e.lhs), _negate_pred(e.rhs))
+        elif e.op in _negated_cmp:
+            return binop(_negated_cmp[e.op], e.lhs, e.rhs)
+        elif e.op == "==" and e.lhs.type != T.bool:
+            return binop("or", binop("<", e.lhs, e.rhs), binop(">", e.lhs, e.rhs))
+    return LoopIR.BinOp(
+        "==", e, LoopIR.Const(False, T.bool, e.srcinfo), T.bool, e.srcinfo
+    )
+
+
 def DoExtractSubproc(block, subproc_name, include_asserts):
     proc = block.get_root()
     Check_Aliasing(proc)
@@ -2816,10 +2878,10 @@ def DoExtractSubproc(block, subproc_name, include_asserts):
                 preds.append(LoopIR.BinOp("<=", s.lo, iter_read, T.bool, s.srcinfo))
                 preds.append(LoopIR.BinOp("<", iter_read, s.hi, T.bool, s.srcinfo))
             elif isinstance(s, LoopIR.If):
-                branch_taken = LoopIR.Const(prev_c in c.body(), T.bool, s.srcinfo)
-                preds.append(
-                    LoopIR.BinOp("==", s.cond, branch_taken, T.bool, s.srcinfo)
-                )
+                if prev_c in c.body():
+                    preds.append(s.cond)
+                else:
+                    preds.append(_negate_pred(s.cond))
             prev_c = c
             c = move_back(c)
 
@@ -2875,24 +2937,21 @@ def DoExtractSubproc(block, subproc_name, include_asserts):
 
 
 class _DoNormalize(Cursor_Rewrite):
-    # This class operates on an idea of creating a coefficient map for each
-    # indexing expression (normalize_e), and writing the map back to LoopIR
-    # (get_loopir in index_start).
+    # This class operates on an idea of computing the affine normal form of
+    # each indexing expression (see affine.py), and writing the form back to
+    # LoopIR (generate_loopIR in index_start).
     # For example, when you have Assign statement:
     # y[n*4 - n*4 + 1] = 0.0
     # index_start will be called with e : n*4 - n*4 + 1.
-    # Then, normalize_e will create a map of symbols and its coefficients.
-    # The map for the expression `n*4 + 1` is:
-    # { temporary_constant_symbol : 1, n : 4 }
-    # and the map for the expression `n*4 - n*4 + 1` is:
-    # { temporary_constant_symbol : 1, n : 0 }
-    # This map concatenation is handled by concat_map function.
+    # The affine form of the expression `n*4 + 1` is `1 + 4*n`,
+    # and the affine form of `n*4 - n*4 + 1` is just the constant `1`.
     def __init__(self, proc):
-        self.C = Sym("temporary_constant_symbol")
         self.env = IndexRangeEnvironment(proc._loopir_proc)
 
         self.ir = proc._loopir_proc
         self.fwd = lambda x: x
+        self.ctx = _root_ctx(self.ir)
+        self.visited = dict()
 
         super().__init__(proc)
 
@@ -2909,50 +2968,6 @@ class _DoNormalize(Cursor_Rewrite):
             self.ir, _provenance_eq_Procedure=self.provenance, _forward=self.fwd
         )
 
-    def concat_map(self, op, lhs, rhs):
-        if op == "+":
-            # if has same key: add value
-            common = {key: (lhs[key] + rhs[key]) for key in lhs if key in rhs}
-            return lhs | rhs | common
-        elif op == "-":
-            # has same key: sub value
-            common = {key: (lhs[key] - rhs[key]) for key in lhs if key in rhs}
-            # else, negate the rhs and cat map
-            neg_rhs = {key: -rhs[key] for key in rhs}
-            return lhs | neg_rhs | common
-        elif op == "*":
-            # rhs or lhs NEEDS to be constant
-            assert len(rhs) == 1 or len(lhs) == 1
-            # multiply the other one's value by that constant
-            if len(rhs) == 1 and self.C in rhs:
-                return {key: lhs[key] * rhs[self.C] for key in lhs}
-            else:
-                assert len(lhs) == 1 and self.C in lhs
-                return {key: rhs[key] * lhs[self.C] for key in rhs}
-        else:
-            assert False, f"bad case {op}"
-
-    def normalize_e(self, e):
-        assert e.type.is_indexable(), f"{e} is not indexable!"
-
-        if isinstance(e, LoopIR.Read):
-            assert len(e.idx) == 0, "Indexing inside indexing does not make any sense"
-            return {e.name: 1}
-        elif isinstance(e, LoopIR.Const):
-            return {self.C: e.val}
-        elif isinstance(e, LoopIR.USub):
-            e_map = self.normalize_e(e.arg)
-            return {key: -e_map[key] for key in e_map}
-        elif isinstance(e, LoopIR.BinOp):
-            lhs_map = self.normalize_e(e.lhs)
-            rhs_map = self.normalize_e(e.rhs)
-            return self.concat_map(e.op, lhs_map, rhs_map)
-        else:
-            assert False, (
-                "index_start should only be called by"
-                + f" an indexing expression. e was {e}"
-            )
-
     @staticmethod
     def has_div_mod_config(e):
         if isinstance(e, LoopIR.Read):
@@ -2977,16 +2992,13 @@ class _DoNormalize(Cursor_Rewrite):
     # e should be an indexing expression
     def index_start(self, e):
         def get_normalized_expr(e):
-            # Make a map of symbols and coefficients
-            n_map = self.normalize_e(e)
-
-            new_e = LoopIR.Const(n_map.get(self.C, 0), T.int, e.srcinfo)
+            form = affine_form(e)
+            assert form is not None, f"{e} is not an affine index expression"
 
-            delete_zero = [
-                (n_map[v], v) for v in n_map if v != self.C and n_map[v] != 0
-            ]
+            new_e = LoopIR.Const(form.const, T.int, e.srcinfo)
+            terms = [(coeff, v) for v, coeff in form.coeffs]
 
-            return new_e, delete_zero
+            return new_e, terms
 
         def division_simplification(e):
             constant, normalization_list = get_normalized_expr(e.lhs)
@@ -3196,24 +3208,60 @@ class _DoNormalize(Cursor_Rewrite):
         constant, normalization_list = get_normalized_expr(e)
         return generate_loopIR(e, constant, normalization_list)
 
+    @staticmethod
+    def drop_units(e):
+        # undo the `0 + ...` and `1 * ...` that generate_loopIR introduces,
+        # just like DoSimplify will
+        if isinstance(e, LoopIR.BinOp):
+            lhs = _DoNormalize.drop_units(e.lhs)
+            rhs = _DoNormalize.drop_units(e.rhs)
+            if e.op == "+" and is_const_zero(lhs):
+                return rhs
+            elif e.op == "+" and is_const_zero(rhs):
+                return lhs
+            elif e.op == "-" and is_const_zero(rhs):
+                return lhs
+            elif e.op == "-" and is_const_zero(lhs):
+                return LoopIR.USub(rhs, rhs.type, rhs.srcinfo)
+            elif e.op == "*" and isinstance(lhs, LoopIR.Const) and lhs.val == 1:
+                return rhs
+            elif e.op == "*" and isinstance(rhs, LoopIR.Const) and rhs.val == 1:
+                return lhs
+            elif lhs is not e.lhs or rhs is not e.rhs:
+                return e.update(lhs=lhs, rhs=rhs)
+        return e
+
     def map_e(self, e):
         if e.type.is_indexable():
-            return self.index_start(e)
+            new_e = self.index_start(e)
+            # keep `e` if it already is in normal form, so that simplifying
+            # an already simplified expression leaves it untouched
+            if struct_eq(self.drop_units(new_e), e):
+                return None
+            return new_e
 
         return super().map_e(e)
 
     def map_s(self, sc):
         s = sc._node
+        if is_simplified(s, self.ctx):
+            return None
+        self.visited[id(s)] = (s, self.ctx)
+
         if isinstance(s, LoopIR.If):
             new_cond = self.map_e(s.cond)
+            ctx = self.ctx
 
             self.env.enter_scope()
+            self.ctx = ctx + ("if", new_cond or s.cond, True)
             self.map_stmts(sc.body())
             self.env.exit_scope()
 
             self.env.enter_scope()
+            self.ctx = ctx + ("if", new_cond or s.cond, False)
             self.map_stmts(sc.orelse())
             self.env.exit_scope()
+            self.ctx = ctx
 
             if new_cond:
                 self.ir, fwd_repl = self.fwd(sc)._child_node("cond")._replace(new_cond)
@@ -3237,7 +3285,10 @@ class _DoNormalize(Cursor_Rewrite):
 
             self.env.add_loop_iter(s.iter, new_lo, new_hi)
 
+            ctx = self.ctx
+            self.ctx = ctx + ("for", s.iter, new_lo, new_hi)
             self.map_stmts(sc.body())
+            self.ctx = ctx
 
             self.env.exit_scope()
 
@@ -3277,14 +3328,111 @@ class _DoNormalize(Cursor_Rewrite):
         return None
 
 
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Simplification marks
+#
+# Most schedules call `simplify` after nearly every operation, while the
+# operation itself only rewrote a small part of the procedure.  Since LoopIR
+# nodes are immutable, we remember (keyed by node identity) which statements
+# a previous run of simplify left unchanged, together with the context that
+# run saw them in: the procedure arguments and assertions, and the bounds and
+# conditions of the enclosing loops and branches.  A statement that is found
+# again in the same context would be left unchanged again, so its whole
+# subtree is skipped.  The context is compared by identity of its parts.
+
+
+class _SimplifiedRef(weakref.ref):
+    __slots__ = ("key", "ctx")
+
+
+_simplified = dict()
+
+
+def _forget_simplified(ref):
+    if _simplified.get(ref.key) is ref:
+        del _simplified[ref.key]
+
+
+def _root_ctx(proc):
+    return (proc.args, proc.preds)
+
+
+def _same_ctx(ctx1, ctx2):
+    return len(ctx1) == len(ctx2) and all(a is b for a, b in zip(ctx1, ctx2))
+
+
+def is_simplified(node, ctx=()):
+    """has `node` already been simplified in the context `ctx`?"""
+    ref = _simplified.get(id(node))
+    return ref is not None and ref() is node and _same_ctx(ref.ctx, ctx)
+
+
+def _mark_simplified(node, ctx=()):
+    ref = _SimplifiedRef(node, _forget_simplified)
+    ref.key = id(node)
+    ref.ctx = ctx
+    _simplified[ref.key] = ref
+
+
+def _mark_stmts_simplified(stmts, ctx):
+    for s in stmts:
+        if is_simplified(s, ctx):
+            continue
+        _mark_simplified(s, ctx)
+        if isinstance(s, LoopIR.If):
+            _mark_stmts_simplified(s.body, ctx + ("if", s.cond, True))
+            _mark_stmts_simplified(s.orelse, ctx + ("if", s.cond, False))
+        elif isinstance(s, LoopIR.For):
+            _mark_stmts_simplified(s.body, ctx + ("for", s.iter, s.lo, s.hi))
+
+
+def _mark_fixpoints(proc, visited):
+    """
+    Mark the statements of the simplified `proc` that every pass in
+    `visited` saw in the same context without changing them.  If the
+    whole procedure is covered, the procedure itself is marked as well.
+    """
+
+    def unchanged(s, ctx):
+        for seen in visited:
+            s_ctx = seen.get(id(s))
+            if s_ctx is None or s_ctx[0] is not s or not _same_ctx(s_ctx[1], ctx):
+                return False
+        return True
+
+    def mark_stmts(stmts, ctx):
+        all_marked = True
+        for s in stmts:
+            if is_simplified(s, ctx):
+                continue
+            elif unchanged(s, ctx):
+                _mark_stmts_simplified([s], ctx)
+                continue
+
+            all_marked = False
+            if isinstance(s, LoopIR.If):
+                mark_stmts(s.body, ctx + ("if", s.cond, True))
+                mark_stmts(s.orelse, ctx + ("if", s.cond, False))
+            elif isinstance(s, LoopIR.For):
+                mark_stmts(s.body, ctx + ("for", s.iter, s.lo, s.hi))
+        return all_marked
+
+    if mark_stmts(proc.body, _root_ctx(proc)):
+        _mark_simplified(proc)
+
+
 class DoSimplify(Cursor_Rewrite):
     def __init__(self, proc):
-        proc = _DoNormalize(proc).result()
+        normalize = _DoNormalize(proc)
+        proc = normalize.result()
 
         self.facts = ChainMap()
 
         self.ir = proc._loopir_proc
         self.fwd = lambda x: x
+        self.ctx = _root_ctx(self.ir)
+        self.visited = dict()
 
         super().__init__(proc)
 
@@ -3295,6 +3443,8 @@ class DoSimplify(Cursor_Rewrite):
             )
             self.fwd = _compose(fwd, self.fwd)
 
+        _mark_fixpoints(self.ir, [normalize.visited, self.visited])
+
     def cfold(self, op, lhs, rhs):
         if op == "+":
             return lhs.val + rhs.val
@@ -3432,6 +3582,9 @@ class DoSimplify(Cursor_Rewrite):
                 if is_const_val(l, True):
                     return LoopIR.Const(True, T.bool, e.srcinfo)
 
+        if lhs is e.lhs and rhs is e.rhs:
+            return e
+
         return LoopIR.BinOp(e.op, lhs, rhs, e.type, e.srcinfo)
 
     def map_e(self, e):
@@ -3441,15 +3594,15 @@ class DoSimplify(Cursor_Rewrite):
             return const
 
         if isinstance(e, LoopIR.BinOp):
-            e = self.map_binop(e)
+            new_e = self.map_binop(e)
         else:
-            e = super().map_e(e) or e
+            new_e = super().map_e(e) or e
 
         # After simplifying, we might match a known constant, so check again.
-        if const := self.is_known_constant(e):
+        if const := self.is_known_constant(new_e):
             return const
 
-        return e
+        return None if new_e is e else new_e
 
     def add_fact(self, cond):
         if (
@@ -3488,6 +3641,10 @@ class DoSimplify(Cursor_Rewrite):
 
     def map_s(self, sc):
         s = sc._node
+        if is_simplified(s, self.ctx):
+            return None
+        self.visited[id(s)] = (s, self.ctx)
+
         if isinstance(s, LoopIR.If):
             cond = self.map_e(s.cond)
             safe_cond = cond or s.cond
@@ -3511,17 +3668,22 @@ class DoSimplify(Cursor_Rewrite):
                     self.map_stmts(sc.orelse())
                     return
 
+            ctx = self.ctx
+
             # Try to use the condition while simplifying body
             self.facts = self.facts.new_child()
             self.add_fact(safe_cond)
+            self.ctx = ctx + ("if", safe_cond, True)
             self.map_stmts(sc.body())
             self.facts = self.facts.parents
 
             # Try to use the negation while simplifying orelse
             self.facts = self.facts.new_child()
             # TODO: negate fact here
+            self.ctx = ctx + ("if", safe_cond, False)
             self.map_stmts(sc.orelse())
             self.facts = self.facts.parents
+            self.ctx = ctx
 
             if cond:
                 self.ir, fwd_repl = self.fwd(sc)._child_node("cond")._replace(cond)
@@ -3529,19 +3691,24 @@ class DoSimplify(Cursor_Rewrite):
         elif isinstance(s, LoopIR.For):
             lo = self.map_e(s.lo)
             hi = self.map_e(s.hi)
+            safe_lo = lo or s.lo
+            safe_hi = hi or s.hi
 
             # Delete the loop if it would not run at all
             if (
-                isinstance(hi, LoopIR.Const)
-                and isinstance(lo, LoopIR.Const)
-                and hi.val == lo.val
+                isinstance(safe_hi, LoopIR.Const)
+                and isinstance(safe_lo, LoopIR.Const)
+                and safe_hi.val == safe_lo.val
             ):
                 self.ir, fwd_del = self.fwd(sc)._delete()
                 self.fwd = _compose(fwd_del, self.fwd)
                 return
 
             # Delete the loop if it would have an empty body
+            ctx = self.ctx
+            self.ctx = ctx + ("for", s.iter, safe_lo, safe_hi)
             self.map_stmts(sc.body())
+            self.ctx = ctx
             if self.fwd(sc).body() == []:
                 self.ir, fwd_del = self.fwd(sc)._delete()
                 self.fwd = _compose(fwd_del, self.fwd)
@@ -3647,7 +3814,9 @@ def DoDeleteBuffer(buf_cursor):
 
     buf_name = buf_cursor._node.name
     buf_dims = len(buf_cursor._node.type.shape())
-    Check_IsDeadAfter(buf_cursor.get_root(), [buf_cursor._node], buf_name, buf_dims)
+    obligation(
+        Check_IsDeadAfter, buf_cursor.get_root(), [buf_cursor._node], buf_name, buf_dims
+    )
 
     return buf_cursor._delete()
 
@@ -3671,7 +3840,9 @@ def DoReuseBuffer(buf_cursor, rep_cursor):
         nonlocal first_assn
         if first_assn:
             first_assn = False
-            Check_IsDeadAfter(buf_cursor.get_root(), [c._node], buf_name, buf_dims)
+            obligation(
+                Check_IsDeadAfter, buf_cursor.get_root(), [c._node], buf_name, buf_dims
+            )
         return {"name": buf_name}
 
     for c in get_rest_of_block(rep_cursor):
@@ -3867,7 +4038,7 @@ def DoFoldBuffer(alloc_cursor, dim_idx, new_size):
 
     alloc_cursor = fwd(alloc_cursor)
     after_alloc = [c._node for c in get_rest_of_block(alloc_cursor)]
-    Check_Bounds(ir, alloc_cursor._node, after_alloc)
+    obligation(Check_Bounds, ir, alloc_cursor._node, after_alloc)
 
     return ir, fwd
 
@@ -3931,7 +4102,8 @@ def DoStageMem(block_cursor, buf_name, w_exprs, new_name, use_accum_zero=False):
     block = [s._node for s in block_cursor]
     if use_accum_zero:
         n_dims = len(buf_typ.shape())
-        Check_BufferReduceOnly(
+        obligation(
+            Check_BufferReduceOnly,
             ir,
             block,
             buf_name,
@@ -4142,7 +4314,7 @@ def DoStageMem(block_cursor, buf_name, w_exprs, new_name, use_accum_zero=False):
             f"Cannot stage '{buf_name}' with the given window shape. Wrong window shape, or '{buf_name}' not accessed in the given scope?"
         )
 
-    Check_Bounds(ir, new_alloc[0], [c._node for c in new_block_c])
+    obligation(Check_Bounds, ir, new_alloc[0], [c._node for c in new_block_c])
 
     return ir, fwd
 
@@ -4253,6 +4425,7 @@ def DoUnrollBuffer(alloc_cursor, dim):
 __all__ = [
     ### BEGIN Scheduling Ops with Cursor Forwarding ###
     "DoSimplify",
+    "is_simplified",
     "DoSetTypAndMem",
     "DoInsertPass",
     "DoReorderStmt",
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import weakref
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from ..core.LoopIR import LoopIR, struct_key
+from ..core.prelude import Sym
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Affine normal forms of index expressions
+#
+# Index expressions are (quasi-)affine, so most of the analyses that look at
+# them -- normalization in simplify, constant range inference, divisibility
+# checks, and the C backend -- really only care about the linear combination
+#       const + c1*x1 + c2*x2 + ... + cn*xn
+# that an expression denotes.  `affine_form` computes that combination once
+# per structurally distinct expression and memoizes it, so the same index
+# expression is not re-analyzed by every one of its consumers.
+
+
+@dataclass(frozen=True)
+class AffineForm:
+    """
+    Represents the affine expression `const + sum(c * x for x, c in coeffs)`.
+        - [coeffs] is sorted by symbol and never contains zero coefficients,
+        so two forms denote the same expression exactly when they are equal.
+    """
+
+    const: int
+    coeffs: Tuple[Tuple[Sym, int], ...]
+
+    @staticmethod
+    def create(const: int, coeffs: dict) -> AffineForm:
+        coeffs = tuple(sorted((x, c) for x, c in coeffs.items() if c != 0))
+        return AffineForm(const, coeffs)
+
+    def is_const(self) -> bool:
+        return not self.coeffs
+
+    def coeff(self, x: Sym) -> int:
+        for y, c in self.coeffs:
+            if y is x:
+                return c
+        return 0
+
+    def __add__(self, other: AffineForm) -> AffineForm:
+        coeffs = dict(self.coeffs)
+        for x, c in other.coeffs:
+            coeffs[x] = coeffs.get(x, 0) + c
+        return AffineForm.create(self.const + other.const, coeffs)
+
+    def __neg__(self) -> AffineForm:
+        return AffineForm(-self.const, tuple((x, -c) for x, c in self.coeffs))
+
+    def __sub__(self, other: AffineForm) -> AffineForm:
+        return self + (-other)
+
+    def __mul__(self, k: int) -> AffineForm:
+        assert isinstance(k, int)
+        if k == 0:
+            return AffineForm(0, ())
+        return AffineForm(self.const * k, tuple((x, c * k) for x, c in self.coeffs))
+
+    def __str__(self) -> str:
+        terms = [f"{c} * {x}" for x, c in self.coeffs]
+        return " + ".join(terms + [str(self.const)])
+
+
+# the memo is keyed by structural keys, so it is shared between all copies
+# of an expression and entries disappear together with the expression
+_affine_forms = weakref.WeakKeyDictionary()
+_not_affine = object()
+
+
+def affine_form(e: LoopIR.expr) -> Optional[AffineForm]:
+    """
+    Returns the affine normal form of the index expression `e`, or None
+    if `e` is not affine (e.g. it divides, takes a remainder, reads a
+    configuration field, or multiplies two non-constant expressions).
+    """
+    if not e.type.is_indexable():
+        return None
+
+    key = struct_key(e)
+    if (form := _affine_forms.get(key)) is None:
+        form = _compute_affine_form(e)
+        _affine_forms[key] = _not_affine if form is None else form
+
+    return None if form is _not_affine else form
+
+
+def _compute_affine_form(e):
+    if isinstance(e, LoopIR.Read):
+        if e.idx:
+            return None
+        return AffineForm(0, ((e.name, 1),))
+    elif isinstance(e, LoopIR.Const):
+        return AffineForm(e.val, ())
+    elif isinstance(e, LoopIR.USub):
+        if (arg := affine_form(e.arg)) is None:
+            return None
+        return -arg
+    elif isinstance(e, LoopIR.BinOp) and e.op in ("+", "-", "*"):
+        lhs = affine_form(e.lhs)
+        rhs = affine_form(e.rhs)
+        if lhs is None or rhs is None:
+            return None
+        elif e.op == "+":
+            return lhs + rhs
+        elif e.op == "-":
+            return lhs - rhs
+        elif rhs.is_const():
+            return lhs * rhs.const
+        elif lhs.is_const():
+            return rhs * lhs.const
+        else:
+            return None
+    else:
+        return None
@@ -0,0 +1,502 @@
+from __future__ import annotations
+
+import math
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from ..core.LoopIR import LoopIR
+from ..core.memory import DRAM
+from .work_analysis import (
+    _BYTES,
+    Polynomial,
+    _Opaque,
+    _WorkAnalysis,
+    _eval,
+    _loop_names,
+)
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Cache analysis
+#
+# Estimates the misses of a procedure in each level of a cache hierarchy, at
+# concrete sizes, from the footprints of its accesses (see work_analysis).
+# The elements of a loop are assumed to stay cached across its iterations
+# when the cache lines accessed by one iteration of the loop fit in the
+# cache, so the misses of the accesses in a loop nest are
+#
+#   (times the loop L starts) * (distinct lines they access in L)
+#
+# where L is the outermost loop around them whose iterations fit.  Capacity
+# is reduced for low associativity, but conflict misses from the alignment
+# of buffers are not modeled.  The exact misses of small problems can be
+# simulated from their trace of accesses to validate the estimates.
+
+
+@dataclass(frozen=True)
+class Cache:
+    """A level of a cache hierarchy, with LRU replacement"""
+
+    name: str
+    size: int  # in bytes
+    line: int = 64  # in bytes
+    assoc: int = 8
+
+    def sets(self):
+        return max(1, self.size // (self.line * self.assoc))
+
+
+# a typical desktop x86 core
+DEFAULT_CACHES = (
+    Cache("L1", 32 * 1024, 64, 8),
+    Cache("L2", 1024 * 1024, 64, 16),
+    Cache("LLC", 32 * 1024 * 1024, 64, 16),
+)
+
+
+@dataclass
+class CacheStats:
+    """
+    The cache behaviour of a procedure at concrete sizes:
+
+    - `accesses`: the accesses to elements of each buffer, where a
+      reduction `+=` is one access.
+    - `misses`: the estimated misses of the accesses to each buffer, by the
+      name of the cache level.
+    - `reuse_distances`: for each buffer and each loop whose iterations
+      access the same elements of the buffer, the distinct bytes accessed by
+      one iteration of the loop (by iterator name, see `WorkStats`).  The
+      elements are reused in a cache of at least that size.
+    - `simulated_misses`: the exact misses, like `misses`, when they were
+      simulated.
+
+    Only buffers in DRAM are cached; registers like AVX2 are not.
+    """
+
+    accesses: Dict[str, int] = field(default_factory=dict)
+    misses: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    reuse_distances: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    simulated_misses: Optional[Dict[str, Dict[str, int]]] = None
+
+    def total_misses(self, level, simulated=False):
+        misses = self.simulated_misses if simulated else self.misses
+        return sum(misses[level].values())
+
+
+def cache_stats(proc, sizes, caches=DEFAULT_CACHES, simulate=False) -> CacheStats:
+    """
+    The `CacheStats` of the LoopIR procedure `proc`, given the values of its
+    size and index arguments by name.  With `simulate`, its trace of accesses
+    is also run through the caches, which takes about a microsecond per
+    access and cache level.
+    """
+    missing = [
+        str(a.name)
+        for a in proc.args
+        if a.type.is_indexable() and str(a.name) not in sizes
+    ]
+    if missing:
+        raise ValueError(
+            f"cache analysis of {proc.name}() needs the values of {', '.join(missing)}"
+        )
+
+    analysis = _WorkAnalysis(proc)
+    analysis.stmts(proc.body)
+    model = _CacheModel(proc, analysis, sizes)
+
+    stats = CacheStats()
+    stats.accesses = model.accesses()
+    stats.misses = {c.name: model.misses(c) for c in caches}
+    stats.reuse_distances = model.reuse_distances()
+    if simulate:
+        stats.simulated_misses = _Simulator(proc, sizes, caches).run()
+    return stats
+
+
+def _cached_memories():
+    def subclasses(cls):
+        yield cls
+        for sub in cls.__subclasses__():
+            yield from subclasses(sub)
+
+    return {m.name() for m in subclasses(DRAM)}
+
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Model
+
+
+class _CacheModel:
+    def __init__(self, proc, analysis, sizes):
+        self.analysis = analysis
+        self.sizes = sizes
+        self.env = {
+            a.name: sizes[str(a.name)] for a in proc.args if str(a.name) in sizes
+        }
+        memories = _cached_memories()
+        self.cached = {buf for buf, mem in analysis.mems.items() if mem in memories}
+        self.names = _loop_names(analysis.loops)
+
+    def value(self, p):
+        """The value of `p`, with iterators at their last iteration"""
+        a = self.analysis
+        for _ in range(len(a.loops) + 1):
+            env = dict(self.env)
+            for x in p.variables():
+                if isinstance(x, _Opaque):
+                    env[x] = self.opaque(x)
+                elif x in a.his:
+                    env[x] = a.his[x] - 1
+            p = p.subs(env)
+            if p.is_const():
+                return p.const_value()
+        raise ValueError(f"cannot evaluate {p}")
+
+    def opaque(self, x):
+        env = dict(self.sizes)
+        try:
+            return _eval(x.expr, env)
+        except KeyError:
+            # depends on iterators: evaluated at their last iteration
+            for it, hi in self.analysis.his.items():
+                env.setdefault(it.name(), self.value(hi - 1))
+        try:
+            return _eval(x.expr, env)
+        except KeyError:
+            # strides and configurations
+            raise ValueError(f"cannot evaluate {x.expr}")
+
+    def execs(self, stack):
+        # how many times the innermost loop of `stack` runs its body
+        n = Polynomial.const(1)
+        for x in reversed(stack):
+            n = n.sum(x, self.analysis.los[x], self.analysis.his[x])
+        return self.value(n)
+
+    def lines(self, buf, region, line):
+        # the cache lines of `buf` in `region`, assuming it is stored densely
+        # in row-major order from the start of a line
+        per_line = max(1, line // self.analysis.bytes[buf])
+        dims = [(self.value(c), self.value(s)) for c, s in region.dims]
+        shape = [self.value(n) for n in self.analysis.shapes[buf]]
+        copies = self.value(_as_poly(region.copies))
+        if not dims:
+            return copies
+
+        d = len(dims) - 1
+        count, span = dims[d]
+        if count != span:
+            # strided
+            n = min(count, 1 + (span - 1) / per_line)
+        else:
+            # contiguous, over whole rows if the inner dimensions are whole
+            run = span
+            while d > 0 and dims[d][1] == shape[d] and dims[d - 1][0] == dims[d - 1][1]:
+                d -= 1
+                run *= dims[d][1]
+            # the run starts at a multiple of `align` within a line
+            align = self.alignment(region.starts, shape, per_line)
+            starts = range(0, per_line, align)
+            n = sum(-(-(o + run) // per_line) for o in starts) / len(starts)
+        for count, _ in dims[:d]:
+            n *= count
+        return n * copies
+
+    def alignment(self, starts, shape, per_line):
+        # the largest divisor of `per_line` which divides the flat index of
+        # the start of a region in all the iterations
+        if starts is None:
+            return 1
+        flat, stride = Polynomial(), 1
+        for start, n in reversed(list(zip(starts, shape))):
+            flat = flat + start * stride
+            stride *= n
+        env = dict(self.env)
+        for x in flat.variables():
+            if isinstance(x, _Opaque):
+                env[x] = self.opaque(x)
+        align = per_line
+        for c in flat.subs(env).terms.values():
+            if c.denominator != 1:
+                return 1
+            align = math.gcd(align, int(c))
+        return align
+
+    def region_lines(self, accesses, line):
+        lines = dict()
+        for buf, regions in self.analysis.regions(accesses).items():
+            if buf in self.cached:
+                n = sum(self.lines(buf, r, line) for r in regions)
+                lines[buf] = lines.get(buf, 0) + n
+        return lines
+
+    def misses(self, cache):
+        a = self.analysis
+        # conflicts between the lines of a set make fewer ways usable
+        capacity = cache.size * (1 - 1 / (2 * cache.assoc)) / cache.line
+
+        total = self.region_lines(a.select(None), cache.line)
+        if sum(total.values()) <= capacity:
+            # everything fits: only compulsory misses
+            return {str(buf): n for buf, n in total.items()}
+
+        fits = {
+            loop: sum(
+                self.region_lines(a.select(loop, inner=True), cache.line).values()
+            )
+            <= capacity
+            for loop in a.loops
+        }
+        # the accesses of each loop which carries their reuse, with the loops
+        # around it
+        carried = dict()
+        for buf, dims, stack in a.accesses:
+            if buf not in self.cached:
+                continue
+            k = next((k for k, loop in enumerate(stack) if fits[loop]), len(stack))
+            key = (tuple(stack[:k]), stack[k] if k < len(stack) else None)
+            carried.setdefault(key, []).append((buf, dims, stack[k:]))
+
+        misses = {str(buf): 0 for buf in total}
+        for (outer, _), accesses in carried.items():
+            execs = self.execs(list(outer))
+            for buf, n in self.region_lines(accesses, cache.line).items():
+                misses[str(buf)] += execs * n
+        return misses
+
+    def accesses(self):
+        accesses = dict()
+        for buf, dims, stack in self.analysis.accesses:
+            if buf in self.cached:
+                n = self.execs(stack)
+                for _, width in dims:
+                    n *= self.value(_as_poly(width))
+                accesses[str(buf)] = accesses.get(str(buf), 0) + n
+        return accesses
+
+    def reuse_distances(self):
+        a = self.analysis
+        distances = dict()
+        for loop in a.loops:
+            accesses = a.select(loop, inner=True)
+            reused = {
+                buf
+                for buf, dims, _ in accesses
+                if buf in self.cached
+                and not any(loop in _as_poly(i).variables() for i, _ in dims)
+            }
+            if not reused:
+                continue
+            nbytes = 0
+            for buf, regions in a.regions(accesses).items():
+                if buf in self.cached:
+                    n = sum(self.value(r.elements()) for r in regions)
+                    nbytes += n * a.bytes[buf]
+            for buf in reused:
+                distances.setdefault(str(buf), dict())[self.names[loop]] = nbytes
+        return distances
+
+
+def _as_poly(x):
+    return x if isinstance(x, Polynomial) else Polynomial.const(x)
+
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Simulation
+
+
+class _LRUCache:
+    def __init__(self, cache):
+        self.line = cache.line
+        self.assoc = cache.assoc
+        self.sets = [OrderedDict() for _ in range(cache.sets())]
+
+    def access(self, addr):
+        """Whether `addr` hits, after which it is the most recently used"""
+        tag = addr // self.line
+        lines = self.sets[tag % len(self.sets)]
+        if tag in lines:
+            lines.move_to_end(tag)
+            return True
+        lines[tag] = None
+        if len(lines) > self.assoc:
+            lines.popitem(last=False)
+        return False
+
+
+class _Simulator:
+    """
+    Runs the accesses of a procedure to buffers in DRAM through the caches.
+    Buffers are stored densely in row-major order, each from the start of a
+    page, and the accesses of the statements in an instruction are the ones
+    of its semantics.
+    """
+
+    _PAGE = 4096
+
+    def __init__(self, proc, sizes, caches):
+        self.proc = proc
+        self.caches = caches
+        self.levels = [_LRUCache(c) for c in caches]
+        self.misses = {c.name: dict() for c in caches}
+        self.cached = _cached_memories()
+        # the address, strides and element size of every buffer
+        self.layout = dict()
+        self.end = 0
+        self.accessed = set()
+
+        env, views = dict(), dict()
+        for a in proc.args:
+            if not a.type.is_numeric():
+                env[a.name] = sizes.get(str(a.name))
+        for a in proc.args:
+            if a.type.is_numeric():
+                self.declare(a.name, a.type, a.mem or DRAM, env)
+                views[a.name] = (a.name, None)
+        self.root_env = env
+        self.root_views = views
+
+    def run(self):
+        self.stmts(self.proc.body, self.root_env, self.root_views)
+        return {
+            c.name: {str(buf): self.misses[c.name].get(buf, 0) for buf in self.accessed}
+            for c in self.caches
+        }
+
+    def declare(self, name, typ, mem, env):
+        if mem.name() not in self.cached:
+            return
+        shape = [self.index(n, env) for n in typ.shape()]
+        strides, n = [], 1
+        for dim in reversed(shape):
+            strides.insert(0, n)
+            n *= dim
+        nbytes = _BYTES.get(typ.basetype(), 4)
+        addr = -(-self.end // self._PAGE) * self._PAGE
+        self.end = addr + max(n, 1) * nbytes
+        self.layout[name] = (addr, strides, nbytes)
+
+    def stmts(self, body, env, views):
+        for s in body:
+            if isinstance(s, (LoopIR.Assign, LoopIR.Reduce)):
+                self.expr(s.rhs, env, views)
+                idx = [self.index(i, env) for i in s.idx]
+                if isinstance(s, LoopIR.Reduce):
+                    self.access(s.name, idx, views)
+                self.access(s.name, idx, views)
+            elif isinstance(s, LoopIR.If):
+                try:
+                    cond = self.index(s.cond, env)
+                except KeyError:
+                    # depends on data or configurations
+                    cond = True
+                self.stmts(s.body if cond else s.orelse, env, views)
+            elif isinstance(s, LoopIR.For):
+                lo, hi = self.index(s.lo, env), self.index(s.hi, env)
+                for i in range(lo, hi):
+                    env[s.iter] = i
+                    self.stmts(s.body, env, views)
+            elif isinstance(s, LoopIR.Alloc):
+                if s.name not in self.layout:
+                    self.declare(s.name, s.type, s.mem or DRAM, env)
+                views[s.name] = (s.name, None)
+            elif isinstance(s, LoopIR.WindowStmt):
+                views[s.name] = self.window(s.rhs, env, views)
+            elif isinstance(s, LoopIR.Call):
+                callee_env, callee_views = dict(), dict()
+                for a, e in zip(s.f.args, s.args):
+                    if a.type.is_numeric():
+                        if isinstance(e, LoopIR.WindowExpr):
+                            callee_views[a.name] = self.window(e, env, views)
+                        else:
+                            callee_views[a.name] = views[e.name]
+                    else:
+                        callee_env[a.name] = self.index(e, env)
+                self.stmts(s.f.body, callee_env, callee_views)
+
+    def expr(self, e, env, views):
+        if isinstance(e, LoopIR.Read):
+            if e.type.is_numeric():
+                self.access(e.name, [self.index(i, env) for i in e.idx], views)
+        elif isinstance(e, LoopIR.USub):
+            self.expr(e.arg, env, views)
+        elif isinstance(e, LoopIR.BinOp):
+            self.expr(e.lhs, env, views)
+            self.expr(e.rhs, env, views)
+        elif isinstance(e, LoopIR.Extern):
+            for a in e.args:
+                self.expr(a, env, views)
+
+    def window(self, e, env, views):
+        # a view of a buffer: the buffer, and its fixed index and offset in
+        # each dimension, in which the window indexes if the index is None
+        buf, dims = views[e.name]
+        idx = []
+        for w in e.idx:
+            if isinstance(w, LoopIR.Interval):
+                idx.append((None, self.index(w.lo, env)))
+            else:
+                idx.append((self.index(w.pt, env), 0))
+        if dims is None:
+            return buf, idx
+        # windows of windows
+        points = iter(idx)
+        nested = []
+        for pt, lo in dims:
+            if pt is None:
+                inner_pt, inner_lo = next(points)
+                nested.append(
+                    (None, lo + inner_lo) if inner_pt is None else (lo + inner_pt, 0)
+                )
+            else:
+                nested.append((pt, lo))
+        return buf, nested
+
+    def access(self, name, idx, views):
+        buf, dims = views[name]
+        if buf not in self.layout:
+            return
+        if dims is not None:
+            points = iter(idx)
+            idx = [lo + next(points) if pt is None else pt for pt, lo in dims]
+        self.accessed.add(buf)
+        addr, strides, nbytes = self.layout[buf]
+        addr += nbytes * sum(i * s for i, s in zip(idx, strides))
+        for c, level in zip(self.caches, self.levels):
+            if level.access(addr):
+                break
+            misses = self.misses[c.name]
+            misses[buf] = misses.get(buf, 0) + 1
+
+    def index(self, e, env):
+        if isinstance(e, LoopIR.Const):
+            return e.val
+        elif isinstance(e, LoopIR.Read) and not e.idx and e.name in env:
+            if env[e.name] is None:
+                raise KeyError(e.name)
+            return env[e.name]
+        elif isinstance(e, LoopIR.USub):
+            return -self.index(e.arg, env)
+        elif isinstance(e, LoopIR.BinOp):
+            lhs, rhs = self.index(e.lhs, env), self.index(e.rhs, env)
+            return _BINOPS[e.op](lhs, rhs)
+        raise KeyError(e)
+
+
+_BINOPS = {
+    "+": lambda a, b: a + b,
+    "-": lambda a, b: a - b,
+    "*": lambda a, b: a * b,
+    "/": lambda a, b: a // b,
+    "%": lambda a, b: a % b,
+    "<": lambda a, b: a < b,
+    ">": lambda a, b: a > b,
+    "<=": lambda a, b: a <= b,
+    ">=": lambda a, b: a >= b,
+    "==": lambda a, b: a == b,
+    "and": lambda a, b: a and b,
+    "or": lambda a, b: a or b,
+}
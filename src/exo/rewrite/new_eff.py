@@ -1,9 +1,17 @@
 from collections import OrderedDict, ChainMap
+from contextlib import contextmanager
 from enum import Enum
 from itertools import chain
 
-from ..core.LoopIR import Alpha_Rename, SubstArgs, LoopIR_Do
+from ..core.LoopIR import (
+    Alpha_Rename,
+    SubstArgs,
+    LoopIR_Do,
+    get_reads_of_expr,
+    loop_mode_exprs,
+)
 from ..core.configs import reverse_config_lookup, Config
+from ..core.memory import DRAM
 from .new_analysis_core import *
 from ..core.proc_eqv import get_repr_proc
 
@@ -1159,6 +1167,8 @@ def stmts_effs(stmts):
         elif isinstance(s, LoopIR.For):
             effs += expr_effs(s.lo)
             effs += expr_effs(s.hi)
+            for e in loop_mode_exprs(s.loop_mode):
+                effs += expr_effs(e)
             bds = AAnd(lift_e(s.lo) <= AInt(s.iter), AInt(s.iter) < lift_e(s.hi))
             # we must prefix the body with the loop-invariant dataflow
             # analysis of the loop, since that is the only precondition
@@ -1266,8 +1276,26 @@ class ContextExtraction:
     def __init__(self, proc, stmts):
         self.proc = proc
         self.stmts = stmts
+        self._ctrlp = None
+        self._pre_globenv = None
+        self._posteffs = None
 
     def get_control_predicate(self):
+        if self._ctrlp is None:
+            self._ctrlp = self._control_predicate()
+        return self._ctrlp
+
+    def get_pre_globenv(self):
+        if self._pre_globenv is None:
+            self._pre_globenv = self.preenv_stmts(self.proc.body)
+        return self._pre_globenv
+
+    def get_posteffs(self):
+        if self._posteffs is None:
+            self._posteffs = self._posteffs_of_proc()
+        return list(self._posteffs)
+
+    def _control_predicate(self):
         assumed = AAnd(*[lift_e(p) for p in self.proc.preds])
         # collect assumptions that size arguments are positive
         pos_sizes = AAnd(
@@ -1276,10 +1304,7 @@ class ContextExtraction:
         ctrlp = self.ctrlp_stmts(self.proc.body)
         return AAnd(assumed, pos_sizes, ctrlp)
 
-    def get_pre_globenv(self):
-        return self.preenv_stmts(self.proc.body)
-
-    def get_posteffs(self):
+    def _posteffs_of_proc(self):
         a = self.posteff_stmts(self.proc.body)
         if len(self.proc.preds) > 0:
             assumed = AAnd(*[lift_e(p) for p in self.proc.preds])
@@ -1548,6 +1573,8 @@ def Shadows(a1, a2):
 # Scheduling Checks
 
 import inspect
+import multiprocessing
+import os
 import textwrap
 from ..API_types import ProcedureBase
 
@@ -1571,9 +1598,10 @@ class SchedulingError(Exception):
     @staticmethod
     def _get_scheduling_ops():
         ops = []
-        for frame in inspect.stack():
-            if obj := frame[0].f_locals.get("self"):
-                fn = frame.function
+        frame = inspect.currentframe()
+        while frame := frame.f_back:
+            if obj := frame.f_locals.get("self"):
+                fn = frame.f_code.co_name
                 if isinstance(obj, ProcedureBase) and not fn.startswith("_"):
                     ops.append(fn)
         if not ops:
@@ -1581,6 +1609,163 @@ class SchedulingError(Exception):
         return ops
 
 
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Deferred Safety Obligations
+#
+# Scheduling directives normally discharge their safety checks immediately.
+# While a transaction (see `exo.API.transaction`) is open, checks which are
+# pure obligations (i.e. they either succeed or raise) are queued instead,
+# and later verified in one batch which shares a single solver instance.
+
+
+@dataclass
+class Obligation:
+    check: Any
+    args: tuple
+    kwargs: dict
+    op: str
+
+    def discharge(self):
+        self.check(*self.args, **self.kwargs)
+
+    def __str__(self):
+        return f"{self.check.__name__} (queued by {self.op})"
+
+
+_obligation_queues = []
+_sched_op_names = []
+_shared_solver = None
+# while a batch of obligations is discharged, the contexts extracted for
+# them, keyed by the procedure and the focused statements
+_context_cache = None
+
+
+def _get_solver():
+    if _shared_solver is not None:
+        return _shared_solver
+    return SMTSolver(verbose=False)
+
+
+def _get_context(proc, stmts):
+    if _context_cache is None:
+        return ContextExtraction(proc, stmts)
+    key = (id(proc), tuple(id(s) for s in stmts))
+    if (ctxt := _context_cache.get(key)) is None:
+        # the context holds on to `proc` and `stmts`, so their ids stay valid
+        ctxt = _context_cache[key] = ContextExtraction(proc, stmts)
+    return ctxt
+
+
+@contextmanager
+def sched_op_obligations(name):
+    """
+    Attribute the obligations queued inside of this block to the
+    scheduling operation `name`
+    """
+    _sched_op_names.append(name)
+    try:
+        yield
+    finally:
+        _sched_op_names.pop()
+
+
+def obligation(check, *args, **kwargs):
+    """
+    Discharge the safety check `check(*args, **kwargs)` right away, or
+    queue it if a transaction is currently open.
+    """
+    if not _obligation_queues:
+        check(*args, **kwargs)
+    else:
+        op = _sched_op_names[-1] if _sched_op_names else "<<<unknown directive>>>"
+        ob = Obligation(check, args, kwargs, op)
+        _obligation_queues[-1].append(ob)
+
+
+def begin_obligations():
+    queue = []
+    _obligation_queues.append(queue)
+    return queue
+
+
+def end_obligations(queue):
+    assert _obligation_queues and _obligation_queues[-1] is queue
+    _obligation_queues.pop()
+    return queue
+
+
+def _discharge_serial(obligations):
+    """returns the index and error of the first failing obligation or None"""
+    global _shared_solver, _context_cache
+    _shared_solver = SMTSolver(verbose=False)
+    _context_cache = {}
+    try:
+        for i, ob in enumerate(obligations):
+            depth = len(_shared_solver.frames)
+            try:
+                ob.discharge()
+            except BaseException as err:
+                # restore the shared solver if the check bailed out early
+                while len(_shared_solver.frames) > depth:
+                    _shared_solver.pop()
+                if isinstance(err, SchedulingError):
+                    return i, err
+                raise
+        return None
+    finally:
+        _shared_solver = None
+        _context_cache = None
+
+
+_forked_obligations = None
+
+
+def _discharge_forked(chunk):
+    lo, hi = chunk
+    failure = _discharge_serial(_forked_obligations[lo:hi])
+    return None if failure is None else lo + failure[0]
+
+
+def discharge_obligations(obligations, parallel=False):
+    """
+    Verify all `obligations`.  Returns a pair `(obligation, error)` for the
+    earliest obligation in queue order that fails, or None if all hold.
+
+    If `parallel` is True (or an integer number of worker processes), the
+    obligations are split among forked worker processes, each with its own
+    shared solver.  The earliest failure is then re-checked in this process
+    to recover the precise error.
+    """
+    global _forked_obligations
+    obligations = list(obligations)
+
+    n_workers = 0
+    if parallel and "fork" in multiprocessing.get_all_start_methods():
+        n_workers = os.cpu_count() if parallel is True else int(parallel)
+        n_workers = min(n_workers, len(obligations))
+
+    if n_workers <= 1:
+        failure = _discharge_serial(obligations)
+        return None if failure is None else (obligations[failure[0]], failure[1])
+
+    step = -(-len(obligations) // n_workers)
+    chunks = [(lo, lo + step) for lo in range(0, len(obligations), step)]
+    _forked_obligations = obligations
+    try:
+        with multiprocessing.get_context("fork").Pool(n_workers) as pool:
+            failed = [i for i in pool.map(_discharge_forked, chunks) if i is not None]
+    finally:
+        _forked_obligations = None
+
+    if not failed:
+        return None
+    ob = obligations[min(failed)]
+    failure = _discharge_serial([ob])
+    assert failure is not None, "obligation failed in a worker but not serially"
+    return ob, failure[1]
+
+
 def loop_globenv(i, lo_expr, hi_expr, body):
     assert isinstance(lo_expr, LoopIR.expr)
     assert isinstance(hi_expr, LoopIR.expr)
@@ -1590,12 +1775,12 @@ def loop_globenv(i, lo_expr, hi_expr, body):
 
 
 def Check_ReorderStmts(proc, s1, s2):
-    ctxt = ContextExtraction(proc, [s1, s2])
+    ctxt = _get_context(proc, [s1, s2])
 
     p = ctxt.get_control_predicate()
     G = ctxt.get_pre_globenv()
 
-    slv = SMTSolver(verbose=False)
+    slv = _get_solver()
     slv.push()
     slv.assume(AMay(p))
 
@@ -1612,12 +1797,12 @@ def Check_ReorderStmts(proc, s1, s2):
 
 
 def Check_ReorderLoops(proc, s):
-    ctxt = ContextExtraction(proc, [s])
+    ctxt = _get_context(proc, [s])
 
     p = ctxt.get_control_predicate()
     G = ctxt.get_pre_globenv()
 
-    slv = SMTSolver(verbose=False)
+    slv = _get_solver()
     slv.push()
     slv.assume(AMay(p))
 
@@ -1687,13 +1872,17 @@ def Check_ReorderLoops(proc, s):
 #   (forall i. May(InBound(i,e)) ==> Commutes(ae, a1))
 #   /\ ( forall i,i'. May(InBound(i,i',e) /\ i < i') => Commutes(a1', a1) )
 #
-def Check_ParallelizeLoop(proc, s):
-    ctxt = ContextExtraction(proc, [s])
+#   Buffers in `privatized` are reduced into by a parallel reduction, so that
+#   every iteration reduces into its own copy of them.  They are renamed apart
+#   in a1 and a1' before checking that the iterations commute.
+#
+def Check_ParallelizeLoop(proc, s, privatized=()):
+    ctxt = _get_context(proc, [s])
 
     p = ctxt.get_control_predicate()
     G = ctxt.get_pre_globenv()
 
-    slv = SMTSolver(verbose=False)
+    slv = _get_solver()
     slv.push()
     slv.assume(AMay(p))
 
@@ -1708,7 +1897,13 @@ def Check_ParallelizeLoop(proc, s):
 
     a_bd = expr_effs(s.lo) + expr_effs(s.hi)
     a = G(stmts_effs(body))
-    a2 = G(stmts_effs(body2))
+
+    def privatize(stmts):
+        subenv = {x: LoopIR.Read(x.copy(), [], T.R, null_srcinfo()) for x in privatized}
+        return SubstArgs(stmts, subenv).result()
+
+    a1 = G(stmts_effs(privatize(body)))
+    a2 = G(stmts_effs(privatize(body2)))
 
     def bds(x, lo, hi):
         return AAnd(lift_e(lo) <= AInt(x), AInt(x) < lift_e(hi))
@@ -1721,7 +1916,7 @@ def Check_ParallelizeLoop(proc, s):
         [i, i2],
         AImplies(
             AMay(AAnd(bds(i, lo, hi), bds(i2, lo, hi), AInt(i) < AInt(i2))),
-            Disjoint_Memory(a, a2),
+            Disjoint_Memory(a1, a2),
         ),
     )
 
@@ -1732,6 +1927,116 @@ def Check_ParallelizeLoop(proc, s):
         raise SchedulingError(f"Cannot parallelize loop over {i} at {s.srcinfo}")
 
 
+def get_parallel_reductions(proc, s):
+    """
+    Checks that the loop `s` can be parallelized, and returns the buffers
+    which need to be privatized by a parallel reduction for it to be.  As
+    few buffers as possible are privatized.
+    """
+    try:
+        Check_ParallelizeLoop(proc, s)
+        return []
+    except SchedulingError:
+        candidates = get_reduction_buffers(proc, s)
+        if not candidates:
+            raise
+
+    Check_ParallelizeLoop(proc, s, candidates)
+    privatized = candidates
+    for x in candidates:
+        fewer = [y for y in privatized if y != x]
+        if not fewer:
+            break
+        try:
+            Check_ParallelizeLoop(proc, s, fewer)
+            privatized = fewer
+        except SchedulingError:
+            pass
+    return privatized
+
+
+def get_reduction_buffers(proc, s):
+    """
+    Returns the buffers which the body of the loop `s` only ever reduces
+    into, and which could therefore be privatized by a parallel reduction.
+    These are scalars and dense tensors in DRAM, allocated outside of the
+    loop, which are never read, assigned or windowed.
+    """
+    outer = _BufferUses(proc.body)
+    uses = _BufferUses(s.body)
+    uses.do_e(s.lo)
+    uses.do_e(s.hi)
+
+    bufs = {a.name: (a.type, a.mem) for a in proc.args if a.type.is_numeric()}
+    bufs.update(outer.allocs)
+
+    def is_reduction(x):
+        typ, mem = bufs[x]
+        return (
+            x not in uses.allocs
+            and x not in uses.reads
+            and x not in uses.assigns
+            and x not in outer.windows
+            and not typ.is_win()
+            and issubclass(mem or DRAM, DRAM)
+        )
+
+    return [x for x in uses.reduces if x in bufs and is_reduction(x)]
+
+
+class _BufferUses(LoopIR_Do):
+    def __init__(self, stmts):
+        self.allocs = dict()
+        self.reads = set()
+        self.assigns = set()
+        self.windows = set()
+        # in order of first appearance
+        self.reduces = dict()
+        self.do_stmts(stmts)
+
+    def do_s(self, s):
+        if isinstance(s, LoopIR.Alloc):
+            self.allocs[s.name] = (s.type, s.mem)
+        elif isinstance(s, LoopIR.Assign):
+            self.assigns.add(s.name)
+        elif isinstance(s, LoopIR.Reduce):
+            self.reduces[s.name] = True
+        super().do_s(s)
+
+    def do_e(self, e):
+        if isinstance(e, (LoopIR.Read, LoopIR.StrideExpr)):
+            self.reads.add(e.name)
+        elif isinstance(e, LoopIR.WindowExpr):
+            self.reads.add(e.name)
+            self.windows.add(e.name)
+        super().do_e(e)
+
+
+def Check_CollapseLoops(s, n):
+    """
+    Checks that the loop `s` is the outermost of `n` perfectly nested loops
+    whose bounds do not depend on each other, and returns these loops.
+    """
+    loops = [s]
+    for _ in range(n - 1):
+        body = loops[-1].body
+        if len(body) != 1 or not isinstance(body[0], LoopIR.For):
+            raise SchedulingError(
+                f"Cannot collapse {n} loops at {s.srcinfo}: "
+                f"the loops are not perfectly nested"
+            )
+        inner = body[0]
+        iters = [loop.iter for loop in loops]
+        reads = get_reads_of_expr(inner.lo) + get_reads_of_expr(inner.hi)
+        if any(nm in iters for nm, _ in reads):
+            raise SchedulingError(
+                f"Cannot collapse {n} loops at {s.srcinfo}: the bounds of "
+                f"the loop over {inner.iter} depend on an outer loop"
+            )
+        loops.append(inner)
+    return loops
+
+
 # Formal Statement
 #       for i in e: (s1 ; s2)  -->  (for i in e: s1); (for i in e: s2)
 #
@@ -1742,13 +2047,13 @@ def Check_ParallelizeLoop(proc, s):
 #                     Commutes(a1', a2) /\ AllocCommutes(a1, a2) )
 #
 def Check_FissionLoop(proc, loop, stmts1, stmts2, no_loop_var_1=False):
-    ctxt = ContextExtraction(proc, [loop])
+    ctxt = _get_context(proc, [loop])
     chgG = get_changing_scalars(proc.body)
 
     p = ctxt.get_control_predicate()
     G = ctxt.get_pre_globenv()
 
-    slv = SMTSolver(verbose=False)
+    slv = _get_solver()
     slv.push()
     slv.assume(AMay(p))
 
@@ -1805,7 +2110,7 @@ def Check_FissionLoop(proc, loop, stmts1, stmts2, no_loop_var_1=False):
 
 def Check_DeleteConfigWrite(proc, stmts):
     assert len(stmts) > 0
-    ctxt = ContextExtraction(proc, stmts)
+    ctxt = _get_context(proc, stmts)
 
     p = ctxt.get_control_predicate()
     G = ctxt.get_pre_globenv()
@@ -1813,7 +2118,7 @@ def Check_DeleteConfigWrite(proc, stmts):
     a = G(stmts_effs(stmts))
     stmtsG = globenv(stmts)
 
-    slv = SMTSolver(verbose=False)
+    slv = _get_solver()
     slv.push()
     a = [E.Guard(AMay(p), a)]
 
@@ -1881,7 +2186,7 @@ def Check_DeleteConfigWrite(proc, stmts):
 def Check_ExtendEqv(proc, stmts0, stmts1, cfg_mod):
     assert len(stmts0) > 0
     assert len(stmts1) > 0
-    ctxt = ContextExtraction(proc, stmts0)
+    ctxt = _get_context(proc, stmts0)
 
     p = ctxt.get_control_predicate()
     G = ctxt.get_pre_globenv()
@@ -1890,7 +2195,7 @@ def Check_ExtendEqv(proc, stmts0, stmts1, cfg_mod):
     sG0 = globenv(stmts0)
     sG1 = globenv(stmts1)
 
-    slv = SMTSolver(verbose=False)
+    slv = _get_solver()
     slv.push()
     # slv.assume(AMay(p))
 
@@ -1933,15 +2238,15 @@ def Check_ExtendEqv(proc, stmts0, stmts1, cfg_mod):
 def Check_ExprEqvInContext(proc, expr0, stmts0, expr1, stmts1=None):
     assert len(stmts0) > 0
     stmts1 = stmts1 or stmts0
-    ctxt0 = ContextExtraction(proc, stmts0)
-    ctxt1 = ContextExtraction(proc, stmts1)
+    ctxt0 = _get_context(proc, stmts0)
+    ctxt1 = _get_context(proc, stmts1)
 
     p0 = ctxt0.get_control_predicate()
     G0 = ctxt0.get_pre_globenv()
     p1 = ctxt1.get_control_predicate()
     G1 = ctxt1.get_pre_globenv()
 
-    slv = SMTSolver(verbose=False)
+    slv = _get_solver()
     slv.push()
     slv.assume(AMay(AAnd(p0, p1)))
 
@@ -1957,12 +2262,12 @@ def Check_ExprEqvInContext(proc, expr0, stmts0, expr1, stmts1=None):
 
 def Check_BufferReduceOnly(proc, stmts, buf, ndim):
     assert len(stmts) > 0
-    ctxt = ContextExtraction(proc, stmts)
+    ctxt = _get_context(proc, stmts)
 
     p = ctxt.get_control_predicate()
     G = ctxt.get_pre_globenv()
 
-    slv = SMTSolver(verbose=False)
+    slv = _get_solver()
     slv.push()
     slv.assume(AMay(p))
 
@@ -1995,10 +2300,10 @@ def Check_Access_In_Window(proc, access_cursor, w_exprs, block_cursor):
     idxs = access.idx
     assert len(idxs) == len(w_exprs)
 
-    ctxt = ContextExtraction(proc, block)
+    ctxt = _get_context(proc, block)
     p = ctxt.get_control_predicate()
 
-    slv = SMTSolver(verbose=False)
+    slv = _get_solver()
     slv.push()
     slv.assume(AMay(p))
 
@@ -2068,12 +2373,12 @@ def Check_Access_In_Window(proc, access_cursor, w_exprs, block_cursor):
 def Check_Bounds(proc, alloc_stmt, block):
     if len(block) == 0:
         return
-    ctxt = ContextExtraction(proc, block)
+    ctxt = _get_context(proc, block)
 
     p = ctxt.get_control_predicate()
     G = ctxt.get_pre_globenv()
 
-    slv = SMTSolver(verbose=False)
+    slv = _get_solver()
     slv.push()
     slv.assume(AMay(p))
 
@@ -2108,11 +2413,11 @@ def Check_Bounds(proc, alloc_stmt, block):
 
 def Check_IsDeadAfter(proc, stmts, bufname, ndim):
     assert len(stmts) > 0
-    ctxt = ContextExtraction(proc, stmts)
+    ctxt = _get_context(proc, stmts)
 
     ap = ctxt.get_posteffs()
 
-    slv = SMTSolver(verbose=False)
+    slv = _get_solver()
     slv.push()
 
     # extract effect location sets
@@ -2130,14 +2435,14 @@ def Check_IsDeadAfter(proc, stmts, bufname, ndim):
 
 def Check_IsIdempotent(proc, stmts):
     assert len(stmts) > 0
-    ctxt = ContextExtraction(proc, stmts)
+    ctxt = _get_context(proc, stmts)
 
     p = ctxt.get_control_predicate()
     G = ctxt.get_pre_globenv()
     ap = ctxt.get_posteffs()
     a = G(stmts_effs(stmts))
 
-    slv = SMTSolver(verbose=False)
+    slv = _get_solver()
     slv.push()
     slv.assume(AMay(p))
 
@@ -2150,12 +2455,12 @@ def Check_IsIdempotent(proc, stmts):
 def Check_ExprBound(proc, stmts, expr, op, value, exception=True):
     assert len(stmts) > 0
 
-    ctxt = ContextExtraction(proc, stmts)
+    ctxt = _get_context(proc, stmts)
 
     p = ctxt.get_control_predicate()
     G = ctxt.get_pre_globenv()
 
-    slv = SMTSolver(verbose=False)
+    slv = _get_solver()
     slv.push()
     slv.assume(AMay(p))
 
@@ -2196,7 +2501,7 @@ def Check_ExprBound(proc, stmts, expr, op, value, exception=True):
 
 def Check_CodeIsDead(proc, stmts):
     assert len(stmts) > 0
-    ctxt = ContextExtraction(proc, stmts)
+    ctxt = _get_context(proc, stmts)
 
     p = ctxt.get_control_predicate()
     G = ctxt.get_pre_globenv()
@@ -2242,7 +2547,7 @@ def Check_CodeIsDead(proc, stmts):
     # second condition
     mod_unread_outside = ADef(is_empty(LIsct(LDiff(Modp, W_ap), Outside)))
 
-    slv = SMTSolver(verbose=False)
+    slv = _get_solver()
     slv.push()
     mod_unread_in_proc = slv.verify(mod_unread_in_proc)
     mod_unread_outside = slv.verify(mod_unread_outside)
@@ -5,6 +5,7 @@ from typing import Optional, Tuple
 
 from ..core.LoopIR import LoopIR, T, LoopIR_Compare
 from .new_eff import Check_ExprBound
+from .affine import AffineForm, affine_form
 from ..core.prelude import Sym, _null_srcinfo_obj
 
 
@@ -310,6 +311,9 @@ def constant_bound(expr, env) -> Tuple[int, int] | None:
     if isinstance(expr, int):
         return (expr, expr)
 
+    if (form := affine_form(expr)) is not None:
+        return affine_bound(form, env)
+
     idx_rng = index_range_analysis(expr, env)
     if isinstance(idx_rng, int):
         return (idx_rng, idx_rng)
@@ -319,6 +323,23 @@ def constant_bound(expr, env) -> Tuple[int, int] | None:
     return (idx_rng.lo, idx_rng.hi)
 
 
+def affine_bound(form: AffineForm, env) -> Tuple[int, int]:
+    """
+    Returns inclusive constant integer bounds for the affine `form`, where
+    either bound is None if it cannot be determined from [env].
+    """
+    lo, hi = form.const, form.const
+    for sym, c in form.coeffs:
+        if sym not in env:
+            return (None, None)
+        sym_lo, sym_hi = env[sym]
+        if c < 0:
+            sym_lo, sym_hi = sym_hi, sym_lo
+        lo = None if lo is None or sym_lo is None else lo + c * sym_lo
+        hi = None if hi is None or sym_hi is None else hi + c * sym_hi
+    return (lo, hi)
+
+
 def arg_range_analysis(proc, arg, fast=True):
     """
     Try to find a bounding range on the arguments
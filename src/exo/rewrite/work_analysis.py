@@ -0,0 +1,863 @@
+from __future__ import annotations
+
+import functools
+import math
+from dataclasses import dataclass, field
+from fractions import Fraction
+from typing import Dict
+
+from ..core.LoopIR import LoopIR, T, eval_expr, get_reads_of_expr
+from ..core.memory import DRAM
+from ..core.prelude import Sym
+from .affine import affine_form
+from .range_analysis import constant_bound
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Work and traffic analysis
+#
+# Counts what a procedure does as polynomials in its size arguments:
+#   - arithmetic operations on values of each precision,
+#   - elements loaded from and stored to buffers in each memory,
+#   - calls of each instruction, and
+#   - distinct elements of each buffer accessed by each loop.
+# Loops are summed symbolically (Faulhaber's formulas), so the counts are
+# exact for loop nests whose bounds are polynomial in the sizes and the
+# iterators of outer loops.  Both branches of an `if` are counted, which
+# over-counts guarded statements, and `WorkStats.exact` is then False.
+#
+# Index expressions are read off their affine forms (see `affine.py`) and
+# quotients are folded by range analysis where possible.  The counts
+# themselves are products of sizes and sums of powers of iterators, which
+# affine forms and constant ranges do not represent, hence `Polynomial`.
+
+
+class Polynomial:
+    """
+    A polynomial with rational coefficients.  Its variables are size
+    arguments and loop iterators (Syms), and index expressions which are not
+    polynomial, like `N / 8` (see `_Opaque`).
+    """
+
+    __slots__ = ("terms",)
+
+    def __init__(self, terms=None):
+        # monomial (a frozenset of (variable, power) pairs) -> coefficient
+        self.terms = {m: c for m, c in (terms or {}).items() if c != 0}
+
+    @staticmethod
+    def const(c) -> Polynomial:
+        return Polynomial({frozenset(): Fraction(c)})
+
+    @staticmethod
+    def var(x) -> Polynomial:
+        return Polynomial({frozenset([(x, 1)]): Fraction(1)})
+
+    def is_const(self):
+        return all(not m for m in self.terms)
+
+    def const_value(self):
+        assert self.is_const()
+        c = self.terms.get(frozenset(), Fraction(0))
+        return int(c) if c.denominator == 1 else c
+
+    def variables(self):
+        return {x for m in self.terms for x, _ in m}
+
+    def __add__(self, other):
+        other = _poly(other)
+        terms = dict(self.terms)
+        for m, c in other.terms.items():
+            terms[m] = terms.get(m, 0) + c
+        return Polynomial(terms)
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return Polynomial({m: -c for m, c in self.terms.items()})
+
+    def __sub__(self, other):
+        return self + (-_poly(other))
+
+    def __rsub__(self, other):
+        return _poly(other) - self
+
+    def __mul__(self, other):
+        other = _poly(other)
+        terms = dict()
+        for m1, c1 in self.terms.items():
+            for m2, c2 in other.terms.items():
+                powers = dict(m1)
+                for x, k in m2:
+                    powers[x] = powers.get(x, 0) + k
+                m = frozenset(powers.items())
+                terms[m] = terms.get(m, 0) + c1 * c2
+        return Polynomial(terms)
+
+    __rmul__ = __mul__
+
+    def __pow__(self, k: int):
+        result = Polynomial.const(1)
+        for _ in range(k):
+            result = result * self
+        return result
+
+    def __eq__(self, other):
+        if isinstance(other, (int, Fraction, Polynomial)):
+            return self.terms == _poly(other).terms
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(frozenset(self.terms.items()))
+
+    def __int__(self):
+        return int(self.const_value())
+
+    def __float__(self):
+        return float(self.const_value())
+
+    def coeffs(self, x):
+        """The coefficients of the powers of `x`, as polynomials without `x`"""
+        coeffs = dict()
+        for m, c in self.terms.items():
+            k = dict(m).get(x, 0)
+            rest = frozenset((y, j) for y, j in m if y != x)
+            coeffs.setdefault(k, Polynomial())
+            coeffs[k] = coeffs[k] + Polynomial({rest: c})
+        return coeffs
+
+    def subs(self, env) -> Polynomial:
+        """Substitute the polynomials or numbers in `env` for variables"""
+        result = Polynomial()
+        for m, c in self.terms.items():
+            term = Polynomial.const(c)
+            for x, k in m:
+                term = term * (_poly(env[x]) if x in env else Polynomial.var(x)) ** k
+            result = result + term
+        return result
+
+    def sum(self, x, lo, hi) -> Polynomial:
+        """The sum of this polynomial over `x` from `lo` up to `hi` - 1"""
+        result = Polynomial()
+        lo, hi = _poly(lo), _poly(hi)
+        for k, c in self.coeffs(x).items():
+            s = _sum_of_powers(k)
+            result = result + c * (s.subs({_N: hi}) - s.subs({_N: lo}))
+        return result
+
+    def __str__(self):
+        if not self.terms:
+            return "0"
+
+        def order(item):
+            m, _ = item
+            return (-sum(k for _, k in m), sorted(str(x) for x, _ in m))
+
+        s = ""
+        for m, c in sorted(self.terms.items(), key=order):
+            factors = [
+                str(x) if k == 1 else f"{x}**{k}"
+                for x, k in sorted(m, key=lambda xk: str(xk[0]))
+            ]
+            mag = abs(c)
+            if factors and mag == 1:
+                term = " * ".join(factors)
+            else:
+                term = " * ".join([str(mag)] + factors)
+            if not s:
+                s = term if c > 0 else f"-{term}"
+            else:
+                s += f" + {term}" if c > 0 else f" - {term}"
+        return s
+
+    def __repr__(self):
+        return f"Polynomial({self})"
+
+
+def _poly(x) -> Polynomial:
+    if isinstance(x, Polynomial):
+        return x
+    return Polynomial.const(x)
+
+
+# the variable of the polynomials which sum powers
+_N = Sym("n")
+
+
+@functools.cache
+def _sum_of_powers(k) -> Polynomial:
+    # sum(i**k for i in range(n)), by Faulhaber's formula with B1 = -1/2
+    n = Polynomial.var(_N)
+    result = Polynomial()
+    for j in range(k + 1):
+        result = result + math.comb(k + 1, j) * _bernoulli(j) * n ** (k + 1 - j)
+    return result * Fraction(1, k + 1)
+
+
+@functools.cache
+def _bernoulli(j) -> Fraction:
+    if j == 0:
+        return Fraction(1)
+    return -sum(math.comb(j + 1, i) * _bernoulli(i) for i in range(j)) / Fraction(j + 1)
+
+
+def _affine_poly(form) -> Polynomial:
+    p = Polynomial.const(form.const)
+    for x, c in form.coeffs:
+        p = p + c * Polynomial.var(x)
+    return p
+
+
+def _in_range_ir(e):
+    # whether `e` only has the forms which range analysis handles
+    if isinstance(e, LoopIR.USub):
+        return _in_range_ir(e.arg)
+    elif isinstance(e, LoopIR.BinOp):
+        return _in_range_ir(e.lhs) and _in_range_ir(e.rhs)
+    return isinstance(e, (LoopIR.Const, LoopIR.Read))
+
+
+class _Opaque:
+    """
+    A variable standing for an index expression which is not polynomial
+    (quotients, remainders, strides and configurations), which is evaluated
+    when the sizes are known.  Expressions which print the same are the same
+    variable.
+    """
+
+    __slots__ = ("expr", "key")
+
+    def __init__(self, expr):
+        self.expr = expr
+        self.key = str(expr)
+
+    def __eq__(self, other):
+        return isinstance(other, _Opaque) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __str__(self):
+        return f"({self.key})"
+
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Results
+
+
+_FLOAT_TYPES = ("f16", "f32", "f64")
+
+_BYTES = {T.f16: 2, T.f32: 4, T.f64: 8, T.i8: 1, T.ui8: 1, T.ui16: 2, T.i32: 4}
+
+
+@dataclass
+class WorkStats:
+    """
+    What a procedure does, as polynomials in its sizes, or as numbers when
+    the sizes are given:
+
+    - `flops`: arithmetic operations (`+`, `-`, `*`, `/`, reductions and
+      extern calls) by the precision of their result, e.g. "f32".
+    - `loads`, `stores`: elements read from and written to buffers, by the
+      name of their memory, e.g. "DRAM" or "AVX2".
+    - `traffic`: bytes loaded and stored, by memory.
+    - `instrs`: calls by instruction name.  The semantic bodies of
+      instructions are counted in the other fields.
+    - `footprint`: the distinct elements of each buffer that the procedure
+      accesses, by buffer name.
+    - `loop_footprints`: the distinct elements of each buffer accessed by
+      all the iterations of a loop, for fixed values of the iterators of
+      the loops around it, by iterator name (with a `#2`, `#3`, ... suffix
+      for loops whose iterators have the same name as an earlier one).
+    - `exact`: False if the counts over-approximate, because both branches
+      of an `if` were counted, or footprints were bounded.
+    """
+
+    flops: Dict[str, object] = field(default_factory=dict)
+    loads: Dict[str, object] = field(default_factory=dict)
+    stores: Dict[str, object] = field(default_factory=dict)
+    traffic: Dict[str, object] = field(default_factory=dict)
+    instrs: Dict[str, object] = field(default_factory=dict)
+    footprint: Dict[str, object] = field(default_factory=dict)
+    loop_footprints: Dict[str, Dict[str, object]] = field(default_factory=dict)
+    exact: bool = True
+    # the element sizes of buffers, and the memories of the arguments
+    _bytes: Dict[str, int] = field(default_factory=dict, repr=False)
+    _arg_mems: Dict[str, str] = field(default_factory=dict, repr=False)
+
+    def total_flops(self):
+        """The floating point operations of all precisions"""
+        return sum((v for k, v in self.flops.items() if k in _FLOAT_TYPES), 0)
+
+    def cycles(self, costs, default=1.0):
+        """
+        An estimate of the cycles spent in instructions, from a table of
+        their costs in cycles by name (like `exo.platforms.x86.x86_instr_costs`).
+        Instructions missing from the table cost `default`.
+        """
+        return sum(n * costs.get(nm, default) for nm, n in self.instrs.items())
+
+    def subs(self, **sizes) -> WorkStats:
+        """These statistics with the sizes given by name"""
+        return _subs_stats(self, sizes)
+
+    def roofline(self, peak_gflops, bandwidth_gbs, memory="DRAM", traffic="footprint"):
+        """
+        Estimate the performance of the procedure with the roofline model,
+        from a peak of `peak_gflops` GFLOP/s and a bandwidth to `memory` of
+        `bandwidth_gbs` GB/s.  The statistics must not depend on sizes.
+
+        The traffic to `memory` is the footprint of the arguments in it
+        (`traffic="footprint"`), as if every element moved once, or all the
+        loads and stores to it (`traffic="accesses"`), as if none were
+        cached.
+        """
+        flops = float(self.total_flops())
+        if traffic == "footprint":
+            nbytes = sum(
+                float(n) * self._bytes[nm]
+                for nm, n in self.footprint.items()
+                if self._arg_mems.get(nm) == memory
+            )
+        elif traffic == "accesses":
+            nbytes = float(self.traffic.get(memory, 0))
+        else:
+            raise ValueError(
+                f"traffic must be 'footprint' or 'accesses', not {traffic!r}"
+            )
+
+        intensity = flops / nbytes if nbytes else math.inf
+        gflops = min(peak_gflops, intensity * bandwidth_gbs)
+        seconds = max(flops / (peak_gflops * 1e9), nbytes / (bandwidth_gbs * 1e9))
+        bound = "compute" if gflops >= peak_gflops else "memory"
+        return Roofline(intensity, gflops, bound, seconds)
+
+
+@dataclass
+class Roofline:
+    intensity: float  # FLOPs per byte
+    gflops: float  # attainable GFLOP/s
+    bound: str  # "compute" or "memory"
+    seconds: float  # estimated time of one call
+
+
+def _subs_stats(stats, sizes):
+    env = dict()
+    for x in _all_variables(stats):
+        if isinstance(x, Sym) and x.name() in sizes:
+            env[x] = sizes[x.name()]
+    # opaque expressions are evaluated when all their variables are given
+    for x in _all_variables(stats):
+        if isinstance(x, _Opaque):
+            try:
+                env[x] = _eval(x.expr, sizes)
+            except KeyError:
+                pass
+
+    def subs(v):
+        if isinstance(v, Polynomial):
+            v = v.subs(env)
+            return v.const_value() if v.is_const() else v
+        return v
+
+    def subs_all(d):
+        return {k: subs(v) for k, v in d.items()}
+
+    return WorkStats(
+        flops=subs_all(stats.flops),
+        loads=subs_all(stats.loads),
+        stores=subs_all(stats.stores),
+        traffic=subs_all(stats.traffic),
+        instrs=subs_all(stats.instrs),
+        footprint=subs_all(stats.footprint),
+        loop_footprints={k: subs_all(d) for k, d in stats.loop_footprints.items()},
+        exact=stats.exact,
+        _bytes=stats._bytes,
+        _arg_mems=stats._arg_mems,
+    )
+
+
+def _all_variables(stats):
+    dicts = [stats.flops, stats.loads, stats.stores, stats.traffic, stats.instrs]
+    dicts += [stats.footprint, *stats.loop_footprints.values()]
+    return {
+        x
+        for d in dicts
+        for v in d.values()
+        if isinstance(v, Polynomial)
+        for x in v.variables()
+    }
+
+
+def _eval(e, sizes):
+    # evaluates an index expression, given the values of sizes by name
+    env = {x: sizes[x.name()] for x, _ in get_reads_of_expr(e) if x.name() in sizes}
+    return eval_expr(e, env)
+
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Counting
+
+
+def work_stats(proc) -> WorkStats:
+    """The symbolic `WorkStats` of the LoopIR procedure `proc`"""
+    analysis = _WorkAnalysis(proc)
+    counts = analysis.stmts(proc.body)
+
+    stats = WorkStats(exact=analysis.exact)
+    for (kind, key), n in counts.items():
+        getattr(stats, kind)[key] = n
+    stats.footprint = analysis.footprint(None)
+    for loop, nm in _loop_names(analysis.loops).items():
+        stats.loop_footprints[nm] = analysis.footprint(loop)
+    stats.exact = analysis.exact
+
+    stats._bytes = {str(nm): b for nm, b in analysis.bytes.items()}
+    stats._arg_mems = {
+        str(a.name): (a.mem or DRAM).name() for a in proc.args if a.type.is_numeric()
+    }
+    return stats
+
+
+def _loop_names(loops):
+    # the names of loops by iterator, with a suffix for repeated names
+    names, counts = dict(), dict()
+    for loop in loops:
+        nm = str(loop)
+        counts[nm] = counts.get(nm, 0) + 1
+        names[loop] = nm if counts[nm] == 1 else f"{nm}#{counts[nm]}"
+    return names
+
+
+def _add(counts, other, scale=None):
+    for k, n in other.items():
+        counts[k] = counts.get(k, Polynomial()) + (n if scale is None else n * scale)
+
+
+class _WorkAnalysis:
+    def __init__(self, proc, mems=None):
+        self.exact = True
+        # the memory, element size and shape of every buffer
+        self.mems = dict()
+        self.bytes = dict()
+        self.shapes = dict()
+        # the buffer and the window expression of every derived window
+        self.windows = dict()
+        # the loops, outermost first, and the accesses with the loops around
+        # them, for footprints
+        self.loops = []
+        self.stack = []
+        self.trips = dict()
+        self.los = dict()
+        self.his = dict()
+        # the constant ranges of iterators, for range analysis
+        self.ranges = dict()
+        self.accesses = []
+
+        for a in proc.args:
+            if a.type.is_numeric():
+                mem = (mems or {}).get(a.name) or (a.mem or DRAM).name()
+                self.declare(a.name, a.type, mem)
+
+    def declare(self, name, typ, mem):
+        self.mems[name] = mem
+        self.bytes[name] = _BYTES.get(typ.basetype(), 4)
+        self.shapes[name] = [self.index(n) for n in typ.shape()]
+
+    # ----------------------------------------------------------------- #
+    # statements
+
+    def stmts(self, body):
+        counts = dict()
+        for s in body:
+            _add(counts, self.stmt(s))
+        return counts
+
+    def stmt(self, s):
+        counts = dict()
+        if isinstance(s, (LoopIR.Assign, LoopIR.Reduce)):
+            buf, _ = self.root(s.name)
+            _add(counts, self.expr(s.rhs))
+            _add(counts, {("stores", self.mems[buf]): Polynomial.const(1)})
+            self.access(s.name, [(self.index(i), 1) for i in s.idx])
+            nbytes = self.bytes[buf]
+            traffic = nbytes
+            if isinstance(s, LoopIR.Reduce):
+                typ = str(s.type.basetype()) if s.type else str(s.rhs.type)
+                _add(counts, {("flops", typ): Polynomial.const(1)})
+                _add(counts, {("loads", self.mems[buf]): Polynomial.const(1)})
+                traffic += nbytes
+            _add(counts, {("traffic", self.mems[buf]): Polynomial.const(traffic)})
+        elif isinstance(s, LoopIR.WriteConfig):
+            _add(counts, self.expr(s.rhs))
+        elif isinstance(s, LoopIR.If):
+            self.exact = False
+            _add(counts, self.stmts(s.body))
+            _add(counts, self.stmts(s.orelse))
+        elif isinstance(s, LoopIR.For):
+            lo, hi = self.index(s.lo), self.index(s.hi)
+            self.loops.append(s.iter)
+            self.stack.append(s.iter)
+            self.trips[s.iter] = hi - lo
+            self.los[s.iter] = lo
+            self.his[s.iter] = hi
+            if lo.is_const() and hi.is_const():
+                self.ranges[s.iter] = (int(lo), int(hi) - 1)
+            body = self.stmts(s.body)
+            self.stack.pop()
+            for k, n in body.items():
+                counts[k] = n.sum(s.iter, lo, hi)
+        elif isinstance(s, LoopIR.Alloc):
+            self.declare(s.name, s.type, (s.mem or DRAM).name())
+        elif isinstance(s, LoopIR.WindowStmt):
+            self.windows[s.name] = s.rhs.type
+            self.mems[s.name] = self.mems[s.rhs.type.src_buf]
+            self.bytes[s.name] = self.bytes[s.rhs.type.src_buf]
+        elif isinstance(s, LoopIR.Call):
+            counts = self.call(s)
+        return counts
+
+    def call(self, s):
+        counts = dict()
+        if s.f.instr is not None:
+            counts[("instrs", s.f.name)] = Polynomial.const(1)
+
+        # the semantic body of instructions and the bodies of procedures are
+        # counted with the memories of the buffers passed to them, and the
+        # sizes passed to them
+        mems, env = dict(), dict()
+        for a, e in zip(s.f.args, s.args):
+            if a.type.is_numeric():
+                buf, dims = self.arg_access(e)
+                mems[a.name] = self.mems[buf]
+                self.access_root(buf, dims)
+            elif a.type.is_indexable():
+                env[a.name] = self.index(e)
+        callee = _WorkAnalysis(s.f, mems)
+        body = callee.stmts(s.f.body)
+        self.exact = self.exact and callee.exact
+        for k, n in body.items():
+            _add(counts, {k: n.subs(env)})
+        return counts
+
+    # ----------------------------------------------------------------- #
+    # expressions
+
+    def expr(self, e):
+        counts = dict()
+        if isinstance(e, LoopIR.Read):
+            if e.type.is_numeric():
+                buf, _ = self.root(e.name)
+                self.access(e.name, [(self.index(i), 1) for i in e.idx])
+                _add(
+                    counts,
+                    {
+                        ("loads", self.mems[buf]): Polynomial.const(1),
+                        ("traffic", self.mems[buf]): Polynomial.const(self.bytes[buf]),
+                    },
+                )
+        elif isinstance(e, LoopIR.USub):
+            _add(counts, self.expr(e.arg))
+        elif isinstance(e, LoopIR.BinOp):
+            _add(counts, self.expr(e.lhs))
+            _add(counts, self.expr(e.rhs))
+            if e.op in ("+", "-", "*", "/") and e.type.is_numeric():
+                _add(counts, {("flops", str(e.type)): Polynomial.const(1)})
+        elif isinstance(e, LoopIR.Extern):
+            for a in e.args:
+                _add(counts, self.expr(a))
+            _add(counts, {("flops", str(e.type)): Polynomial.const(1)})
+        return counts
+
+    def index(self, e) -> Polynomial:
+        """The polynomial of the index expression `e`"""
+        if (form := affine_form(e)) is not None:
+            return _affine_poly(form)
+        elif isinstance(e, LoopIR.USub):
+            return -self.index(e.arg)
+        elif isinstance(e, LoopIR.BinOp) and e.op in ("+", "-", "*"):
+            # products of variables, like `N * i` in flattened indices
+            lhs, rhs = self.index(e.lhs), self.index(e.rhs)
+            return {"+": lhs + rhs, "-": lhs - rhs, "*": lhs * rhs}[e.op]
+        elif isinstance(e, LoopIR.BinOp) and e.op in ("/", "%") and _in_range_ir(e):
+            # quotients and remainders which are constant in the loops
+            lo, hi = constant_bound(e, self.ranges)
+            if lo is not None and lo == hi:
+                return Polynomial.const(lo)
+        if self.iterators(e):
+            # the sums over loops treat it as constant
+            self.exact = False
+        return Polynomial.var(_Opaque(e))
+
+    def iterators(self, e):
+        if isinstance(e, LoopIR.Read):
+            return e.name in self.trips or any(self.iterators(i) for i in e.idx)
+        elif isinstance(e, LoopIR.USub):
+            return self.iterators(e.arg)
+        elif isinstance(e, LoopIR.BinOp):
+            return self.iterators(e.lhs) or self.iterators(e.rhs)
+        return False
+
+    # ----------------------------------------------------------------- #
+    # accesses and footprints
+
+    def root(self, name):
+        """The buffer of `name`, and the window which `name` is, if any"""
+        if name in self.windows:
+            return self.windows[name].src_buf, self.windows[name]
+        return name, None
+
+    def arg_access(self, e):
+        # the buffer passed as an argument of a call, and the extent of the
+        # passed part of it in each dimension
+        if isinstance(e, LoopIR.WindowExpr):
+            typ = e.type
+            dims = []
+            for w in typ.idx:
+                if isinstance(w, LoopIR.Interval):
+                    lo = self.index(w.lo)
+                    dims.append((lo, self.index(w.hi) - lo))
+                else:
+                    dims.append((self.index(w.pt), 1))
+            return typ.src_buf, dims
+        buf, win = self.root(e.name)
+        if win is not None:
+            return self.arg_access(LoopIR.WindowExpr(e.name, win.idx, win, e.srcinfo))
+        if not e.type.is_tensor_or_window():
+            return buf, [(self.index(i), 1) for i in e.idx]
+        return buf, [(Polynomial.const(0), self.index(n)) for n in e.type.shape()]
+
+    def access(self, name, dims):
+        buf, win = self.root(name)
+        if win is not None:
+            # the dimensions of the window are its intervals
+            points = iter(dims)
+            root_dims = []
+            for w in win.idx:
+                if isinstance(w, LoopIR.Interval):
+                    i, width = next(points)
+                    root_dims.append((self.index(w.lo) + i, width))
+                else:
+                    root_dims.append((self.index(w.pt), 1))
+            dims = root_dims
+        self.access_root(buf, dims)
+
+    def access_root(self, buf, dims):
+        self.accesses.append((buf, dims, list(self.stack)))
+
+    def footprint(self, loop):
+        """
+        The distinct elements of each buffer accessed by `loop`, or by the
+        whole procedure if `loop` is None
+        """
+        footprint = dict()
+        for buf, regions in self.regions(self.select(loop)).items():
+            n = sum((r.elements() for r in regions), Polynomial())
+            if len(regions) > 1:
+                boxes = [r.box for r in regions]
+                if all(box is not None and _is_const(box) for box in boxes):
+                    hull = 1
+                    for d in range(len(boxes[0])):
+                        lo = min(box[d][0].const_value() for box in boxes)
+                        hi = max(box[d][1].const_value() for box in boxes)
+                        hull *= hi - lo
+                    largest = max(_volume(box) for box in boxes)
+                    if hull != largest:
+                        self.exact = False
+                    n = Polynomial.const(min(hull, n.const_value()))
+                else:
+                    self.exact = False
+            footprint[str(buf)] = n
+        return footprint
+
+    def select(self, loop, inner=False):
+        """
+        The accesses in `loop`, or in the whole procedure if `loop` is None,
+        with the iterators which vary in all the iterations of `loop`, or in
+        one of them if `inner` is set
+        """
+        accesses = []
+        for buf, dims, stack in self.accesses:
+            if loop is None:
+                accesses.append((buf, dims, stack))
+            elif loop in stack:
+                k = stack.index(loop) + (1 if inner else 0)
+                accesses.append((buf, dims, stack[k:]))
+        return accesses
+
+    def regions(self, accesses):
+        """
+        The `_Region`s of each buffer accessed by `accesses`, which are
+        triples of a buffer, its index polynomials and their widths, and the
+        iterators which vary
+        """
+        groups = dict()
+        for buf, dims, iters in accesses:
+            # accesses which only differ by constant offsets are merged
+            shape, offsets = [], []
+            for i, width in dims:
+                moving, offset = _split(i, iters)
+                shape.append((moving, _poly(width)))
+                offsets.append(offset)
+            key = (str(buf), tuple((str(m), str(w)) for m, w in shape))
+            if key not in groups:
+                groups[key] = (buf, shape, iters, [])
+            groups[key][3].append(offsets)
+
+        regions = dict()
+        for buf, shape, iters, all_offsets in groups.values():
+            all_offsets = list({str(o): o for o in all_offsets}.values())
+            spans = []
+            for d in range(len(shape)):
+                ds = [offsets[d] for offsets in all_offsets]
+                diffs = [o - ds[0] for o in ds]
+                if all(x.is_const() for x in diffs):
+                    values = [x.const_value() for x in diffs]
+                    spans.append(max(values) - min(values))
+                else:
+                    spans = None
+                    break
+            if spans is None:
+                # offsets which differ by sizes or outer iterators
+                self.exact = False
+                spans = [0] * len(shape)
+                copies = len(all_offsets)
+            else:
+                copies = 1
+            dims = []
+            for (moving, width), span in zip(shape, spans):
+                count, extent = self.extent(moving, width, iters)
+                dims.append((count + span, extent + span))
+            box = self.box(shape, all_offsets, iters)
+            bounds = self.box(shape, all_offsets, iters, independent=False)
+            starts = bounds and [lo for lo, _ in bounds]
+            regions.setdefault(buf, []).append(_Region(dims, copies, box, starts))
+
+        # accesses with different patterns, like a loop over a row and a
+        # window of it, may access the same elements
+        return {
+            buf: list({str(r.box): r for r in rs}.values())
+            for buf, rs in regions.items()
+        }
+
+    def box(self, shape, all_offsets, iters, independent=True):
+        # the bounds of the accessed elements in every dimension, or None if
+        # the offsets are not constant apart or (if `independent` is set)
+        # the iterators do not sweep ranges which are independent of each
+        # other
+        box = []
+        for d, (moving, width) in enumerate(shape):
+            offsets = [offsets[d] for offsets in all_offsets]
+            diffs = [o - offsets[0] for o in offsets]
+            if not all(x.is_const() for x in diffs):
+                return None
+            diffs = [x.const_value() for x in diffs]
+            lo = offsets[0] + min(diffs)
+            hi = offsets[0] + max(diffs) + width
+            for m, c in moving.terms.items():
+                if len(m) != 1:
+                    return None
+                ((x, k),) = m
+                first, last = self.los[x], self.his[x] - 1
+                if k != 1:
+                    return None
+                if independent and (first.variables() | last.variables()) & set(iters):
+                    return None
+                first, last = (first, last) if c > 0 else (last, first)
+                lo, hi = lo + c * first, hi + c * last
+            box.append((lo, hi))
+        return box
+
+    def extent(self, moving, width, iters):
+        # the number of distinct values of `moving` + [0, width) as the
+        # iterators run over their loops, and the distance from the first to
+        # the last of them, plus one
+        terms = moving.variables() & set(iters)
+        if not terms:
+            return width, width
+        linear = all(
+            all(k == 1 for x, k in m if x in terms)
+            and sum(x in terms for x, _ in m) == 1
+            for m in moving.terms
+        )
+        if not linear:
+            # bounded by the number of iterations
+            self.exact = False
+            n = width
+            for x in terms:
+                n = n * self.trip(x, iters)
+            return n, n
+        if len(terms) == 1:
+            (x,) = terms
+            c = moving.coeffs(x)[1]
+            if (
+                c.is_const()
+                and width.is_const()
+                and abs(c.const_value()) >= width.const_value()
+            ):
+                # strided, like 2 * i
+                n = self.trip(x, iters)
+                return n * width, abs(c.const_value()) * (n - 1) + width
+        # the bounding box, which is exact for dense tilings like 8 * io + ii
+        n = _poly(width)
+        for x in terms:
+            c = moving.coeffs(x)[1]
+            if c.is_const() and c.const_value() < 0:
+                c = -c
+            n = n + c * (self.trip(x, iters) - 1)
+        return n, n
+
+    def trip(self, x, iters):
+        # the iterations of the loop over `x`, bounded by their number in the
+        # last iteration of the loops in `iters` that it depends on, like
+        # in triangular loop nests
+        n = self.trips[x]
+        while outer := n.variables() & set(iters):
+            self.exact = False
+            n = n.subs({y: self.his[y] - 1 for y in outer})
+        return n
+
+
+class _Region:
+    """
+    The elements of a buffer accessed by a group of accesses, as the number
+    of distinct indices in each dimension, and the distance from the first
+    to the last of them, plus one.  These are equal in dimensions where the
+    accessed indices are contiguous.  Accesses whose offsets differ by sizes
+    or by outer iterators are counted as `copies` of the same region.
+    `box` bounds the region, if the bounds are independent of the iterators,
+    and `starts` are its lowest indices, if they are known.
+    """
+
+    def __init__(self, dims, copies, box, starts):
+        self.dims = dims
+        self.copies = copies
+        self.box = box
+        self.starts = starts
+
+    def elements(self):
+        n = Polynomial.const(self.copies)
+        for count, _ in self.dims:
+            n = n * count
+        return n
+
+
+def _is_const(box):
+    return all(lo.is_const() and hi.is_const() for lo, hi in box)
+
+
+def _volume(box):
+    n = 1
+    for lo, hi in box:
+        n *= hi.const_value() - lo.const_value()
+    return n
+
+
+def _split(i, iters):
+    # the terms of `i` which depend on the iterators, and the others
+    moving, offset = dict(), dict()
+    for m, c in i.terms.items():
+        (moving if any(x in iters for x, _ in m) else offset)[m] = c
+    return Polynomial(moving), Polynomial(offset)
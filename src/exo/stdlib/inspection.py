@@ -475,6 +475,10 @@ def are_exprs_equal(proc, expr1, expr2):
     expr1 = proc.forward(expr1)
     expr2 = proc.forward(expr2)
 
+    # constant-time fast path on the (cached) structural keys
+    if expr1.is_structurally_equal(expr2):
+        return True
+
     def check(expr1, expr2):
         if type(expr1) != type(expr2):
             return False
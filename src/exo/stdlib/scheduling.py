@@ -343,3 +343,69 @@ def lift_if(proc, cursor, n_lifts=1):
                 proc=proc,
             ) from e
     return proc
+
+
+def multiversion(proc, conditions):
+    """
+    Specialize the whole body of `proc` for each of the `conditions`, and
+    turn `proc` into a dispatcher which tests them in order and calls the
+    first version whose condition holds, or a generic version.
+
+    The versions are made with `specialize`, `simplify` and
+    `eliminate_dead_code` on the loops which their condition makes empty, so
+    they are equivalent to `proc`, and are extracted as subprocedures which
+    assert their condition, and the negations of the conditions of the
+    versions before them.  Facts such as `stride(x, 0) == 1` are then used by
+    the C code generated for them.
+
+    args:
+        conditions  - list of strings or string to be parsed into the
+                      conditions of the versions
+
+    returns:
+        a tuple (proc, versions), where versions are the subprocedures
+        `{name}_v0`, `{name}_v1`, ..., followed by `{name}_generic`.
+
+    rewrite:
+        multiversion(foo, ["stride(x, 0) == 1"])
+        ```
+        def foo(n: size, x: [f32][n]):
+            B
+        ```
+        -->
+        ```
+        def foo(n: size, x: [f32][n]):
+            if stride(x, 0) == 1:
+                foo_v0(n, x)
+            else:
+                foo_generic(n, x)
+        ```
+    """
+    if isinstance(conditions, str):
+        conditions = [conditions]
+    name = proc.name()
+
+    proc = simplify(specialize(proc, proc.body(), conditions))
+    # remove the loops which the conditions make empty, such as the tail loop
+    # of a version for sizes which are multiples of the tile size
+    for loop in proc.find("for _ in _: _", many=True):
+        try:
+            proc = eliminate_dead_code(proc, loop)
+        except (SchedulingError, InvalidCursorError):
+            pass
+
+    versions = []
+    block = proc.body()
+    for i in range(len(conditions)):
+        if len(block) != 1 or not isinstance(block[0], IfCursor):
+            raise SchedulingError(
+                f"multiversion: condition {conditions[i]} simplified to a constant"
+            )
+        orelse = block[0].orelse()
+        proc, version = extract_subproc(proc, block[0].body(), f"{name}_v{i}")
+        versions.append(version)
+        block = proc.forward(orelse)
+
+    proc, version = extract_subproc(proc, block, f"{name}_generic")
+    versions.append(version)
+    return proc, versions
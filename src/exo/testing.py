@@ -0,0 +1,371 @@
+"""
+Differential testing of scheduled procedures against the procedures they
+were scheduled from.
+
+Scheduling operations are checked for equivalence, but unsafe ones
+(`unsafe_assert_eq`, `add_unsafe_guard`, instructions whose C code does
+not match their semantics, ...) can still change what a procedure
+computes.  `diff_test(orig, scheduled)` compiles both procedures with
+`Procedure.jit()`, runs them on the same random inputs and compares what
+they write.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import ctypes
+import faulthandler
+import multiprocessing
+import os
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from .API import Procedure
+from .core.LoopIR import T, eval_expr
+from .backend.call_args import dtypes
+
+# the values of sizes, indices and strides which are not given to diff_test()
+DEFAULT_SIZES = range(1, 33)
+
+# integer inputs are small, so that kernels of moderate size do not overflow
+_INT_RANGES = {
+    T.i8: (-8, 8),
+    T.ui8: (0, 16),
+    T.ui16: (0, 256),
+    T.i32: (-100, 100),
+}
+
+# the number of times sizes are sampled in a trial, before giving up on
+# satisfying the assertions of the procedure
+_MAX_ATTEMPTS = 1000
+
+
+@dataclass
+class DiffTestFailure:
+    """The first trial in which the procedures differed"""
+
+    trial: int
+    inputs: dict  # the arguments by name, before the call
+    message: str
+
+    def __str__(self):
+        return f"trial {self.trial}: {self.message}"
+
+
+@dataclass
+class DiffTestResult:
+    """
+    The largest differences between what the procedures wrote in all the
+    trials which were run, and the first failing trial, if any.  A result is
+    true when no trial failed.
+    """
+
+    trials: int
+    max_abs_error: float
+    max_rel_error: float
+    failure: Optional[DiffTestFailure] = None
+
+    def __bool__(self):
+        return self.failure is None
+
+    def __str__(self):
+        s = (
+            f"{self.trials} trials, max abs error {self.max_abs_error:.3g}, "
+            f"max rel error {self.max_rel_error:.3g}"
+        )
+        return s if self.failure is None else f"{s}; failed in {self.failure}"
+
+
+def diff_test(
+    orig,
+    scheduled,
+    sizes=None,
+    trials=100,
+    *,
+    rtol=1e-5,
+    atol=1e-6,
+    seed=0,
+    processes=None,
+    cc=None,
+    cflags=None,
+) -> DiffTestResult:
+    """
+    Run `orig` and `scheduled`, which take the same arguments, on `trials`
+    random inputs, and compare the buffers and configurations they write.
+
+    `sizes` maps the names of size, index and stride arguments to an int, or
+    to a sequence of values to sample from (`DEFAULT_SIZES` by default).  The
+    values are sampled again until they satisfy the assertions of `orig`.
+    Buffers and scalars are filled with values in [-1, 1), or with small
+    integers, and configurations are set to the same random values in both
+    procedures.  Floating point values differ when they are not within
+    `atol + rtol * abs(expected)` of each other, and integers when they are
+    not equal.
+
+    Both procedures are compiled once (see `Procedure.jit()`, to which `cc`
+    and `cflags` are passed), and the trials are run by `processes` worker
+    processes (all the CPUs by default), so that a procedure which crashes
+    fails its trial instead of the caller.  Workers are forked, and on
+    platforms which cannot fork, or with `processes=1`, trials are run in
+    the calling process.  Trial `t` is generated from `seed` and `t` alone,
+    so failures can be reproduced.
+    """
+    for p in (orig, scheduled):
+        if not isinstance(p, Procedure):
+            raise TypeError("diff_test() expects Procedures")
+    p = orig._loopir_proc
+    if _signature(p) != _signature(scheduled._loopir_proc):
+        raise ValueError(
+            f"{p.name}() and {scheduled.name()}() do not take the same arguments"
+        )
+
+    controls = {str(a.name) for a in p.args if not a.type.is_numeric()}
+    sizes = dict(sizes or {})
+    for nm, val in sizes.items():
+        if nm not in controls:
+            raise ValueError(f"{p.name}() has no size, index or stride argument {nm}")
+        if isinstance(val, int):
+            sizes[nm] = [val]
+
+    fns = (orig.jit(cc=cc, cflags=cflags), scheduled.jit(cc=cc, cflags=cflags))
+    task = _Task(fns, sizes, seed, rtol, atol)
+    # raises here, rather than in every trial, if the assertions cannot be
+    # satisfied
+    task.inputs(0)
+
+    outcomes = _run(task, trials, processes)
+    failure = None
+    if failed := [t for t, (_, _, msg) in outcomes.items() if msg is not None]:
+        t = min(failed)
+        failure = DiffTestFailure(t, task.inputs(t)[0], outcomes[t][2])
+    return DiffTestResult(
+        trials=len(outcomes),
+        max_abs_error=max((a for a, _, _ in outcomes.values()), default=0.0),
+        max_rel_error=max((r for _, r, _ in outcomes.values()), default=0.0),
+        failure=failure,
+    )
+
+
+def _signature(p):
+    return [(str(a.name), str(a.type)) for a in p.args]
+
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Trials
+
+
+class _Task:
+    def __init__(self, fns, sizes, seed, rtol, atol):
+        self.fns = fns
+        self.proc = fns[0]._proc
+        self.sizes = sizes
+        self.seed = seed
+        self.rtol = rtol
+        self.atol = atol
+
+    def inputs(self, trial):
+        """The arguments by name, and the values of configurations"""
+        p = self.proc
+        rng = np.random.default_rng([self.seed, trial])
+        for _ in range(_MAX_ATTEMPTS):
+            env = dict()
+            for a in p.args:
+                if a.type == T.bool:
+                    env[a.name] = bool(rng.integers(2))
+                elif not a.type.is_numeric():
+                    values = self.sizes.get(str(a.name), DEFAULT_SIZES)
+                    env[a.name] = int(values[rng.integers(len(values))])
+            shapes = {
+                a.name: tuple(eval_expr(e, env) for e in a.type.shape())
+                for a in p.args
+                if a.type.is_numeric()
+            }
+            if any(n < 0 for shape in shapes.values() for n in shape):
+                continue
+            for nm, shape in shapes.items():
+                strides = np.cumprod((shape + (1,))[:0:-1])[::-1]
+                for dim, s in enumerate(strides):
+                    env[(nm, dim)] = int(s)
+            if all(_holds(pred, env) for pred in p.preds):
+                break
+        else:
+            raise ValueError(
+                f"could not sample arguments of {p.name}() which satisfy its "
+                f"assertions {', '.join(map(str, p.preds))}"
+            )
+
+        args = dict()
+        for a in p.args:
+            if not a.type.is_numeric():
+                args[str(a.name)] = env[a.name]
+                continue
+            # scalars are arrays of one element, so that they can be written
+            shape = shapes[a.name] or (1,)
+            args[str(a.name)] = _random(rng, a.type.basetype(), shape)
+
+        configs = dict()
+        for fn in self.fns:
+            fields = _config_fields(fn.ctxt) if fn.ctxt is not None else []
+            for c, field, typ in fields:
+                if (c, field) in configs:
+                    continue
+                if typ in (ctypes.c_float, ctypes.c_double):
+                    val = float(rng.uniform(-1, 1))
+                elif typ is ctypes.c_bool:
+                    val = bool(rng.integers(2))
+                else:
+                    val = int(DEFAULT_SIZES[rng.integers(len(DEFAULT_SIZES))])
+                configs[(c, field)] = val
+        return args, configs
+
+    def run(self, trial):
+        """
+        The largest absolute and relative differences between what the
+        procedures wrote, and a message if they differed
+        """
+        args, configs = self.inputs(trial)
+        outputs = []
+        for fn in self.fns:
+            fn_args = {
+                nm: val.copy() if isinstance(val, np.ndarray) else val
+                for nm, val in args.items()
+            }
+            fields = list(_config_fields(fn.ctxt)) if fn.ctxt is not None else []
+            for c, field, _ in fields:
+                if (c, field) in configs:
+                    setattr(getattr(fn.ctxt, c), field, configs[(c, field)])
+            try:
+                fn(**fn_args)
+            except Exception as e:
+                which = "original" if fn is self.fns[0] else "scheduled"
+                return 0.0, 0.0, f"the {which} procedure raised {e!r}"
+            for c, field, _ in fields:
+                val = getattr(getattr(fn.ctxt, c), field)
+                fn_args[f"{c}.{field}"] = np.array([val])
+            outputs.append(fn_args)
+
+        max_abs = max_rel = 0.0
+        message = None
+        for nm, expected in outputs[0].items():
+            actual = outputs[1].get(nm)
+            if not isinstance(expected, np.ndarray) or actual is None:
+                continue
+            if expected.dtype.kind == "f":
+                expected64 = expected.astype(np.float64)
+                diff = np.abs(actual.astype(np.float64) - expected64)
+                # NaNs are equal to each other, and infinitely far from
+                # numbers
+                both_nan = np.isnan(expected) & np.isnan(actual)
+                diff = np.where(both_nan, 0.0, np.nan_to_num(diff, nan=np.inf))
+                rel = np.divide(
+                    diff,
+                    np.abs(expected64),
+                    out=np.zeros_like(diff),
+                    where=expected64 != 0,
+                )
+                if diff.size:
+                    max_abs = max(max_abs, float(diff.max()))
+                    max_rel = max(max_rel, float(rel.max()))
+                bad = ~np.isclose(
+                    actual, expected, rtol=self.rtol, atol=self.atol, equal_nan=True
+                )
+            else:
+                bad = actual != expected
+                if bad.any():
+                    diff = np.abs(actual.astype(np.float64) - expected)
+                    max_abs = max(max_abs, float(diff.max()))
+            if message is None and bad.any():
+                idx = tuple(int(i) for i in np.argwhere(bad)[0])
+                where = f"{nm}{list(idx)}" if _is_tensor(self.proc, nm) else nm
+                message = (
+                    f"the scheduled procedure wrote {actual[idx]} to {where}, "
+                    f"where the original wrote {expected[idx]}"
+                )
+        return max_abs, max_rel, message
+
+
+def _holds(pred, env):
+    try:
+        return eval_expr(pred, env)
+    except KeyError:
+        # depends on configurations, or on the contents of buffers
+        return True
+
+
+def _is_tensor(p, nm):
+    return any(str(a.name) == nm and a.type.is_tensor_or_window() for a in p.args)
+
+
+def _random(rng, basetype, shape):
+    dtype = dtypes[basetype]
+    if basetype in _INT_RANGES:
+        lo, hi = _INT_RANGES[basetype]
+        return rng.integers(lo, hi, shape).astype(dtype)
+    return rng.uniform(-1, 1, shape).astype(dtype)
+
+
+def _config_fields(ctxt):
+    for c, struct in ctxt._fields_:
+        if c != "_memories":
+            for field, typ in struct._fields_:
+                yield c, field, typ
+
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Worker processes
+
+# the task of a worker process, which it inherits from the process that
+# forked it, along with the loaded libraries
+_task = None
+
+
+def _init_worker(task):
+    global _task
+    _task = task
+    # crashes are reported as failing trials, without a traceback
+    faulthandler.disable()
+
+
+def _run_trials(trials):
+    return [(t, _task.run(t)) for t in trials]
+
+
+def _run(task, trials, processes):
+    processes = min(processes or os.cpu_count() or 1, trials)
+    if processes <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        return {t: task.run(t) for t in range(trials)}
+
+    outcomes = dict()
+    chunk = max(1, trials // (4 * processes))
+    chunks = [range(t, min(t + chunk, trials)) for t in range(0, trials, chunk)]
+    try:
+        with _pool(task, processes) as pool:
+            futures = [pool.submit(_run_trials, c) for c in chunks]
+            for f in concurrent.futures.as_completed(futures):
+                outcomes.update(f.result())
+    except BrokenProcessPool:
+        # a procedure crashed its worker: the trials which were lost are run
+        # again in order, one at a time, up to the first one which crashes
+        with _pool(task, 1) as pool:
+            for t in sorted(set(range(trials)) - outcomes.keys()):
+                try:
+                    outcomes.update(pool.submit(_run_trials, [t]).result())
+                except BrokenProcessPool:
+                    outcomes[t] = (0.0, 0.0, "the procedures crashed")
+                    break
+    return outcomes
+
+
+def _pool(task, processes):
+    # workers are forked, since procedures cannot be pickled
+    return concurrent.futures.ProcessPoolExecutor(
+        processes,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_worker,
+        initargs=(task,),
+    )
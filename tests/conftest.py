@@ -149,6 +149,8 @@ class ProcWrapper:
             return arg.ctypes.data_as(ctypes.c_void_p)
         if isinstance(arg, int):
             return arg
+        if isinstance(arg, ctypes._Pointer):
+            return arg
 
         raise ValueError(f"unrecognized type {type(arg)}")
 
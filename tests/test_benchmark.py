@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+import re
+
+import pytest
+
+from exo import proc, bench
+from exo.stdlib.scheduling import *
+
+
+@pytest.fixture(autouse=True)
+def jit_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("EXO_CACHE_DIR", str(tmp_path))
+
+
+@proc
+def sgemm(M: size, N: size, K: size, A: f32[M, K], B: f32[K, N], C: [f32][M, N]):
+    assert stride(C, 1) == 1
+    for i in seq(0, M):
+        for j in seq(0, N):
+            for k in seq(0, K):
+                C[i, j] += A[i, k] * B[k, j]
+
+
+def test_bench_google_benchmark_json(tmp_path):
+    out = tmp_path / "sgemm.json"
+    results = bench(
+        reorder_loops(sgemm, "j k"),
+        [(16, 16, 16), {"M": 8, "N": 32, "K": 4}],
+        flops=lambda M, N, K: 2 * M * N * K,
+        repeats=3,
+        min_time=1e-5,
+        name="sgemm_exo",
+        out=out,
+    )
+    assert json.loads(out.read_text()) == results
+
+    # one iteration per size, which apps/plot.py reads, then its aggregates
+    matcher = re.compile(r"^sgemm_(?P<name>\w+)/(?P<m>\d+)/(?P<n>\d+)/(?P<k>\d+)$")
+    points = [b for b in results["benchmarks"] if matcher.match(b["name"])]
+    assert [b["name"] for b in points] == ["sgemm_exo/16/16/16", "sgemm_exo/8/32/4"]
+    for b in points:
+        assert b["run_type"] == "iteration"
+        assert b["time_unit"] == "ns" and b["real_time"] > 0
+        m, n, k = map(int, matcher.match(b["name"]).group("m", "n", "k"))
+        assert b["flops"] == pytest.approx(2 * m * n * k / (b["real_time"] * 1e-9))
+
+    aggregates = [
+        b["aggregate_name"]
+        for b in results["benchmarks"]
+        if b["run_name"] == "sgemm_exo/16/16/16" and b["run_type"] == "aggregate"
+    ]
+    assert aggregates == ["mean", "p10", "median", "p90", "stddev"]
+
+
+def test_bench_flush_cache():
+    results = bench(sgemm, [(8, 8, 8)], repeats=2, flush_cache=1 << 16)
+    (b, *_) = results["benchmarks"]
+    assert b["name"] == "sgemm/8/8/8"
+    # every sample is one call
+    assert b["iterations"] == 2
+    assert "flops" not in b
+
+
+def test_bench_errors():
+    with pytest.raises(ValueError, match="takes 3 sizes, but 2 were given"):
+        bench(sgemm, [(8, 8)])
+    with pytest.raises(
+        ValueError, match="has no size, index, stride or bool argument L"
+    ):
+        bench(sgemm, [{"M": 8, "N": 8, "K": 8, "L": 8}])
+
+    @proc
+    def scale(n: size, x: f32[n]):
+        assert n % 4 == 0
+        for i in seq(0, n):
+            x[i] = 2.0 * x[i]
+
+    with pytest.raises(ValueError, match="violate the assertion n % 4 == 0"):
+        bench(scale, [6])
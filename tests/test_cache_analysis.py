@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import pytest
+
+from exo import proc
+from exo.platforms.x86 import *
+from exo.rewrite.cache_analysis import Cache
+from exo.stdlib.scheduling import *
+
+# small fully associative caches, which the model describes best
+CACHES = (Cache("L1", 4096, 64, 64), Cache("L2", 32768, 64, 512))
+
+
+@proc
+def sgemm(M: size, N: size, K: size, A: f32[M, K], B: f32[K, N], C: f32[M, N]):
+    assert M % 16 == 0
+    assert N % 16 == 0
+    assert K % 16 == 0
+    for i in seq(0, M):
+        for j in seq(0, N):
+            for k in seq(0, K):
+                C[i, j] += A[i, k] * B[k, j]
+
+
+def tiled(p, tile):
+    for loop in ("i", "j", "k"):
+        p = divide_loop(p, loop, tile, [f"{loop}o", f"{loop}i"], perfect=True)
+    p = reorder_loops(p, "ii jo")
+    p = reorder_loops(p, "ji ko")
+    p = reorder_loops(p, "ii ko")
+    p = reorder_loops(p, "ji ki")
+    return p
+
+
+def test_sgemm_matches_simulation():
+    stats = sgemm.cache_stats(CACHES, simulate=True, M=32, N=32, K=32)
+    assert stats.accesses == {"A": 32**3, "B": 32**3, "C": 32**3}
+    assert stats.misses == stats.simulated_misses
+    # the columns of B do not fit in L1
+    assert stats.misses["L1"] == {"A": 64, "B": 32**3 // 16, "C": 64}
+    assert stats.total_misses("L2") == 3 * 64
+
+    # one iteration of j reads a row of A and a column of B
+    assert stats.reuse_distances["A"] == {"j": 4 * (32 + 32 + 1)}
+    assert stats.reuse_distances["C"] == {"k": 4 * 3}
+
+
+def test_tiled_sgemm_matches_simulation():
+    p = tiled(sgemm, 16)
+    stats = p.cache_stats(CACHES, simulate=True, M=32, N=32, K=32)
+    assert stats.misses == stats.simulated_misses
+    assert stats.misses["L1"] == {"A": 128, "B": 128, "C": 64}
+
+    # tiles of 8 floats are half a cache line
+    p = tiled(sgemm, 8)
+    stats = p.cache_stats(CACHES, simulate=True, M=32, N=32, K=32)
+    for level in ("L1", "L2"):
+        for buf, n in stats.misses[level].items():
+            assert n == pytest.approx(stats.simulated_misses[level][buf], rel=0.1)
+
+
+def test_registers_are_not_cached():
+    p = divide_loop(sgemm, "j", 8, ["jo", "ji"], perfect=True)
+    p = reorder_loops(p, "ji k")
+    p = stage_mem(p, "for ji in _:_", "C[i, 8*jo:8*jo+8]", "Creg")
+    p = set_memory(p, "Creg", AVX2)
+    p = replace_all(p, [mm256_loadu_ps, mm256_storeu_ps])
+
+    stats = p.cache_stats(CACHES, simulate=True, M=16, N=16, K=16)
+    assert set(stats.misses["L1"]) == {"A", "B", "C"}
+    assert stats.accesses["C"] == 2 * 16**3
+    assert stats.misses == stats.simulated_misses
+
+
+def test_cache_stats_errors():
+    with pytest.raises(ValueError, match="needs the values of K"):
+        sgemm.cache_stats(M=16, N=16)
+    with pytest.raises(ValueError, match="has no size, index or stride argument L"):
+        sgemm.cache_stats(M=16, N=16, K=16, L=16)
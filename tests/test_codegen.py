@@ -1,13 +1,23 @@
 from __future__ import annotations
 
+import ctypes
+import os
 from pathlib import Path
 
 import numpy as np
 import pytest
 from PIL import Image
 
-from exo import proc, instr, Procedure, DRAM, compile_procs_to_strings
-from exo.libs.memories import MDRAM, MemGenError, StaticMemory, DRAM_STACK
+from exo import proc, instr, Procedure, DRAM, compile_procs, compile_procs_to_strings
+from exo.libs.memories import (
+    MDRAM,
+    MemGenError,
+    StaticMemory,
+    DRAM_STACK,
+    DRAM_ALIGNED,
+    DRAM_ARENA,
+    DRAM_HUGEPAGE,
+)
 from exo.libs.externs import *
 from exo.stdlib.scheduling import *
 
@@ -109,6 +119,33 @@ def test_const_local_window(golden, compiler):
     compiler.compile(caller)
 
 
+class ALIGNED_DRAM(DRAM):
+    @classmethod
+    def alignment(cls):
+        return 64
+
+
+def test_restrict_and_alignment_annotations(golden, compiler):
+    @proc
+    def callee(N: size, A: [f32][N], B: [f32][N]):
+        for i in seq(0, N):
+            B[i] += A[i]
+
+    @proc
+    def caller(N: size, x: f32[64] @ ALIGNED_DRAM, y: f32[64], s: f32):
+        assert N <= 16
+        w = x[0:N]
+        callee(N, w, y[16 : 16 + N])
+        for i in seq(0, N):
+            for j in seq(0, i):
+                s += x[j]
+
+    cc, hh = compile_procs_to_strings([caller], "test.h")
+    assert f"{hh}{cc}" == golden
+
+    compiler.compile(caller)
+
+
 # --- Start Blur Test ---
 
 
@@ -289,6 +326,119 @@ def test_alloc_nest(compiler, tmp_path):
     )
 
 
+def test_memory_plan(golden, compiler):
+    @proc
+    def memory_plan(n: size, x: f32[n, 16], y: f32[n]):
+        for i in seq(0, n):
+            a: f32[16]
+            b: f32[16]
+            for j in seq(0, 16):
+                a[j] = x[i, j]
+            # `a` stays live while `w` is used
+            w = a[0:8]
+            for j in seq(0, 16):
+                b[j] = w[j / 2] * 2.0
+            c: f32[32]
+            y[i] = 0.0
+            for j in seq(0, 16):
+                c[j] = b[j]
+            for j in seq(0, 16):
+                y[i] += c[j]
+        d: f32[4, 4]
+        for j in seq(0, 4):
+            d[j, j] = 1.0
+        for j in seq(0, 4):
+            y[0] += d[j, j]
+
+    cc, hh = compile_procs_to_strings([memory_plan], "test.h")
+    assert f"{hh}{cc}" == golden
+
+    x = np.arange(3 * 16, dtype=np.float32).reshape(3, 16)
+    y = np.zeros(3, dtype=np.float32)
+    fn = compiler.compile(memory_plan)
+    fn(None, 3, x, y)
+
+    expected = np.repeat(x[:, :8], 2, axis=1).sum(axis=1) * 2
+    expected[0] += 4
+    np.testing.assert_allclose(y, expected)
+
+
+def test_memory_plan_skips_variable_sizes():
+    @proc
+    def foo(n: size, x: f32[n]):
+        for i in seq(0, 4):
+            a: f32[n]
+            for j in seq(0, n):
+                a[j] = x[j]
+            for j in seq(0, n):
+                x[j] = a[j] * 2.0
+
+    cc, hh = compile_procs_to_strings([foo], "test.h")
+    assert "memory plan" not in cc and "malloc(n * sizeof(*a))" in cc
+
+
+def test_multiversion(golden):
+    @proc
+    def scal(n: size, alpha: f32, x: [f32][n]):
+        for i in seq(0, n):
+            x[i] = alpha * x[i]
+
+    scal = divide_loop(scal, "i", 16, ["io", "ii"], tail="cut")
+    scal, versions = multiversion(
+        scal, ["stride(x, 0) == 1 and n % 16 == 0", "stride(x, 0) == 1"]
+    )
+    assert [v.name() for v in versions] == ["scal_v0", "scal_v1", "scal_generic"]
+
+    cc, hh = compile_procs_to_strings([scal], "test.h")
+    assert f"{hh}{cc}" == golden
+
+
+def test_multiversion_constant_condition():
+    @proc
+    def foo(n: size, x: f32[n]):
+        for i in seq(0, n):
+            x[i] = 0.0
+
+    with pytest.raises(SchedulingError, match="simplified to a constant"):
+        multiversion(foo, ["n < 8", "2 > 1"])
+
+
+def test_window_calling_convention(golden, compiler):
+    @proc
+    def axpy(n: size, alpha: [f32][1], x: [f32][n], y: [f32][n]):
+        for i in seq(0, n):
+            y[i] += alpha[0] * x[i]
+
+    @proc
+    def gemv(n: size, A: [f32][n, 4], x: [f32][4], y: [f32][n]):
+        for j in seq(0, 4):
+            axpy(n, x[j : j + 1], A[:, j], y[:])
+
+    @proc
+    def window_calling_convention(
+        m: size, A: f32[m, 8], B: f32[16, 4], x: f32[4], y: f32[m]
+    ):
+        assert m >= 16
+        gemv(m, A[:, 0:4], x[:], y[:])
+        z = y[0:16]
+        gemv(16, B[:, :], x[:], z)
+
+    cc, hh = compile_procs_to_strings([window_calling_convention], "test.h")
+    assert f"{hh}{cc}" == golden
+
+    m = 20
+    A = np.arange(m * 8, dtype=np.float32).reshape(m, 8) % 5
+    B = np.arange(16 * 4, dtype=np.float32).reshape(16, 4) % 3
+    x = np.array([1, 2, 3, 4], dtype=np.float32)
+    y = np.zeros(m, dtype=np.float32)
+    fn = compiler.compile(window_calling_convention)
+    fn(None, m, A, B, x, y)
+
+    expected = A[:, :4] @ x
+    expected[:16] += B @ x
+    np.testing.assert_allclose(y, expected)
+
+
 # ------- Nested alloc test for custom malloc DRAM ------
 
 
@@ -330,6 +480,78 @@ def test_alloc_nest_malloc(compiler):
     )
 
 
+# ------- Aligned, arena and huge page DRAM ------
+
+
+class _ExoArena(ctypes.Structure):
+    _fields_ = [
+        ("base", ctypes.c_void_p),
+        ("size", ctypes.c_int64),
+        ("top", ctypes.c_int64),
+        ("last", ctypes.c_int64),
+    ]
+
+
+class _ArenaContext(ctypes.Structure):
+    _fields_ = [("arena", ctypes.POINTER(_ExoArena))]
+
+
+def test_dram_arena_aligned_hugepage(golden, compiler):
+    A64 = DRAM_ALIGNED(64)
+    assert DRAM_ALIGNED(64) is A64
+
+    @proc
+    def scratch_sum(n: size, x: f32[n, 16] @ A64, y: f32[n] @ A64):
+        total: f32[16] @ DRAM_HUGEPAGE
+        for j in seq(0, 16):
+            total[j] = 0.0
+        for i in seq(0, n):
+            a: f32[16] @ DRAM_ARENA
+            b: f32[16] @ DRAM_ARENA
+            for j in seq(0, 16):
+                a[j] = x[i, j]
+            # `a` is freed before `b`
+            for j in seq(0, 16):
+                b[j] = a[j] * 2.0
+            y[i] = 0.0
+            for j in seq(0, 16):
+                y[i] += b[j]
+                total[j] += b[j]
+        c: f32[16] @ A64
+        for j in seq(0, 16):
+            c[j] = total[j]
+        for j in seq(0, 16):
+            y[0] += c[j]
+
+    cc, hh = compile_procs_to_strings([scratch_sum], "test.h")
+    assert f"{hh}{cc}" == golden
+
+    root_dir = Path(__file__).parent.parent
+    lib = compiler.compile(scratch_sum, include_dir=str(root_dir / "src/exo/libs"))
+
+    x = np.arange(4 * 16, dtype=np.float32).reshape(4, 16)
+    expected = x.sum(axis=1) * 2
+    expected[0] += x.sum() * 2
+
+    # without an arena, buffers are allocated with aligned_alloc
+    y = np.zeros(4, dtype=np.float32)
+    lib(None, 4, x, y)
+    np.testing.assert_allclose(y, expected)
+
+    scratch = ctypes.create_string_buffer(4096)
+    arena = _ExoArena(ctypes.cast(scratch, ctypes.c_void_p), 4096, 0, 0)
+    ctxt = _ArenaContext(ctypes.pointer(arena))
+    y = np.zeros(4, dtype=np.float32)
+    lib(ctypes.pointer(ctxt), 4, x, y)
+    np.testing.assert_allclose(y, expected)
+    assert arena.top == 0 and arena.last == 0
+
+
+def test_dram_aligned_bad_alignment():
+    with pytest.raises(ValueError, match="power of two"):
+        DRAM_ALIGNED(48)
+
+
 def test_unary_neg(compiler):
     @proc
     def negate_array(n: size, x: R[n], res: R[n] @ DRAM):  # pragma: no cover
@@ -462,6 +684,101 @@ def test_static_memory_check(compiler):
         compiler.compile(caller)
 
 
+def test_codegen_cache(tmp_path, monkeypatch):
+    import exo.backend.LoopIR_compiler as LoopIR_compiler
+
+    monkeypatch.setenv("EXO_CACHE_DIR", str(tmp_path))
+
+    @proc
+    def callee(n: size, x: [f32][n]):
+        for i in seq(0, n):
+            x[i] = select(0.0, x[i], x[i], 0.0)
+
+    @proc
+    def caller(n: size, x: f32[n, 8]):
+        for j in seq(0, 8):
+            callee(n, x[:, j])
+
+    expected = compile_procs_to_strings([caller], "test.h")
+
+    with monkeypatch.context() as m:
+        m.setattr(LoopIR_compiler, "_compile_proc", None)
+        assert compile_procs_to_strings([caller], "test.h") == expected
+
+    # changing a callee invalidates its callers
+    compiled = []
+    compile_proc = LoopIR_compiler._compile_proc
+    monkeypatch.setattr(
+        LoopIR_compiler,
+        "_compile_proc",
+        lambda p, *args: compiled.append(p.name) or compile_proc(p, *args),
+    )
+    callee = divide_loop(callee, "i", 4, ("io", "ii"), tail="cut")
+    caller = call_eqv(caller, "callee(_)", callee)
+    compile_procs_to_strings([caller], "test.h")
+    assert sorted(compiled) == ["callee", "caller"]
+
+
+def test_codegen_cache_keys_depend_on_exo_sources(tmp_path, monkeypatch):
+    import exo.backend.LoopIR_compiler as LoopIR_compiler
+    from exo.frontend import proc_cache
+
+    monkeypatch.setenv("EXO_CACHE_DIR", str(tmp_path))
+
+    @proc
+    def foo(x: f32[8]):
+        for i in seq(0, 8):
+            x[i] = 0.0
+
+    compile_procs_to_strings([foo], "test.h")
+    assert len(list((tmp_path / "c").rglob("*.pickle"))) == 1
+
+    # editing the backend, without changing the version, regenerates the code
+    src = Path(LoopIR_compiler.__file__)
+    st = src.stat()
+    try:
+        os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+        proc_cache._exo_fingerprint.cache_clear()
+        compile_procs_to_strings([foo], "test.h")
+    finally:
+        os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns))
+        proc_cache._exo_fingerprint.cache_clear()
+    assert len(list((tmp_path / "c").rglob("*.pickle"))) == 2
+
+
+def test_codegen_cache_key_aligned_dram():
+    from exo.backend.codegen_cache import codegen_cache_key
+
+    def make_proc(mem):
+        @proc
+        def foo(x: f32[8] @ mem):
+            for i in seq(0, 8):
+                x[i] = 0.0
+
+        return foo
+
+    keys = [
+        codegen_cache_key(make_proc(mem)._loopir_proc, "void", True)
+        for mem in (DRAM_ALIGNED(32), DRAM_ALIGNED(64))
+    ]
+    assert None not in keys and keys[0] != keys[1]
+
+
+def test_compile_procs_keeps_unchanged_files(tmp_path):
+    @proc
+    def foo(x: f32[8]):
+        for i in seq(0, 8):
+            x[i] = 0.0
+
+    compile_procs([foo], tmp_path, "foo.c", "foo.h")
+    mtime = (tmp_path / "foo.c").stat().st_mtime_ns
+    (tmp_path / "foo.h").write_text("")
+
+    compile_procs([foo], tmp_path, "foo.c", "foo.h")
+    assert (tmp_path / "foo.c").stat().st_mtime_ns == mtime
+    assert "void foo(" in (tmp_path / "foo.h").read_text()
+
+
 # Tests for NO exo_floor_div
 
 
@@ -702,6 +1019,43 @@ def test_memcpy_instr(compiler, golden):
     np.testing.assert_almost_equal(src, expected)
 
 
+def test_instr_is_parsed_lazily():
+    N = 8
+
+    @instr("memset({dst}, 0, {n} * sizeof(float));", "#include <string.h>")
+    def zero(n: size, dst: f32[n]):
+        assert n == N
+        for i in seq(0, n):
+            dst[i] = 0.0
+
+    # the definition is not parsed until the instruction is used, but it is
+    # resolved in the scope it was defined in
+    assert "_loopir_proc" not in vars(zero)
+    N = 16
+
+    @proc
+    def bar(dst: f32[8]):
+        for i in seq(0, 8):
+            dst[i] = 0.0
+
+    bar = replace(bar, bar.body()[0], zero)
+    assert "_loopir_proc" in vars(zero)
+    assert "memset" in compile_procs_to_strings([bar], "bar.h")[0]
+    assert "assert n == 8" in str(zero)
+
+
+def test_lazy_instr_errors_are_raised_on_every_use():
+    @instr("{dst_data} = {src_data};")
+    def bad_copy(dst: [f32][4], src: [f32][4]):
+        for i in seq(0, 5):
+            dst[i] = src[i]
+
+    # the checks of the definition fail the same way however often it is used
+    for _ in range(2):
+        with pytest.raises(TypeError, match="Errors occurred during effect checking"):
+            bad_copy.name()
+
+
 def test_window_of_window_codegen(compiler):
     @proc
     def bar(n: size, dst: f32[n, n, n]):
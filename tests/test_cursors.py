@@ -717,6 +717,18 @@ def test_is_ancestor_of_and_lca():
     assert get_lca(foo, x_alloc, i_loop) == i_loop
 
 
+def test_is_structurally_equal():
+    @proc
+    def foo(n: size, x: f32[n + 1], y: f32[n + 1]):
+        x[n - 1] = y[n - 1]
+        x[n] = y[n - 1]
+
+    s1, s2 = foo.body()
+    assert s1.rhs().is_structurally_equal(s2.rhs())
+    assert s1.idx()[0].is_structurally_equal(s1.rhs().idx()[0])
+    assert not s1.idx()[0].is_structurally_equal(s2.idx()[0])
+
+
 def test_cursor_find_loop():
     @proc
     def foo(n: size, x: i8[n]):
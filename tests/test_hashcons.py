@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from exo import proc
+from exo.core.LoopIR import (
+    LoopIR,
+    T,
+    SubstArgs,
+    struct_key,
+    struct_eq,
+    hashcons_stmts,
+)
+from exo.core.prelude import Sym, null_srcinfo
+from exo.stdlib.scheduling import *
+
+
+def _idx(sym, c):
+    read = LoopIR.Read(sym, [], T.index, null_srcinfo())
+    const = LoopIR.Const(c, T.int, null_srcinfo())
+    return LoopIR.BinOp("+", read, const, T.index, null_srcinfo())
+
+
+def test_struct_key_interned():
+    i = Sym("i")
+    e1, e2 = _idx(i, 1), _idx(i, 1)
+    assert e1 is not e2
+    assert struct_key(e1) is struct_key(e2)
+    assert hash(struct_key(e1)) == hash(struct_key(e2))
+    assert struct_eq(e1, e2)
+
+
+def test_struct_key_distinguishes():
+    i, j = Sym("i"), Sym("i")
+    assert not struct_eq(_idx(i, 1), _idx(i, 2))
+    # same name, different symbols
+    assert not struct_eq(_idx(i, 1), _idx(j, 1))
+    # 1 and True compare equal in python, but not as LoopIR constants
+    assert not struct_eq(
+        LoopIR.Const(1, T.int, null_srcinfo()),
+        LoopIR.Const(True, T.bool, null_srcinfo()),
+    )
+
+
+def test_hashcons_stmts_shares_exprs():
+    @proc
+    def foo(N: size, A: f32[N, 4]):
+        for i in seq(0, N):
+            for j in seq(0, 4):
+                A[i, j] = 0.0
+
+    loop = foo.INTERNAL_proc().body[0]
+    body = loop.body
+    i = LoopIR.Read(loop.iter, [], T.index, null_srcinfo())
+    copy = SubstArgs(body, {loop.iter: i}).result()
+    assert copy[0].body[0].idx[0] is not body[0].body[0].idx[0]
+
+    shared = hashcons_stmts(body + copy)
+    assert shared[0] is not shared[1]
+    assert shared[0].body[0].idx[0] is shared[1].body[0].idx[0]
+
+
+def test_unroll_shares_subexprs():
+    @proc
+    def foo(N: size, A: f32[N, 4]):
+        for i in seq(0, N):
+            for j in seq(0, 4):
+                A[i, j] = 0.0
+
+    foo = unroll_loop(foo, "j")
+    assigns = foo.INTERNAL_proc().body[0].body
+    assert len(assigns) == 4
+    assert all(a.idx[0] is assigns[0].idx[0] for a in assigns)
+    assert not foo.has_dup()
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from exo import proc, config, interpret
+from exo.libs.externs import relu, select, sin, sqrt
+from exo.stdlib.scheduling import *
+
+
+@proc
+def matmul(M: size, N: size, K: size, A: f32[M, K], B: [f32][K, N], C: [f32][M, N]):
+    for i in seq(0, M):
+        for j in seq(0, N):
+            for k in seq(0, K):
+                C[i, j] += A[i, k] * B[k, j]
+
+
+def test_interpret_windows():
+    A = np.arange(5 * 7, dtype=np.float32).reshape(5, 7) % 3
+    B = (np.arange(9 * 7, dtype=np.float32).reshape(9, 7) % 4).T
+    C = np.zeros((10, 9), dtype=np.float32)[::2]
+
+    interpret(matmul, A=A, B=B, C=C)
+    np.testing.assert_allclose(C, A @ B)
+
+    interpret(reorder_loops(matmul, "j k"), 5, 9, 7, A, B, C)
+    np.testing.assert_allclose(C, 2 * A @ B)
+
+
+def test_interpret_reductions_in_order():
+    @proc
+    def dot(n: size, x: f32[n], y: f32[n], out: f32):
+        for i in seq(0, n):
+            out += x[i] * y[i]
+
+    rng = np.random.default_rng(0)
+    x = rng.random(1000, dtype=np.float32)
+    y = rng.random(1000, dtype=np.float32)
+    out = np.zeros(1, dtype=np.float32)
+    interpret(dot, x, y, out)
+
+    expected = np.float32(0)
+    for a, b in zip(x, y):
+        expected += a * b
+    assert out[0] == expected
+
+
+def test_interpret_matches_c(tmp_path, monkeypatch):
+    # the libraries which jit() builds are cached in the test's directory
+    monkeypatch.setenv("EXO_CACHE_DIR", str(tmp_path))
+
+    @proc
+    def activations(n: size, x: f32[n], y: f32[n], total: f32):
+        for i in seq(0, n):
+            y[i] = relu(x[i]) + select(x[i], 0.5, sin(x[i]), sqrt(x[i] * x[i]))
+        for i in seq(0, n):
+            if i % 3 == 0:
+                total += y[i]
+
+    @proc
+    def integers(n: size, a: i8[n], b: i8[n], c: i32[n]):
+        for i in seq(0, n):
+            c[i] += a[i] * b[i]
+        for i in seq(0, n):
+            c[i] = c[i] / 3
+
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal(100, dtype=np.float32)
+    y = [np.zeros(100, dtype=np.float32) for _ in range(2)]
+    total = [np.zeros(1, dtype=np.float32) for _ in range(2)]
+    interpret(activations, x, y[0], total[0])
+    activations.jit()(x, y[1], total[1])
+    np.testing.assert_allclose(y[0], y[1], rtol=1e-6)
+    np.testing.assert_allclose(total[0], total[1], rtol=1e-6)
+
+    a = rng.integers(-128, 128, 100, dtype=np.int8)
+    b = a[::-1].copy()
+    c = [np.full(100, -7, dtype=np.int32) for _ in range(2)]
+    interpret(integers, a, b, c[0])
+    integers.jit()(a, b, c[1])
+    np.testing.assert_array_equal(c[0], c[1])
+
+
+def test_interpret_calls_and_configs():
+    @config
+    class InterpConfig:
+        scale: f32
+
+    @proc
+    def scale_row(n: size, x: [f32][n]):
+        for i in seq(0, n):
+            x[i] = x[i] * InterpConfig.scale
+
+    @proc
+    def scale_rows(m: size, n: size, x: f32[m, n]):
+        InterpConfig.scale = InterpConfig.scale * 2.0
+        for i in seq(0, m):
+            scale_row(n, x[i, :])
+
+    x = np.ones((3, 4), dtype=np.float32)
+    configs = {(InterpConfig, "scale"): 1.5}
+    interpret(scale_rows, x, configs=configs)
+    np.testing.assert_allclose(x, 3.0)
+    assert configs[(InterpConfig, "scale")] == 3.0
+
+    with pytest.raises(ValueError, match="InterpConfig.scale is read before"):
+        interpret(scale_rows, x)
+
+
+def test_interpret_argument_errors():
+    @proc
+    def axpy(n: size, alpha: f32, x: [f32][n], y: [f32][n]):
+        assert n % 4 == 0
+        for i in seq(0, n):
+            y[i] += alpha * x[i]
+
+    x = np.zeros(8, dtype=np.float32)
+    with pytest.raises(ValueError, match="dtype float32"):
+        interpret(axpy, 1.0, x.astype(np.float64), x)
+    with pytest.raises(ValueError, match="violate the assertion n % 4 == 0"):
+        interpret(axpy, 6, 1.0, x[:6], x[:6].copy())
+    with pytest.raises(TypeError, match="missing argument 'y'"):
+        interpret(axpy, alpha=1.0, x=x)
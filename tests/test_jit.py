@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from exo import proc, config
+from exo import jit as exo_jit
+from exo.jit import JITCompileError
+
+
+@pytest.fixture
+def jit_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("EXO_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(exo_jit, "_libraries", dict())
+    return tmp_path / "jit"
+
+
+@proc
+def matmul(M: size, N: size, K: size, A: f32[M, K], B: [f32][K, N], C: [f32][M, N]):
+    for i in seq(0, M):
+        for j in seq(0, N):
+            for k in seq(0, K):
+                C[i, j] += A[i, k] * B[k, j]
+
+
+@proc
+def axpy(n: size, alpha: f32, x: [f32][n], y: [f32][n]):
+    assert n % 4 == 0
+    for i in seq(0, n):
+        y[i] += alpha * x[i]
+
+
+def test_jit_tensors_and_windows(jit_cache):
+    fn = matmul.jit()
+
+    A = np.arange(5 * 7, dtype=np.float32).reshape(5, 7) % 3
+    # B is a transposed view, and C takes every other row
+    B = (np.arange(9 * 7, dtype=np.float32).reshape(9, 7) % 4).T
+    C = np.zeros((10, 9), dtype=np.float32)[::2]
+
+    fn(A=A, B=B, C=C)
+    np.testing.assert_allclose(C, A @ B)
+
+    fn(5, 9, 7, A, B, C)
+    np.testing.assert_allclose(C, 2 * A @ B)
+
+
+def test_jit_scalars_and_inferred_sizes(jit_cache):
+    fn = axpy.jit()
+
+    x = np.arange(16, dtype=np.float32)[::2]
+    y = np.ones(8, dtype=np.float32)
+    fn(2.0, x, y)
+    np.testing.assert_allclose(y, 1 + 2 * x)
+
+    fn(8, np.array([1.0], dtype=np.float32), x, y)
+    np.testing.assert_allclose(y, 1 + 3 * x)
+
+
+def test_jit_configs(jit_cache):
+    @config
+    class JITConfig:
+        scale: f32
+        calls: f32
+
+    @proc
+    def scale(n: size, x: f32[n]):
+        JITConfig.calls = JITConfig.calls + 1.0
+        for i in seq(0, n):
+            x[i] = x[i] * JITConfig.scale
+
+    fn = scale.jit()
+    fn.ctxt.JITConfig.scale = 3.0
+    x = np.ones(4, dtype=np.float32)
+    fn(x)
+    fn(x)
+    np.testing.assert_allclose(x, 9.0)
+    assert fn.ctxt.JITConfig.calls == 2.0
+
+
+def test_jit_argument_errors(jit_cache):
+    fn = axpy.jit()
+    x = np.zeros(8, dtype=np.float32)
+
+    with pytest.raises(ValueError, match="dtype float32"):
+        fn(1.0, x.astype(np.float64), x)
+    with pytest.raises(ValueError, match=r"shape \(8,\)"):
+        fn(8, 1.0, x, x[:6])
+    with pytest.raises(ValueError, match="violate the assertion n % 4 == 0"):
+        fn(6, 1.0, x[:6], x[:6])
+    with pytest.raises(TypeError, match="missing argument 'y'"):
+        fn(alpha=1.0, x=x)
+    with pytest.raises(TypeError, match="unexpected argument 'z'"):
+        fn(1.0, x, x, z=x)
+    with pytest.raises(ValueError, match="C-contiguous"):
+        matmul.jit()(
+            A=np.zeros((4, 4), dtype=np.float32).T, B=x[:4, None], C=x[:4, None]
+        )
+
+
+def test_jit_cache(jit_cache, monkeypatch):
+    axpy.jit()
+    assert len(list(jit_cache.glob("*.so"))) == 1
+
+    # a library which was built before is loaded from the cache, even by
+    # another process
+    monkeypatch.setattr(exo_jit, "_libraries", dict())
+
+    def build(*args):
+        assert False, "the library should not be built again"
+
+    with monkeypatch.context() as m:
+        m.setattr(exo_jit, "_build", build)
+        fn = axpy.jit()
+    x = np.ones(4, dtype=np.float32)
+    y = np.ones(4, dtype=np.float32)
+    fn(1.0, x, y)
+    np.testing.assert_allclose(y, 2.0)
+
+    # other flags make another library
+    axpy.jit(cflags=["-O1"])
+    assert len(list(jit_cache.glob("*.so"))) == 2
+
+
+def test_jit_compile_error(jit_cache):
+    with pytest.raises(JITCompileError, match="-fno-such-flag"):
+        axpy.jit(cflags="-O2 -fno-such-flag")
@@ -538,3 +538,47 @@ def test_implicit_lhs_unquote(golden):
 
     c_file, _ = compile_procs_to_strings([foo], "test.h")
     assert f"EXO IR:\n{str(foo)}\nC:\n{c_file}" == golden
+
+
+def test_unquote_code_is_reused():
+    from exo.frontend import pyparser
+
+    def make_scale(alpha):
+        @proc
+        def scale(x: f32[4]):
+            with python:
+                for i in range(4):
+                    with exo:
+                        x[{i}] = {alpha} * x[{i}]
+
+        return scale
+
+    make_scale(2.0)
+    n_cached = len(pyparser._unquote_code_cache)
+    scale = make_scale(3.0)
+
+    assert len(pyparser._unquote_code_cache) == n_cached
+    assert "x[3] = 3.0 * x[3]" in str(scale)
+
+
+def test_unquote_code_cache_evicts_least_recently_used(monkeypatch):
+    from exo.frontend import pyparser
+
+    monkeypatch.setattr(pyparser, "_unquote_code_cache", pyparser.OrderedDict())
+    monkeypatch.setattr(pyparser, "_UNQUOTE_CODE_CACHE_SIZE", 2)
+
+    def make_copy(n):
+        @proc
+        def copy(x: f32[{n}], y: f32[{n}]):
+            for i in seq(0, {n}):
+                y[i] = x[i]
+
+        return copy
+
+    make_copy(4)
+    assert len(pyparser._unquote_code_cache) == 2
+    (key, _), _ = pyparser._unquote_code_cache.items()
+
+    make_copy(8)
+    assert len(pyparser._unquote_code_cache) == 2
+    assert key in pyparser._unquote_code_cache
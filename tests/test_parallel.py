@@ -2,10 +2,15 @@ from __future__ import annotations
 
 import pytest
 
-from exo import proc, Procedure, DRAM, compile_procs_to_strings
+from exo import proc, config, Procedure, DRAM, SchedulingError, compile_procs_to_strings
 from exo.stdlib.scheduling import *
 
 
+@config
+class ParConfig:
+    nthreads: index
+
+
 def test_pragma_parallel_loop(golden):
     @proc
     def foo(x: i8[10]):
@@ -23,6 +28,7 @@ def test_parallel_fail():
         total: i8
         for i in par(0, 10):
             total += A[i]
+            A[i] = total
 
     with pytest.raises(
         TypeError,
@@ -43,3 +49,97 @@ def test_parallel_fail_2():
         match=r"parallel loop\'s body is not parallelizable because of potential data races",
     ):
         c_file, _ = compile_procs_to_strings([foo], "test.h")
+
+
+def test_parallel_reduction(golden):
+    @proc
+    def foo(n: size, A: f32[n, 16], y: f32[16], s: f32, z: f32[n]):
+        total: f32
+        total = 0.0
+        for i in par(0, n):
+            for j in seq(0, 16):
+                total += A[i, j]
+                y[j] += A[i, j]
+                s += A[i, j]
+                z[i] += A[i, j]
+        A[0, 0] = total
+
+    c_file, _ = compile_procs_to_strings([foo], "test.h")
+
+    assert c_file == golden
+
+
+def test_parallelize_loop_hints(golden):
+    @proc
+    def foo(n: size, A: f32[n, 16]):
+        for i in seq(0, n):
+            for j in seq(0, 16):
+                A[i, j] = 2.0
+
+    foo = parallelize_loop(
+        foo,
+        "i",
+        schedule="dynamic",
+        chunk=4,
+        collapse=2,
+        num_threads=(ParConfig, "nthreads"),
+    )
+    c_file, _ = compile_procs_to_strings([foo], "test.h")
+
+    assert f"{foo}\n{c_file}" == golden
+
+
+def test_num_threads_config_compiles(compiler):
+    @proc
+    def foo(n: size, A: f32[n]):
+        for i in seq(0, n):
+            A[i] = 2.0
+
+    foo = parallelize_loop(foo, "i", num_threads=(ParConfig, "nthreads"))
+    # the config is only read by the pragma, but must be in the context
+    compiler.compile(foo, compile_only=True, CMAKE_C_FLAGS="-fopenmp")
+
+
+def test_num_threads_config_is_read():
+    @proc
+    def foo(n: size, A: f32[n]):
+        ParConfig.nthreads = 4
+        for i in seq(0, n):
+            A[i] = 2.0
+
+    foo = parallelize_loop(foo, "i", num_threads=(ParConfig, "nthreads"))
+    with pytest.raises(SchedulingError, match="do not commute"):
+        reorder_stmts(foo, foo.body()[0].expand(0, 1))
+
+
+def test_parallelize_loop_chunk_needs_schedule():
+    @proc
+    def foo(A: f32[16]):
+        for i in seq(0, 16):
+            A[i] = 2.0
+
+    with pytest.raises(SchedulingError, match="a chunk size requires"):
+        parallelize_loop(foo, "i", chunk=4)
+
+
+def test_collapse_not_perfectly_nested():
+    @proc
+    def foo(A: f32[16, 16]):
+        for i in seq(0, 16):
+            A[i, 0] = 1.0
+            for j in seq(0, 16):
+                A[i, j] = 2.0
+
+    with pytest.raises(SchedulingError, match="not perfectly nested"):
+        parallelize_loop(foo, "i", collapse=2)
+
+
+def test_collapse_triangular():
+    @proc
+    def foo(A: f32[16, 16]):
+        for i in seq(0, 16):
+            for j in seq(0, i):
+                A[i, j] = 2.0
+
+    with pytest.raises(SchedulingError, match="depend on an outer loop"):
+        parallelize_loop(foo, "i", collapse=2)
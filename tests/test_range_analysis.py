@@ -11,6 +11,7 @@ from exo.stdlib.range_analysis import (
     infer_range,
     bounds_inference,
 )
+from exo.rewrite.affine import AffineForm, affine_form
 from exo.core.LoopIR import LoopIR, T
 
 
@@ -187,7 +188,8 @@ def test_affine_index_range_fail():
     e = bar.find("for j in _:_").hi()._impl._node
     i_sym = bar.find("for i in _:_")._impl._node.iter
     e_range = constant_bound(e, {i_sym: (0, 5)})
-    assert e_range == (-15, 20)
+    # the affine normal form of the expression is just `i`
+    assert e_range == (0, 5)
 
 
 def test_affine_index_range_fail2():
@@ -213,7 +215,8 @@ def test_affine_index_range_fail3():
     e = bar.find("for j in _:_").hi()._impl._node
     i_sym = bar.find("for i in _:_")._impl._node.iter
     e_range = constant_bound(e, {i_sym: (0, 2)})
-    assert e_range == (-16, 48)
+    # the affine normal form of the expression is just `16`
+    assert e_range == (16, 16)
 
 
 def test_arg_range():
@@ -516,3 +519,34 @@ def test_bounds_inference_fail():
     loop = foo.find_loop("j")
     bound = bounds_inference(loop, "x", 0, include=["W"])
     assert str(bound) == "(0, -inf, inf)"
+
+
+def test_affine_form():
+    @proc
+    def bar(N: size):
+        for i in seq(0, 6):
+            for j in seq(0, 2 * (N - i) + 3 + i * 2):
+                pass
+            for k in seq(0, 2 * (N - i) + 3 + i * 2):
+                pass
+
+    j_hi = bar.find("for j in _:_").hi()._impl._node
+    k_hi = bar.find("for k in _:_").hi()._impl._node
+    N_sym = bar._loopir_proc.args[0].name
+
+    form = affine_form(j_hi)
+    assert form == AffineForm(3, ((N_sym, 2),))
+    assert form.coeff(N_sym) == 2 and not form.is_const()
+    # structurally equal expressions share one memoized form
+    assert j_hi is not k_hi and affine_form(k_hi) is form
+
+
+def test_affine_form_not_affine():
+    @proc
+    def bar(N: size):
+        for i in seq(0, N / 4):
+            for j in seq(0, N % 4):
+                pass
+
+    assert affine_form(bar.find("for i in _:_").hi()._impl._node) is None
+    assert affine_form(bar.find("for j in _:_").hi()._impl._node) is None
@@ -421,6 +421,34 @@ def test_simplify_nested_div_2(golden):
     assert str(simplify(foo)) == golden
 
 
+def test_simplify_already_simplified():
+    @proc
+    def foo(n: size, x: R[n]):
+        for i in seq(0, n):
+            x[i + 2 - 2] = 0.0
+
+    foo = simplify(foo)
+    assert simplify(foo) is foo
+
+    bar = divide_loop(foo, "i", 4, ["io", "ii"], tail="cut")
+    assert simplify(bar) is not bar
+    bar = simplify(bar)
+    assert simplify(bar) is bar
+
+
+def test_simplify_revisits_statements_in_new_context():
+    @proc
+    def foo(n: size, x: R[n]):
+        assert n >= 1
+        for i in seq(0, n):
+            x[i] = 0.0
+        x[n - 1] = 1.0
+
+    foo = simplify(foo)
+    foo = specialize(foo, foo.body()[1], "n == 4")
+    assert "x[3] = 1.0" in str(simplify(foo))
+
+
 def test_pattern_match():
     @proc
     def foo(N1: size, M1: size, K1: size, N2: size, M2: size, K2: size):
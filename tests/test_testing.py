@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from exo import proc, instr
+from exo import jit as exo_jit
+from exo.stdlib.scheduling import *
+from exo.testing import diff_test
+
+
+@pytest.fixture(autouse=True)
+def jit_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("EXO_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(exo_jit, "_libraries", dict())
+
+
+@proc
+def scale(n: size, alpha: f32, x: f32[n], y: f32[n]):
+    assert n % 4 == 0
+    for i in seq(0, n):
+        y[i] = alpha * x[i]
+
+
+def test_diff_test_equivalent():
+    scheduled = divide_loop(scale, "i", 4, ["io", "ii"], perfect=True)
+    result = diff_test(scale, scheduled, trials=20, processes=2)
+    assert result, str(result)
+    assert result.trials == 20
+    assert result.max_abs_error == 0.0
+
+
+def test_diff_test_wrong_instr():
+    # the C code of the instruction does not do what its semantics say
+    @instr("for (int i = 0; i < 4; i++) (&{dst_data})[i] = 2.0f * (&{src_data})[i];")
+    def scale4(alpha: f32, src: [f32][4], dst: [f32][4]):
+        for i in seq(0, 4):
+            dst[i] = alpha * src[i]
+
+    scheduled = divide_loop(scale, "i", 4, ["io", "ii"], perfect=True)
+    scheduled = replace(scheduled, "for ii in _: _", scale4)
+    result = diff_test(scale, scheduled, sizes={"n": [4, 8]}, trials=10)
+    assert not result
+    failure = result.failure
+    assert failure.trial == 0
+    assert failure.inputs["n"] in (4, 8)
+    assert failure.message.startswith("the scheduled procedure wrote")
+    assert "to y[" in failure.message
+
+
+def test_diff_test_sizes_under_assertions():
+    @proc
+    def copy(m: size, n: size, x: f32[m, n], y: f32[m, n]):
+        assert m == n + 1
+        assert stride(x, 1) == 1
+        for i in seq(0, m):
+            for j in seq(0, n):
+                y[i, j] = x[i, j]
+
+    @proc
+    def copy_off_by_one(m: size, n: size, x: f32[m, n], y: f32[m, n]):
+        assert m == n + 1
+        assert stride(x, 1) == 1
+        for i in seq(0, m - 1):
+            for j in seq(0, n):
+                y[i, j] = x[i, j]
+
+    result = diff_test(copy, copy_off_by_one, sizes={"n": range(1, 5)}, trials=8)
+    assert not result
+    n = result.failure.inputs["n"]
+    assert result.failure.inputs["m"] == n + 1
+    assert f"to y[{n}, 0]" in result.failure.message
+
+    with pytest.raises(ValueError, match="could not sample arguments of copy"):
+        diff_test(copy, copy, sizes={"m": 3, "n": 3})
+    with pytest.raises(ValueError, match="has no size, index or stride argument k"):
+        diff_test(copy, copy, sizes={"k": 3})
+    with pytest.raises(ValueError, match="do not take the same arguments"):
+        diff_test(copy, scale)
+
+
+def test_diff_test_crash():
+    @instr("__builtin_trap();")
+    def trap(alpha: f32, src: [f32][4], dst: [f32][4]):
+        for i in seq(0, 4):
+            dst[i] = alpha * src[i]
+
+    scheduled = divide_loop(scale, "i", 4, ["io", "ii"], perfect=True)
+    scheduled = replace(scheduled, "for ii in _: _", trap)
+    result = diff_test(scale, scheduled, trials=6, processes=2)
+    assert result.failure.trial == 0
+    assert result.failure.message == "the procedures crashed"
+    assert result.trials == 1
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import pytest
+
+from exo import proc, transaction, SchedulingError
+from exo.stdlib.scheduling import *
+from exo.core.proc_eqv import check_eqv_proc
+
+
+def is_eqv(p1, p2):
+    return check_eqv_proc(p1.INTERNAL_proc(), p2.INTERNAL_proc())
+
+
+@proc
+def two_loops(N: size, A: f32[N], B: f32[N]):
+    for i in seq(0, N):
+        A[i] = 1.0
+        B[i] = 2.0
+
+
+def schedule(p):
+    p = divide_loop(p, "i", 4, ["io", "ii"], tail="cut")
+    p = fission(p, p.find("A[_] = _").after(), n_lifts=2)
+    return simplify(p)
+
+
+def test_transaction_commit():
+    with transaction(two_loops) as t:
+        p = schedule(two_loops)
+        assert t.pending() > 0
+
+    assert t.proc is p
+    assert str(t.proc) == str(schedule(two_loops))
+    assert is_eqv(t.proc, two_loops)
+
+
+def test_transaction_parallel_commit():
+    with transaction(two_loops, parallel=2) as t:
+        p = schedule(two_loops)
+
+    assert t.proc is p
+    assert is_eqv(t.proc, two_loops)
+
+
+@pytest.mark.parametrize("parallel", [False, 2])
+def test_transaction_rollback(parallel):
+    @proc
+    def foo(N: size, A: f32[N]):
+        for i in seq(0, N):
+            A[i] = 1.0
+            A[i] = 2.0
+
+    with pytest.raises(
+        SchedulingError, match=r"Check_ReorderStmts \(queued by reorder_stmts\)"
+    ):
+        with transaction(foo, parallel=parallel) as t:
+            p = divide_loop(foo, "i", 4, ["io", "ii"], tail="guard")
+            p = reorder_stmts(p, p.find("A[_] = 1.0").expand(0, 1))
+
+    assert t.proc is foo
+    assert not is_eqv(p, foo)
+
+
+def test_transaction_rollback_on_exception():
+    with pytest.raises(ValueError):
+        with transaction(two_loops) as t:
+            p = divide_loop(two_loops, "i", 4, ["io", "ii"], tail="cut")
+            raise ValueError("abort")
+
+    assert t.proc is two_loops
+    assert not is_eqv(p, two_loops)
+
+
+def test_transaction_rollback_on_check_error(monkeypatch):
+    import exo.rewrite.new_eff as new_eff
+
+    def discharge(ob):
+        new_eff._get_solver().push()
+        raise TypeError("broken check")
+
+    monkeypatch.setattr(new_eff.Obligation, "discharge", discharge)
+    with pytest.raises(TypeError, match="broken check"):
+        with transaction(two_loops) as t:
+            p = schedule(two_loops)
+
+    assert t.proc is two_loops
+    assert not is_eqv(p, two_loops)
+
+
+def test_checks_outside_transaction_are_eager():
+    @proc
+    def foo(N: size, A: f32[N]):
+        for i in seq(0, N):
+            A[i] = 1.0
+            A[i] = 2.0
+
+    with pytest.raises(SchedulingError, match="do not commute"):
+        reorder_stmts(foo, foo.find("A[_] = 1.0").expand(0, 1))
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import pytest
 
-from exo import DRAM
+import exo.API
+from exo.frontend import proc_cache
+from exo import DRAM, proc
 from exo.frontend.pyparser import (
     Parser,
     get_parent_scope,
@@ -122,3 +124,99 @@ def test_variable_lookup_name_error():
 
     with pytest.raises(ParseError, match="'xyzzy' undefined"):
         to_uast(func)
+
+
+def test_srcinfo_is_compact():
+    def func(n: size, x: R[n]):  # pragma: no cover
+        for i in seq(0, n):
+            x[i] = 0.0
+
+    uast = to_uast(func)
+    loop = uast.body[0]
+    assign = loop.body[0]
+
+    for node in (uast, loop, assign):
+        assert not hasattr(node.srcinfo, "__dict__")
+    assert loop.srcinfo.filename is assign.srcinfo.filename
+    assert loop.srcinfo.function is assign.srcinfo.function
+    assert assign.srcinfo.lineno == loop.srcinfo.lineno + 1
+    assert not hasattr(loop.iter, "__dict__")
+
+
+def _define_scale(k):
+    @proc
+    def scale(n: size, x: R[n] @ DRAM):  # pragma: no cover
+        for i in seq(0, n):
+            x[i] = x[i] * k
+
+    return scale
+
+
+def test_proc_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("EXO_CACHE_DIR", str(tmp_path))
+    p1 = _define_scale(2.0)
+    assert len(list(tmp_path.rglob("*.pickle"))) == 1
+
+    # the second definition is loaded without parsing it again
+    def no_parse(*args, **kwargs):
+        raise AssertionError("definition was parsed")
+
+    with monkeypatch.context() as m:
+        m.setattr(exo.API, "Parser", no_parse)
+        p2 = _define_scale(2.0)
+
+    assert str(p2) == str(p1)
+    ir1, ir2 = p1.INTERNAL_proc(), p2.INTERNAL_proc()
+    assert ir2.srcinfo.lineno == ir1.srcinfo.lineno
+    assert ir2.args[0].name is not ir1.args[0].name
+    assert ir2.args[0].name is ir2.args[1].type.hi[0].name
+
+    # captured values are part of the key
+    p3 = _define_scale(3.0)
+    assert "x[i] * 3.0" in str(p3)
+    assert len(list(tmp_path.rglob("*.pickle"))) == 2
+
+
+def test_proc_cache_skips_calls(tmp_path, monkeypatch):
+    monkeypatch.setenv("EXO_CACHE_DIR", str(tmp_path))
+    scale = _define_scale(2.0)
+
+    @proc
+    def caller(x: R[8]):  # pragma: no cover
+        scale(8, x)
+
+    assert len(list(tmp_path.rglob("*.pickle"))) == 1
+
+
+def test_proc_cache_keys_depend_on_exo_sources(tmp_path, monkeypatch):
+    monkeypatch.setenv("EXO_CACHE_DIR", str(tmp_path))
+    _define_scale(2.0)
+
+    # editing Exo itself, e.g. its typechecker, invalidates cached definitions
+    monkeypatch.setattr(proc_cache, "_exo_fingerprint", lambda: "edited")
+    _define_scale(2.0)
+    assert len(list(tmp_path.rglob("*.pickle"))) == 2
+
+
+def _load_function(path, src):
+    path.write_text(src)
+    env = {}
+    exec(compile(src, str(path), "exec"), env)
+    return env["foo"]
+
+
+def test_source_file_is_parsed_once(tmp_path):
+    path = tmp_path / "defs.py"
+    src = "def foo(x: f32):\n    x = 0.0\n\n\ndef bar(x: f32):\n    x = 1.0\n"
+    foo = _load_function(path, src)
+
+    body, src_info = get_ast_from_python(foo)
+    assert body.name == "foo"
+    assert src_info.get_src_info(body.body[0]).lineno == 2
+    assert get_ast_from_python(foo)[0] is body
+
+    # edits to the file are picked up
+    foo = _load_function(path, "\n\n" + src)
+    body, src_info = get_ast_from_python(foo)
+    assert body.name == "foo"
+    assert src_info.get_src_info(body.body[0]).lineno == 4
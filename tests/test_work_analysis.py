@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import pytest
+
+from exo import proc
+from exo.platforms.x86 import *
+from exo.stdlib.scheduling import *
+
+
+@proc
+def sgemm(M: size, N: size, K: size, A: f32[M, K], B: f32[K, N], C: f32[M, N]):
+    for i in seq(0, M):
+        for j in seq(0, N):
+            for k in seq(0, K):
+                C[i, j] += A[i, k] * B[k, j]
+
+
+def test_sgemm_symbolic():
+    stats = sgemm.work_stats()
+    assert str(stats.flops["f32"]) == "2 * K * M * N"
+    assert str(stats.loads["DRAM"]) == "3 * K * M * N"
+    assert str(stats.stores["DRAM"]) == "K * M * N"
+    assert str(stats.traffic["DRAM"]) == "16 * K * M * N"
+    assert stats.instrs == {}
+    assert {nm: str(n) for nm, n in stats.footprint.items()} == {
+        "A": "K * M",
+        "B": "K * N",
+        "C": "M * N",
+    }
+    assert {nm: str(n) for nm, n in stats.loop_footprints["j"].items()} == {
+        "A": "K",
+        "B": "K * N",
+        "C": "N",
+    }
+    assert stats.exact
+
+
+def test_sgemm_sizes_and_roofline():
+    stats = sgemm.work_stats(M=64, N=64, K=64)
+    assert stats.total_flops() == 2 * 64**3
+    assert stats.footprint == {"A": 4096, "B": 4096, "C": 4096}
+
+    # 2 * 64**3 FLOPs over 3 * 4096 floats
+    roof = stats.roofline(peak_gflops=100, bandwidth_gbs=10)
+    assert roof.intensity == pytest.approx(2 * 64**3 / (3 * 4096 * 4))
+    assert roof.bound == "compute" and roof.gflops == 100
+    roof = stats.roofline(peak_gflops=100, bandwidth_gbs=10, traffic="accesses")
+    assert roof.intensity == pytest.approx(2 / 16)
+    assert roof.bound == "memory" and roof.gflops == pytest.approx(1.25)
+
+    with pytest.raises(ValueError, match="has no size, index or stride argument L"):
+        sgemm.work_stats(L=4)
+
+
+def test_scheduled_sgemm_instrs():
+    p = sgemm.add_assertion("N % 8 == 0")
+    p = divide_loop(p, "j", 8, ["jo", "ji"], perfect=True)
+    p = reorder_loops(p, "ji k")
+    p = stage_mem(p, "for ji in _:_", "C[i, 8*jo:8*jo+8]", "Creg")
+    p = set_memory(p, "Creg", AVX2)
+    p = replace_all(p, [mm256_loadu_ps, mm256_storeu_ps])
+
+    stats = p.work_stats()
+    assert str(stats.instrs["mm256_loadu_ps"]) == "(N / 8) * K * M"
+    stats = p.work_stats(M=4, N=16, K=4)
+    assert stats.flops == {"f32": 2 * 4 * 16 * 4}
+    assert stats.instrs == {"mm256_loadu_ps": 32, "mm256_storeu_ps": 32}
+    # the semantics of the instructions move the tile in and out of registers
+    assert stats.loads == {"DRAM": 3 * 256, "AVX2": 2 * 256}
+    assert stats.stores == {"DRAM": 256, "AVX2": 2 * 256}
+    assert stats.footprint == {"A": 16, "B": 64, "C": 64, "Creg": 8}
+    assert stats.loop_footprints["k"] == {"A": 4, "B": 32, "C": 8, "Creg": 8}
+    assert stats.cycles(x86_instr_costs) == 32 * 0.5 + 32 * 1.0
+    assert stats.exact
+
+
+def test_triangular_and_guarded():
+    @proc
+    def lower(N: size, x: f64[N, N], y: f64[N]):
+        for i in seq(0, N):
+            for j in seq(0, i + 1):
+                y[i] += x[i, j] * y[j]
+
+    stats = lower.work_stats()
+    assert str(stats.flops["f64"]) == "N**2 + N"
+    assert lower.work_stats(N=10).loads == {"DRAM": 3 * 55}
+    # bounded by the last iteration of the outer loop
+    assert str(stats.footprint["x"]) == "N**2"
+    assert not stats.exact
+
+    @proc
+    def zero_even(N: size, x: f32[N]):
+        for i in seq(0, N):
+            if i % 2 == 0:
+                x[i] = 0.0
+
+    stats = zero_even.work_stats(N=8)
+    assert stats.stores == {"DRAM": 8}
+    assert not stats.exact
+
+
+def test_calls_and_windows():
+    @proc
+    def acc(n: size, x: [f32][n], y: [f32][n]):
+        for i in seq(0, n):
+            y[i] += x[i]
+
+    @proc
+    def gemv(M: size, N: size, A: f32[M, N], x: f32[N], y: f32[M]):
+        for i in seq(0, M):
+            row = A[i, :]
+            for j in seq(0, N):
+                y[i] += row[j] * x[j]
+        for i in seq(0, M):
+            acc(N, A[i, :], x)
+
+    stats = gemv.work_stats()
+    assert str(stats.flops["f32"]) == "3 * M * N"
+    assert {nm: str(n) for nm, n in stats.footprint.items()} == {
+        "A": "M * N",
+        "x": "N",
+        "y": "M",
+    }
+
+
+def test_constant_quotients():
+    @proc
+    def foo(x: f32[8]):
+        for i in seq(0, 4):
+            x[i / 4 + 2 * i] = 0.0
+
+    # `i / 4` is 0 in all the iterations
+    stats = foo.work_stats()
+    assert stats.footprint == {"x": 4}
+    assert stats.exact
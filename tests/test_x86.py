@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import ctypes
 import itertools
+import shutil
 
 import numpy as np
 import pytest
 
-from exo import proc
+from exo import proc, cpu_dispatch, compile_procs_to_strings, interpret
 from exo.platforms.x86 import *
 from exo.stdlib.scheduling import *
 
@@ -317,6 +319,15 @@ def test_avx2_sgemm_full(compiler, avx2_sgemm_full):
     )
 
 
+def test_interpret_avx2_sgemm_full(avx2_sgemm_full):
+    # the semantic bodies of the instructions run without an AVX2 machine
+    A = np.random.rand(20, 70).astype(np.float32)
+    B = np.random.rand(70, 40).astype(np.float32)
+    C = np.zeros((20, 40), dtype=np.float32)
+    interpret(avx2_sgemm_full, C=C, A=A, B=B)
+    np.testing.assert_allclose(C, A @ B, rtol=1e-5)
+
+
 @pytest.mark.isa("AVX2")
 def test_avx2_sgemm_6x16(compiler, avx2_sgemm_6x16):
     @proc
@@ -1544,3 +1555,75 @@ def test_avx2_divide_by_3(golden):
 
     foo = replace_all(foo, [avx2_ui16_divide_by_3])
     assert str(foo) == golden
+
+
+def test_cpu_dispatch(golden, compiler, monkeypatch, tmp_path):
+    from .conftest import get_cpu_features
+
+    @proc
+    def copy(n: size, dst: f32[n], src: f32[n], flag: f32[1]):
+        assert n % 16 == 0
+        for i in seq(0, n):
+            dst[i] = src[i]
+        flag[0] = 0.0
+
+    @proc
+    def copy_avx2(n: size, dst: f32[n], src: f32[n], flag: f32[1]):
+        assert n % 16 == 0
+        for io in seq(0, n / 8):
+            tmp: f32[8] @ AVX2
+            mm256_loadu_ps(tmp, src[8 * io : 8 * io + 8])
+            mm256_storeu_ps(dst[8 * io : 8 * io + 8], tmp)
+        flag[0] = 1.0
+
+    @proc
+    def copy_avx512(n: size, dst: f32[n], src: f32[n], flag: f32[1]):
+        assert n % 16 == 0
+        for io in seq(0, n / 16):
+            tmp: f32[16] @ AVX512
+            mm512_loadu_ps(tmp, src[16 * io : 16 * io + 16])
+            mm512_storeu_ps(dst[16 * io : 16 * io + 16], tmp)
+        flag[0] = 2.0
+
+    copy_dispatch = cpu_dispatch(copy, {"avx512f": copy_avx512, "avx2": copy_avx2})
+    cc, hh = compile_procs_to_strings([copy_dispatch], "test.h")
+    assert f"{hh}{cc}" == golden
+
+    # no -march flags: the variants are compiled for their own targets
+    lib = compiler.compile([copy_dispatch], skip_on_fail=True, compile_only=True)
+
+    # the variant is chosen once per process, so every run loads its own copy
+    # of the library, and only claims features that this machine has
+    for i, (cpuinfo, expected) in enumerate(
+        [("", 0), ("sse2 avx2", 1), ("avx2 avx512f", 2)]
+    ):
+        if not set(cpuinfo.split()) <= get_cpu_features():
+            continue
+        monkeypatch.setenv("EXO_OVERRIDE_CPUINFO", cpuinfo)
+        lib_copy = tmp_path / f"copy_{i}{lib.suffix}"
+        shutil.copy(lib, lib_copy)
+        fn = ctypes.CDLL(str(lib_copy)).copy
+
+        src = np.arange(64, dtype=np.float32)
+        dst = np.zeros(64, dtype=np.float32)
+        flag = np.full(1, -1.0, dtype=np.float32)
+        fn(None, 64, *(a.ctypes.data_as(ctypes.c_void_p) for a in (dst, src, flag)))
+        np.testing.assert_array_equal(dst, src)
+        assert flag[0] == expected
+
+
+def test_cpu_dispatch_checks_variants():
+    @proc
+    def foo(n: size, x: f32[n]):
+        for i in seq(0, n):
+            x[i] = 0.0
+
+    @proc
+    def bar(n: size, x: f64[n]):
+        for i in seq(0, n):
+            x[i] = 0.0
+
+    with pytest.raises(TypeError, match="bar is not a variant of foo"):
+        cpu_dispatch(foo, {"avx2": bar})
+    with pytest.raises(ValueError, match="invalid CPU features"):
+        cpu_dispatch(foo, {'avx2"); abort(': foo})